@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# \"\"\"Headless batch tool: convert, recompress, validate, export and benchmark projects without Qt\"\"\"
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+
+from core.constants import EXT_PROJECT
+from editor.project_diff import ProjectDiff
+from fileio.binary import BinaryLayerIO
+from fileio.compression import (BENCH_CODECS, BENCH_FILTER_SETS, CODEC_IDS, FILTER_FLAGS,
+                                ChunkCodec, benchmark_codecs)
+from fileio.container import ContainerIO
+from fileio.hdf5_exporter import HDF5Exporter
+from fileio.metadata import MetadataIO
+from fileio.patch_io import PatchIO
+from fileio.project_io import ProjectIO
+from fileio.tiled_exporter import TiledExporter
+
+HDF5_SUFFIXES = ('.h5', '.hdf5')
+TILED_SUFFIXES = ('.tmx', '.tmj')  # Only when named directly; directories are not searched for them
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1  # At least one project failed or did not validate
+EXIT_USAGE = 2   # Bad arguments or no projects found (argparse also uses 2)
+
+
+def find_projects(paths: List[str]) -> List[Tuple[str, str]]:
+    # \"\"\"Expand inputs into (kind, path) pairs; kind is 'project', 'container', 'hdf5' or 'tiled'\"\"\"
+    found = []
+    for path in map(Path, paths):
+        if path.is_file() and path.suffix.lower() in HDF5_SUFFIXES:
+            found.append(('hdf5', str(path)))
+        elif path.is_file() and path.suffix.lower() in TILED_SUFFIXES:
+            found.append(('tiled', str(path)))
+        elif path.is_file() and path.suffix.lower() == EXT_PROJECT:
+            found.append(('container', str(path)))
+        elif (path / "metadata.json").is_file():
+            found.append(('project', str(path)))
+        elif path.is_dir():
+            # Directory of projects: every metadata.json parent and HDF5 file below it
+            for child in sorted(path.rglob('*')):
+                if any(part.startswith('.') for part in child.relative_to(path).parts):
+                    continue  # Hidden directories such as .autosave are not projects
+                if child.name == "metadata.json":
+                    found.append(('project', str(child.parent)))
+                elif child.is_file() and child.suffix.lower() in HDF5_SUFFIXES:
+                    found.append(('hdf5', str(child)))
+                elif child.is_file() and child.suffix.lower() == EXT_PROJECT:
+                    found.append(('container', str(child)))
+    
+    # Keep input order but drop duplicates (overlapping arguments)
+    seen = set()
+    return [item for item in found if not (item in seen or seen.add(item))]
+
+
+def load(kind: str, path: str, replay_journal: bool = True):
+    # \"\"\"Load a project directory, .aether container, HDF5 file or Tiled map\"\"\"
+    # \"\"\"Projects come with their unsaved journal edits, as the editor would open them,
+    # unless replay_journal is False\"\"\"
+    if kind == 'hdf5':
+        return ProjectIO.import_from_hdf5(path)
+    if kind == 'tiled':
+        return ProjectIO.import_from_tiled(path, workers=1)  # Batch jobs already run in parallel
+    return ProjectIO.load_project(path, replay_journal=replay_journal)
+
+
+def validate_project(project, kind: str = None, path: str = None) -> List[str]:
+    # \"\"\"Return a list of problems found in a loaded project (empty when valid)\"\"\"
+    problems = []
+    
+    if kind == 'project':
+        # load_project skips missing layer files silently, so check the metadata directly
+        metadata = MetadataIO.load_metadata(str(Path(path) / "metadata.json"))
+        for layer_meta in metadata.get('layers', []):
+            if not (Path(path) / "layers" / layer_meta['file']).is_file():
+                problems.append(f"layer '{layer_meta['name']}': missing file {layer_meta['file']}")
+        if metadata.get('tileset') and project.tileset is None:
+            problems.append(f"tileset image not found: {metadata['tileset']['path']}")
+    
+    names = [layer.name for layer in project.layers]
+    for name in sorted({name for name in names if names.count(name) > 1}):
+        problems.append(f"duplicate layer name '{name}'")
+    
+    known_ids = None
+    if project.tileset is not None and project.tileset.tiles:
+        known_ids = np.fromiter(project.tileset.tiles.keys(), dtype=np.int64)
+    
+    for layer in project.layers:
+        grid = layer.tile_grid
+        if grid.shape != (project.grid_height, project.grid_width):
+            problems.append(
+                f"layer '{layer.name}': grid is {grid.shape[1]}x{grid.shape[0]}, "
+                f"project is {project.grid_width}x{project.grid_height}"
+            )
+        if grid.size == 0:
+            continue
+        
+        low, high = int(grid.min()), int(grid.max())
+        if low < 0:
+            problems.append(f"layer '{layer.name}': negative tile IDs (min {low})")
+            continue
+        
+        if known_ids is not None:
+            # bincount beats np.unique on large grids when IDs are dense
+            if high < (1 << 24):
+                present = np.flatnonzero(np.bincount(grid.ravel()))
+            else:
+                present = np.unique(grid)
+            present = present[present != 0]
+            unknown = present[~np.isin(present, known_ids)]
+            if len(unknown):
+                shown = ", ".join(str(i) for i in unknown[:10])
+                more = f" (+{len(unknown) - 10} more)" if len(unknown) > 10 else ""
+                problems.append(f"layer '{layer.name}': tile IDs not in tileset: {shown}{more}")
+    
+    return problems
+
+
+def _project_stem(path: str) -> str:
+    p = Path(path)
+    return p.stem if p.suffix.lower() in HDF5_SUFFIXES + TILED_SUFFIXES + (EXT_PROJECT,) else p.name
+
+
+def _copy_embedded_tileset(hdf5_path: str, project, out_dir: Path):
+    # \"\"\"Write the image embedded in an HDF5 export next to a converted project\"\"\"
+    import h5py
+    
+    if project.tileset is None or Path(project.tileset.image_path).exists():
+        return
+    with h5py.File(hdf5_path, 'r') as f:
+        if 'tileset/image' in f:
+            # load_project falls back to the image's file name inside the project directory
+            (out_dir / Path(project.tileset.image_path).name).write_bytes(bytes(f['tileset/image'][:]))
+
+
+def run_task(task: dict) -> dict:
+    # \"\"\"Run one command on one project; never raises (worker entry point)\"\"\"
+    command, kind, path = task['command'], task['kind'], task['path']
+    start = time.perf_counter()
+    result = {'command': command, 'kind': kind, 'path': path, 'ok': True, 'messages': []}
+    
+    try:
+        # recompress re-encodes exactly what is on disk: journaled edits stay in the journal,
+        # so the layer hashes in metadata.json remain true. Everything else (validate included)
+        # sees the project as the editor would open it, journal applied.
+        project = load(kind, path, replay_journal=command != 'recompress')
+        
+        if command == 'validate':
+            result['messages'] = validate_project(project, kind, path)
+            result['ok'] = not result['messages']
+        
+        elif command == 'recompress':
+            if kind == 'container':
+                if task['layer_version'] == 1:
+                    raise ValueError("containers hold v2 or v3 layers")
+                codec = task['codec'] or ('zlib' if task['compress'] else 'none')
+                # Not save_project: that would also truncate the journal, whose edits were not loaded
+                ContainerIO.save_container(
+                    project, path, raw_layers=task['layer_version'] == BinaryLayerIO.VERSION_MAPPED,
+                    codec=codec, filters=task['filters']
+                )
+            elif kind == 'project':
+                for layer in project.layers:
+                    layer_path = Path(path) / "layers" / f"{layer.name}.layer"
+                    BinaryLayerIO.save_layer(layer, str(layer_path), compress=task['compress'],
+                                             level=task['level'], version=task['layer_version'],
+                                             codec=task['codec'], filters=task['filters'])
+            else:
+                raise ValueError("recompress works on project directories and containers")
+            result['messages'].append(f"{len(project.layers)} layers rewritten")
+        
+        elif command == 'bench':
+            codecs = [ChunkCodec(codec, filters) for codec in task['codecs'] for filters in BENCH_FILTER_SETS]
+            bench = benchmark_codecs([layer.tile_grid for layer in project.layers], codecs)
+            bench.sort(key=lambda row: -row['ratio'])
+            result['bench'] = bench
+            result['messages'].append(f"{'codec':<24} {'ratio':>7} {'enc MB/s':>9} {'dec MB/s':>9}")
+            for row in bench:
+                result['messages'].append(
+                    f"{row['codec']:<24} {row['ratio']:7.1f} {row['encode_mb_s']:9.1f} {row['decode_mb_s']:9.1f}"
+                )
+        
+        elif command in ('convert', 'export'):
+            target = task['to'] or ('project' if kind in ('hdf5', 'tiled') else 'hdf5')
+            out_root = Path(task['output'])
+            out_root.mkdir(parents=True, exist_ok=True)
+            
+            if target == 'hdf5':
+                out_path = out_root / f"{_project_stem(path)}.h5"
+                ProjectIO.export_to_hdf5(project, str(out_path), compression=task['hdf5_compression'])
+            elif target == 'container':
+                out_path = out_root / f"{_project_stem(path)}{EXT_PROJECT}"
+                ProjectIO.save_project(project, str(out_path))
+            elif target in ('tmx', 'tmj'):
+                out_path = out_root / f"{_project_stem(path)}.{target}"
+                ProjectIO.export_to_tiled(project, str(out_path), encoding=task['tiled_encoding'])
+            else:
+                out_path = out_root / _project_stem(path)
+                ProjectIO.save_project(project, str(out_path))
+                if kind == 'hdf5':
+                    _copy_embedded_tileset(path, project, out_path)
+            result['output'] = str(out_path)
+            result['messages'].append(f"-> {out_path}")
+    
+    except Exception as e:
+        result['ok'] = False
+        result['messages'].append(f"{type(e).__name__}: {e}")
+    
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _name_list(text: str, known, kind: str) -> tuple:
+    names = tuple(name.strip() for name in text.split(',') if name.strip())
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown {kind}: {', '.join(unknown)}")
+    return names
+
+
+def _filter_list(text: str) -> tuple:
+    return _name_list(text, FILTER_FLAGS, "filter")
+
+
+def _codec_list(text: str) -> tuple:
+    return _name_list(text, CODEC_IDS, "codec")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Headless batch operations on Aether tile projects."
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    def add_paths(p):
+        p.add_argument('paths', nargs='+',
+                       help="project directories, HDF5 files, or directories containing them")
+        p.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                       help="worker processes (default: CPU count)")
+        p.add_argument('--json', action='store_true',
+                       help="print one JSON result per line instead of text")
+    
+    p = sub.add_parser('validate', help="check layer files, dimensions and tile IDs (unsaved journal edits applied)")
+    add_paths(p)
+    
+    p = sub.add_parser('recompress', help="rewrite layer files of project directories and containers in place")
+    add_paths(p)
+    p.add_argument('--codec', choices=sorted(CODEC_IDS),
+                   help="chunk codec for v2 layers (default: zlib, or none with --no-compress)")
+    p.add_argument('--filters', type=_filter_list, default=(),
+                   help=f"comma-separated pre-filters for v2 layers: {', '.join(FILTER_FLAGS)}")
+    p.add_argument('--level', type=int, choices=range(0, 10), metavar='0-9',
+                   help="compression level (default: codec's own)")
+    p.add_argument('--no-compress', dest='compress', action='store_false',
+                   help="store layers uncompressed")
+    p.add_argument('--layer-version', type=int, default=BinaryLayerIO.VERSION, choices=(1, 2, 3),
+                   help="layer file format: 1 single stream, 2 chunked (default), 3 raw memory-mapped")
+    
+    p = sub.add_parser('bench', help="compare codec/filter ratio and speed on projects' layers")
+    add_paths(p)
+    p.add_argument('--codecs', type=_codec_list, default=BENCH_CODECS,
+                   help=f"comma-separated codecs to try (default: {','.join(BENCH_CODECS)})")
+    
+    p = sub.add_parser('convert', help="project directory <-> HDF5 (direction inferred from input)")
+    add_paths(p)
+    p.add_argument('-o', '--output', required=True, help="output directory")
+    p.add_argument('--to', choices=('project', 'container', 'hdf5', 'tmx', 'tmj'),
+                   help=f"force the output format (container: single {EXT_PROJECT} file; tmx/tmj: Tiled map)")
+    p.add_argument('--hdf5-compression', choices=HDF5Exporter.COMPRESSIONS, default='gzip',
+                   help="tile grid compression in HDF5 output (default: gzip)")
+    p.add_argument('--tiled-encoding', choices=TiledExporter.ENCODINGS, default='base64-zlib',
+                   help="layer data encoding in Tiled output (default: base64-zlib)")
+    
+    p = sub.add_parser('export', help="export projects to HDF5")
+    add_paths(p)
+    p.add_argument('-o', '--output', required=True, help="output directory")
+    p.add_argument('--hdf5-compression', choices=HDF5Exporter.COMPRESSIONS, default='gzip',
+                   help="tile grid compression (default: gzip)")
+    p.set_defaults(to='hdf5')
+    
+    p = sub.add_parser('world', help="export many projects as levels of one HDF5 file with shared tilesets")
+    add_paths(p)
+    p.add_argument('-o', '--output', required=True, help="output HDF5 file")
+    p.add_argument('--hdf5-compression', choices=HDF5Exporter.COMPRESSIONS, default='gzip',
+                   help="tile grid compression (default: gzip)")
+    
+    p = sub.add_parser('diff', help="show the changes between two projects, optionally as a patch file")
+    p.add_argument('old', help="original project")
+    p.add_argument('new', help="changed project")
+    p.add_argument('-o', '--output', help="write a binary patch file")
+    p.add_argument('--json', action='store_true', help="print a JSON summary instead of text")
+    
+    p = sub.add_parser('patch', help="apply a patch file to a project")
+    p.add_argument('project', help="project to patch (the patch's old side, or new side with --reverse)")
+    p.add_argument('patch', help="patch file from 'diff -o'")
+    p.add_argument('--reverse', action='store_true', help="undo the patch instead")
+    p.add_argument('-o', '--output', help="save the result here instead of over the project")
+    p.add_argument('--json', action='store_true', help="print a JSON summary instead of text")
+    
+    p = sub.add_parser('merge', help="three-way merge of two edited copies of a project")
+    p.add_argument('base', help="common ancestor")
+    p.add_argument('ours', help="our copy; conflicting cells keep its tiles")
+    p.add_argument('theirs', help="their copy")
+    p.add_argument('-o', '--output', required=True, help="output project directory or container file")
+    p.add_argument('--json', action='store_true', help="print a JSON summary instead of text")
+    
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    
+    if args.command in ('diff', 'patch', 'merge'):
+        return _compare(args)
+    
+    projects = find_projects(args.paths)
+    if not projects:
+        print("error: no projects found", file=sys.stderr)
+        return EXIT_USAGE
+    
+    if args.command == 'world':
+        return _export_world(projects, args)
+    
+    options = {
+        'compress': getattr(args, 'compress', True),
+        'level': getattr(args, 'level', 6),
+        'layer_version': getattr(args, 'layer_version', BinaryLayerIO.VERSION),
+        'codec': getattr(args, 'codec', None),
+        'filters': getattr(args, 'filters', ()),
+        'codecs': getattr(args, 'codecs', BENCH_CODECS),
+        'output': getattr(args, 'output', None),
+        'to': getattr(args, 'to', None),
+        'hdf5_compression': getattr(args, 'hdf5_compression', 'gzip'),
+        'tiled_encoding': getattr(args, 'tiled_encoding', 'base64-zlib'),
+    }
+    tasks = [dict(options, command=args.command, kind=kind, path=path) for kind, path in projects]
+    
+    start = time.perf_counter()
+    if args.jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(tasks))) as executor:
+            results = executor.map(run_task, tasks)
+            failed = _report(results, args.json)
+    else:
+        failed = _report(map(run_task, tasks), args.json)
+    elapsed = time.perf_counter() - start
+    
+    if not args.json:
+        print(f"{len(tasks) - failed}/{len(tasks)} ok, {failed} failed in {elapsed:.2f}s")
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def _export_world(projects: List[Tuple[str, str]], args) -> int:
+    # \"\"\"One output file for all inputs, so this runs in-process (levels load on threads)\"\"\"
+    levels = [(_project_stem(path), path) for _, path in projects]
+    start = time.perf_counter()
+    try:
+        summary = ProjectIO.export_world_to_hdf5(
+            levels, args.output, compression=args.hdf5_compression, workers=args.jobs
+        )
+    except Exception as e:
+        print(f"error: {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    elapsed = time.perf_counter() - start
+    
+    if args.json:
+        print(json.dumps(dict(summary, output=args.output, seconds=elapsed)))
+    else:
+        print(f"{summary['levels']} levels, {summary['tilesets']} distinct tilesets "
+              f"({summary['shared_tileset_bytes']} image bytes shared) -> {args.output} in {elapsed:.2f}s")
+    return EXIT_OK
+
+
+def _compare(args) -> int:
+    # \"\"\"diff, patch and merge: a few named projects each, run in-process\"\"\"
+    start = time.perf_counter()
+    summary = {'command': args.command}
+    try:
+        if args.command == 'diff':
+            patch = ProjectDiff.diff(_load_one(args.old), _load_one(args.new))
+            if args.output:
+                PatchIO.save_patch(patch, args.output)
+            lines = [str(change) for change in patch.changes]
+        
+        elif args.command == 'patch':
+            project = _load_one(args.project)
+            patch = PatchIO.load_patch(args.patch)
+            if args.reverse:
+                patch = patch.reversed()
+            patch.apply(project)
+            ProjectIO.save_project(project, args.output or args.project)
+            lines = [str(change) for change in patch.changes]
+        
+        else:
+            ours = _load_one(args.ours)
+            result = ProjectDiff.merge(_load_one(args.base), ours, _load_one(args.theirs))
+            result.patch.apply(ours)
+            ProjectIO.save_project(ours, args.output)
+            patch = result.patch
+            summary['conflicts'] = [str(conflict) for conflict in result.conflicts]
+            lines = [str(change) for change in patch.changes] + [f"! {c}" for c in summary['conflicts']]
+    except Exception as e:
+        print(f"error: {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    
+    summary.update(
+        changes=[str(change) for change in patch.changes], cells=patch.cell_count,
+        output=args.output, seconds=time.perf_counter() - start
+    )
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        for line in lines:
+            print(line)
+        conflicts = f", {len(summary['conflicts'])} conflicts" if 'conflicts' in summary else ""
+        print(f"{len(patch.changes)} layer changes, {patch.cell_count} cells{conflicts} in {summary['seconds']:.2f}s")
+    return EXIT_FAILED if summary.get('conflicts') else EXIT_OK
+
+
+def _load_one(path: str):
+    found = find_projects([path])
+    if len(found) != 1:
+        raise ValueError(f"not a single project: {path}")
+    return load(*found[0])
+
+
+def _report(results, as_json: bool) -> int:
+    # \"\"\"Print results as they arrive (in input order); return the failure count\"\"\"
+    failed = 0
+    for result in results:
+        failed += not result['ok']
+        if as_json:
+            print(json.dumps(result), flush=True)
+            continue
+        status = "OK  " if result['ok'] else "FAIL"
+        print(f"{status} {result['seconds']:7.2f}s  {result['path']}", flush=True)
+        for message in result['messages']:
+            print(f"        {message}", flush=True)
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(main())
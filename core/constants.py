@@ -13,3 +13,13 @@ EXT_PROJECT = ".aether"
 EXT_LAYER = ".layer"
 EXT_METADATA = ".json"
 EXT_HDF5 = ".h5"
+DEFAULT_PROJECT_FORMAT = "directory"  # or "container": one EXT_PROJECT file per project
+UNDO_MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of delta arrays kept for undo/redo
+CLIPBOARD_COMPRESS_THRESHOLD = 256 * 1024  # clipboard blocks larger than this are held zlib-compressed
+LAYER_CHUNK_SIZE = 64  # tiles per side of an independently compressed chunk in v2 layer files
+TILED_BLOCK_CELLS = 1 << 20  # tiles per block of rows generated at a time when exporting Tiled maps
+AUTOSAVE_DIR = ".autosave"  # inside the project directory
+AUTOSAVE_INTERVAL_MS = 60 * 1000
+AUTOSAVE_MIN_CHANGES = 5  # change events since the last autosave before another is written
+JOURNAL_FILE = "edits.journal"  # write-ahead log of edits since the last save, inside the project directory
+JOURNAL_FLUSH_INTERVAL = 0.2  # seconds the journal gathers records before one write + fsync
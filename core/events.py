@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+class ChangeKind(Enum):
+    # \"\"\"Kinds of change published by layers and projects\"\"\"
+    CELLS = "cells"
+    LAYER_ADDED = "layer_added"
+    LAYER_REMOVED = "layer_removed"
+    LAYER_REORDERED = "layer_reordered"
+    LAYER_PROPERTY = "layer_property"
+    PROJECT_PROPERTY = "project_property"
+    TILESET = "tileset"
+
+@dataclass
+class ChangeEvent:
+    # \"\"\"Single change notification\"\"\"
+    kind: ChangeKind
+    layer: Any = None
+    rect: Optional[Tuple[int, int, int, int]] = None  # Dirty cells as (x0, y0, x1, y1), end exclusive
+    properties: Set[str] = field(default_factory=set)
+    
+    def merge(self, other: 'ChangeEvent'):
+        # \"\"\"Fold a later event of the same kind/layer into this one\"\"\"
+        if self.rect is not None and other.rect is not None:
+            self.rect = (
+                min(self.rect[0], other.rect[0]),
+                min(self.rect[1], other.rect[1]),
+                max(self.rect[2], other.rect[2]),
+                max(self.rect[3], other.rect[3])
+            )
+        self.properties |= other.properties
+
+class ChangeBus:
+    # \"\"\"Publish/subscribe hub with transaction-scoped coalescing\"\"\"
+    
+    def __init__(self):
+        self._subscribers: List[Callable[[ChangeEvent], None]] = []
+        self._depth = 0
+        self._queued = {}
+    
+    def subscribe(self, callback: Callable[[ChangeEvent], None]):
+        # \"\"\"Register a callback receiving ChangeEvent objects\"\"\"
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[ChangeEvent], None]):
+        # \"\"\"Remove a previously registered callback\"\"\"
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def publish(self, event: ChangeEvent):
+        # \"\"\"Deliver an event now, or queue it while a transaction is open\"\"\"
+        if self._depth:
+            key = (event.kind, id(event.layer))
+            queued = self._queued.get(key)
+            if queued is None:
+                self._queued[key] = ChangeEvent(event.kind, event.layer, event.rect, set(event.properties))
+            else:
+                queued.merge(event)
+            return
+        
+        for callback in list(self._subscribers):
+            callback(event)
+    
+    @contextmanager
+    def transaction(self):
+        # \"\"\"Coalesce events raised inside the block and deliver them once at the end\"\"\"
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self._queued:
+                queued = list(self._queued.values())
+                self._queued = {}
+                for event in queued:
+                    self.publish(event)
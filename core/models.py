@@ -4,6 +4,8 @@ from typing import Dict, List, Tuple, Any, Optional
 from enum import Enum
 import pygame
 import os
+import hashlib
+from core.events import ChangeBus, ChangeEvent, ChangeKind
 
 class LayerType(Enum):
     # \"\"\"Types of layers available\"\"\"
@@ -50,13 +52,17 @@ class TileData:
 class TileSet:
     # \"\"\"Collection of tiles from a spritesheet\"\"\"
     
-    def __init__(self, name: str, image_path: str, tile_width: int = None, tile_height: int = None):
+    def __init__(self, name: str, image_path: str, tile_width: int = None, tile_height: int = None,
+                 margin: int = 0, spacing: int = 0):
         self.name = name
         self.image_path = image_path
         self.tile_width = tile_width
         self.tile_height = tile_height
+        self.margin = margin  # Pixels around the spritesheet's edge
+        self.spacing = spacing  # Pixels between neighbouring tiles
         self.image: Optional[pygame.Surface] = None
         self.tiles: Dict[int, TileData] = {}
+        self.image_bytes: Optional[bytes] = None  # Image file contents, when loaded from a container/HDF5 file
         
         # Load image
         if image_path and os.path.exists(image_path):
@@ -64,12 +70,21 @@ class TileSet:
     
     def load_image(self):
         # \"\"\"Load the tileset image\"\"\"
-        self.image = pygame.image.load(self.image_path).convert_alpha()
+        self.image = pygame.image.load(self.image_path)
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            self.image = self.image.convert_alpha()  # Headless loads keep the file's pixel format
         
         # Auto-detect tile size if not provided
         if self.tile_width is None or self.tile_height is None:
             self._auto_detect_tile_size()
     
+    def image_file_bytes(self) -> Optional[bytes]:
+        # \"\"\"Contents of the image file: read from image_path, else the bytes it was loaded from\"\"\"
+        if self.image_path and os.path.isfile(self.image_path):
+            with open(self.image_path, 'rb') as f:
+                return f.read()
+        return self.image_bytes
+    
     def _auto_detect_tile_size(self):
         # \"\"\"Auto-detect common tile sizes (8x8, 16x16, 32x32, 64x64)\"\"\"
         
@@ -94,15 +109,18 @@ class TileSet:
         if not self.image:
             return
             
-        cols = self.image.get_width() // self.tile_width
-        rows = self.image.get_height() // self.tile_height
+        # Same counts as Tiled: the margin on the far edge may be cut short
+        step_x = self.tile_width + self.spacing
+        step_y = self.tile_height + self.spacing
+        cols = max(0, (self.image.get_width() - self.margin + self.spacing) // step_x)
+        rows = max(0, (self.image.get_height() - self.margin + self.spacing) // step_y)
         
         tile_id = 1  # ID 0 reserved for empty
         for row in range(rows):
             for col in range(cols):
                 rect = pygame.Rect(
-                    col * self.tile_width,
-                    row * self.tile_height,
+                    self.margin + col * step_x,
+                    self.margin + row * step_y,
                     self.tile_width,
                     self.tile_height
                 )
@@ -119,6 +137,11 @@ class TileSet:
 class Layer:
     # \"\"\"Single editable layer with tile grid\"\"\"
     
+    # Attributes whose assignment publishes a LAYER_PROPERTY event
+    WATCHED_PROPERTIES = frozenset({
+        'name', 'layer_type', 'visible', 'locked', 'opacity', 'z_index', 'interacts_with_layers'
+    })
+    
     def __init__(self, name: str, width: int, height: int, layer_type: LayerType = LayerType.ACTUAL):
         self.name = name
         self.width = width
@@ -131,6 +154,43 @@ class Layer:
         self.z_index = 0
         self.interacts_with_layers = True  # Can interact with other layers
         
+        # Save bookkeeping: cells changed since the last save, and what was saved where
+        self.dirty = True
+        self.saved_file: Optional[str] = None
+        self.saved_hash: Optional[str] = None
+        self.load_error: Optional[str] = None  # Set when the saved cells could not be read; never saved then
+        
+        self.changes = ChangeBus()  # Set last so construction publishes nothing
+    
+    def __setattr__(self, name, value):
+        changes = self.__dict__.get('changes')
+        if changes is None or (name != 'tile_grid' and name not in self.WATCHED_PROPERTIES):
+            super().__setattr__(name, value)
+            return
+        
+        old_value = self.__dict__.get(name)
+        super().__setattr__(name, value)
+        
+        if name == 'tile_grid':
+            if value is not old_value:
+                self.mark_dirty()
+        elif value != old_value:
+            changes.publish(ChangeEvent(ChangeKind.LAYER_PROPERTY, self, properties={name}))
+    
+    def mark_dirty(self, x0: int = 0, y0: int = 0, x1: int = None, y1: int = None):
+        # \"\"\"Publish a CELLS event for a rectangle (whole layer by default)\"\"\"
+        rect = (x0, y0, self.width if x1 is None else x1, self.height if y1 is None else y1)
+        self.dirty = True
+        self.changes.publish(ChangeEvent(ChangeKind.CELLS, self, rect))
+        
+    def content_hash(self) -> str:
+        # \"\"\"Digest of the grid's shape and cells, used to skip rewriting unchanged layers\"\"\"
+        grid = np.ascontiguousarray(self.tile_grid, dtype='<i4')
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.array(grid.shape, dtype='<i8').tobytes())
+        digest.update(grid.reshape(-1).view(np.uint8))
+        return digest.hexdigest()
+    
     def get_tile(self, x: int, y: int) -> int:
             # \"\"\"Get tile ID at position\"\"\"
         if 0 <= x < self.width and 0 <= y < self.height:
@@ -141,14 +201,37 @@ class Layer:
         # \"\"\"Set tile ID at position\"\"\"
         if 0 <= x < self.width and 0 <= y < self.height:
             self.tile_grid[y, x] = tile_id
+            self.mark_dirty(x, y, x + 1, y + 1)
+    
+    def write_cells(self, indices: np.ndarray, tile_ids) -> np.ndarray:
+        # \"\"\"Write tile IDs at flat (row-major) cell indices, returning the previous IDs\"\"\"
+        old_ids = self.tile_grid.take(indices)
+        np.put(self.tile_grid, indices, tile_ids)
+        
+        if len(indices):
+            rows, cols = np.divmod(indices, self.width)
+            self.mark_dirty(int(cols.min()), int(rows.min()), int(cols.max()) + 1, int(rows.max()) + 1)
+        return old_ids
+    
+    def write_region(self, x: int, y: int, block: np.ndarray) -> np.ndarray:
+        # \"\"\"Write a 2D block of tile IDs with its top-left at (x, y), returning the previous block\"\"\"
+        h, w = block.shape
+        old_block = self.tile_grid[y:y + h, x:x + w].copy()
+        self.tile_grid[y:y + h, x:x + w] = block
+        self.mark_dirty(x, y, x + w, y + h)
+        return old_block
     
     def clear(self):
         # \"\"\"Clear all tiles from layer\"\"\"
         self.tile_grid.fill(0)
+        self.mark_dirty()
 
 class MapProject:
     # \"\"\"Container for entire map project\"\"\"
     
+    # Attributes whose assignment publishes a PROJECT_PROPERTY event
+    WATCHED_PROPERTIES = frozenset({'name', 'grid_width', 'grid_height', 'tile_width', 'tile_height'})
+    
     def __init__(self, name: str, grid_width: int, grid_height: int, 
                  tile_width: int, tile_height: int):
         self.name = name
@@ -160,21 +243,56 @@ class MapProject:
         self.tileset: Optional[TileSet] = None
         self.metadata: Dict[str, Any] = {}
         self.project_path: Optional[str] = None
+        self.changes = ChangeBus()  # Layer events are forwarded here
+    
+    def __setattr__(self, name, value):
+        changes = self.__dict__.get('changes')
+        if changes is None or (name != 'tileset' and name not in self.WATCHED_PROPERTIES):
+            super().__setattr__(name, value)
+            return
+        
+        old_value = self.__dict__.get(name)
+        super().__setattr__(name, value)
+        
+        if name == 'tileset':
+            if value is not old_value:
+                changes.publish(ChangeEvent(ChangeKind.TILESET))
+        elif value != old_value:
+            changes.publish(ChangeEvent(ChangeKind.PROJECT_PROPERTY, properties={name}))
     
     def add_layer(self, name: str, layer_type: LayerType = LayerType.ACTUAL) -> Layer:
         # \"\"\"Create and add a new layer\"\"\"
         layer = Layer(name, self.grid_width, self.grid_height, layer_type)
         layer.z_index = len(self.layers)
-        self.layers.append(layer)
+        self.append_layer(layer)
         return layer
     
+    def append_layer(self, layer: Layer):
+        # \"\"\"Add an existing layer (e.g. one loaded from disk) on top\"\"\"
+        self.layers.append(layer)
+        layer.changes.subscribe(self.changes.publish)
+        self.changes.publish(ChangeEvent(ChangeKind.LAYER_ADDED, layer))
+    
     def remove_layer(self, layer: Layer):
         # \"\"\"Remove a layer\"\"\"
         if layer in self.layers:
-            self.layers.remove(layer)
-            # Reindex remaining layers
-            for i, l in enumerate(self.layers):
-                l.z_index = i
+            with self.changes.transaction():
+                self.layers.remove(layer)
+                layer.changes.unsubscribe(self.changes.publish)
+                self.changes.publish(ChangeEvent(ChangeKind.LAYER_REMOVED, layer))
+                # Reindex remaining layers
+                for i, l in enumerate(self.layers):
+                    l.z_index = i
+    
+    def move_layer(self, layer: Layer, index: int):
+        # \"\"\"Move a layer to a new position in the stack\"\"\"
+        if layer in self.layers:
+            with self.changes.transaction():
+                self.layers.remove(layer)
+                self.layers.insert(index, layer)
+                for i, l in enumerate(self.layers):
+                    l.z_index = i
+                self.changes.publish(ChangeEvent(ChangeKind.LAYER_REORDERED))
     
     def get_layer_by_name(self, name: str) -> Optional[Layer]:
         # \"\"\"Find layer by name\"\"\"
@@ -0,0 +1,168 @@
+import shutil
+import time
+import uuid
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from core.constants import AUTOSAVE_DIR, AUTOSAVE_INTERVAL_MS, AUTOSAVE_MIN_CHANGES
+from core.events import ChangeKind
+from fileio.binary import BinaryLayerIO
+from fileio.container import ContainerIO
+from fileio.metadata import MetadataIO
+
+
+class AutosaveService:
+    """Background autosave of a project into <project_path>/.autosave
+    (beside the file for .aether containers, see ContainerIO.sidecar_dir)
+    
+    maybe_autosave() runs on the GUI thread and only snapshots: metadata plus
+    copies of the layers edited since the last autosave. Compression and
+    writing happen on a single worker thread. Layer files get fresh names and
+    metadata.json is replaced last, so the autosave directory is consistent
+    whenever a write is interrupted.
+    """
+    
+    def __init__(self, interval_ms: int = AUTOSAVE_INTERVAL_MS, min_changes: int = AUTOSAVE_MIN_CHANGES):
+        self.interval_ms = interval_ms  # 0 disables autosave
+        self.min_changes = min_changes
+        self.project = None
+        self.pending_changes = 0
+        self.last_error: Optional[str] = None
+        
+        self._changed_layers = set()  # Layers edited since their last autosave
+        self._written: Dict[object, str] = {}  # Layer -> file name in the current autosave
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self._future = None
+    
+    @staticmethod
+    def autosave_dir(project_path: str) -> Path:
+        return ContainerIO.sidecar_dir(project_path) / AUTOSAVE_DIR
+    
+    @staticmethod
+    def newer_autosave(project_path: str) -> Optional[Path]:
+        """Autosave directory of a project if it is newer than the saved project"""
+        autosave_meta = AutosaveService.autosave_dir(project_path) / "metadata.json"
+        project_meta = Path(project_path)
+        if not ContainerIO.is_container(project_path):
+            project_meta = project_meta / "metadata.json"
+        if not autosave_meta.exists():
+            return None
+        if project_meta.exists() and project_meta.stat().st_mtime >= autosave_meta.stat().st_mtime:
+            return None
+        return autosave_meta.parent
+    
+    @property
+    def busy(self) -> bool:
+        return self._future is not None and not self._future.done()
+    
+    def attach(self, project):
+        """Start tracking a (new or opened) project, forgetting the previous one"""
+        self.detach()
+        self.project = project
+        project.changes.subscribe(self._on_change)
+    
+    def detach(self):
+        """Stop tracking the current project (waits for a write in flight)"""
+        self.wait()
+        if self.project is not None:
+            self.project.changes.unsubscribe(self._on_change)
+        self.project = None
+        self.pending_changes = 0
+        self._changed_layers.clear()
+        self._written = {}
+    
+    def maybe_autosave(self) -> bool:
+        """Snapshot and start a background write if enough has changed; True if started"""
+        self.poll()
+        project = self.project
+        if (project is None or not project.project_path or self.interval_ms <= 0 or self.busy
+                or self.pending_changes < self.min_changes
+                or any(layer.load_error for layer in project.layers)):  # Would autosave an empty grid
+            return False
+        
+        metadata = MetadataIO.build_metadata(project)
+        metadata['autosave'] = {'saved_at': time.time(), 'project_path': str(project.project_path)}
+        
+        written = {}
+        snapshots: List[Tuple[str, SimpleNamespace]] = []
+        for layer, layer_meta in zip(project.layers, metadata['layers']):
+            file_name = self._written.get(layer)
+            if file_name is None or layer in self._changed_layers:
+                # Copy now so later edits cannot leak into a half-written autosave
+                file_name = f"{uuid.uuid4().hex}.layer"
+                snapshots.append((file_name, SimpleNamespace(
+                    width=layer.width, height=layer.height, tile_grid=np.array(layer.tile_grid)
+                )))
+            written[layer] = file_name
+            layer_meta['file'] = file_name
+            layer_meta['hash'] = None  # Hashes describe the real save, not the autosave
+        
+        self._written = written
+        self._changed_layers.clear()
+        self.pending_changes = 0
+        self._future = self._executor.submit(
+            AutosaveService._write, self.autosave_dir(project.project_path), metadata, snapshots
+        )
+        return True
+    
+    def poll(self) -> Optional[str]:
+        """Status message once a background write has finished, else None"""
+        if self._future is None or not self._future.done():
+            return None
+        future, self._future = self._future, None
+        
+        error = future.exception()
+        if error is None:
+            self.last_error = None
+            return f"Autosaved to {future.result()}"
+        
+        # Files of this attempt may be missing: rewrite every layer next time
+        self.last_error = str(error)
+        self._written = {}
+        self.pending_changes = max(self.pending_changes, self.min_changes)
+        return f"Autosave failed: {error}"
+    
+    def wait(self):
+        """Block until a write in flight has finished"""
+        if self._future is not None:
+            self._future.exception()
+            self.poll()
+    
+    def discard(self):
+        """Delete the autosave after a manual save made it obsolete"""
+        self.wait()
+        self.pending_changes = 0
+        self._changed_layers.clear()
+        self._written = {}
+        if self.project is not None and self.project.project_path:
+            shutil.rmtree(self.autosave_dir(self.project.project_path), ignore_errors=True)
+    
+    def shutdown(self):
+        """Finish a write in flight and stop the worker thread"""
+        self.detach()
+        self._executor.shutdown(wait=True)
+    
+    def _on_change(self, event):
+        self.pending_changes += 1
+        if event.kind in (ChangeKind.CELLS, ChangeKind.LAYER_ADDED):
+            self._changed_layers.add(event.layer)
+    
+    @staticmethod
+    def _write(target: Path, metadata: dict, snapshots: List[Tuple[str, SimpleNamespace]]) -> str:
+        # Worker thread: layers first, then metadata, then files no longer referenced
+        layers_dir = target / "layers"
+        layers_dir.mkdir(parents=True, exist_ok=True)
+        
+        for file_name, snapshot in snapshots:
+            BinaryLayerIO.save_layer(snapshot, str(layers_dir / file_name))
+        
+        MetadataIO.write_metadata(metadata, str(target / "metadata.json"))
+        
+        referenced = {layer_meta['file'] for layer_meta in metadata['layers']}
+        for path in layers_dir.glob("*.layer"):
+            if path.name not in referenced:
+                path.unlink()
+        return str(target)
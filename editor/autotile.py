@@ -0,0 +1,166 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Auto-tile rules live in project.metadata['autotile']:
+#
+#   {"terrains": {"grass": {"mode": "blob",        # or "wang"
+#                           "tiles": {"255": 12, "0": 40, ...},  # neighbour mask -> tile ID
+#                           "default": 12,         # used for masks without an entry
+#                           "edges_connect": true}}}  # map border counts as same terrain
+#
+# Wang masks use 4 bits (N=1, E=2, S=4, W=8). Blob masks use 8 bits
+# (N=1, NE=2, E=4, SE=8, S=16, SW=32, W=64, NW=128) with corners only kept
+# when both adjacent edges are set, which leaves the usual 47 tiles.
+
+WANG_NEIGHBOURS = ((0, -1, 1), (1, 0, 2), (0, 1, 4), (-1, 0, 8))
+BLOB_NEIGHBOURS = (
+    (0, -1, 1), (1, -1, 2), (1, 0, 4), (1, 1, 8),
+    (0, 1, 16), (-1, 1, 32), (-1, 0, 64), (-1, -1, 128)
+)
+
+
+class AutoTileRule:
+    """Mask-to-tile lookup for one terrain"""
+    
+    def __init__(self, name: str, data: dict):
+        self.name = name
+        self.mode = data.get('mode', 'blob')
+        self.neighbours = BLOB_NEIGHBOURS if self.mode == 'blob' else WANG_NEIGHBOURS
+        self.edges_connect = data.get('edges_connect', True)
+        
+        tiles = {int(mask): int(tile_id) for mask, tile_id in data.get('tiles', {}).items()}
+        default = int(data.get('default', next(iter(tiles.values()), 0)))
+        
+        self.lookup = np.full(256 if self.mode == 'blob' else 16, default, dtype=np.int32)
+        for mask, tile_id in tiles.items():
+            self.lookup[mask] = tile_id
+        
+        # Any tile produced by the rule marks its cell as part of the terrain
+        self.members = np.unique(self.lookup)
+        self.members = self.members[self.members != 0]
+    
+    def is_member(self, tile_ids: np.ndarray) -> np.ndarray:
+        return np.isin(tile_ids, self.members)
+    
+    def canonical(self, masks: np.ndarray) -> np.ndarray:
+        """Drop blob corner bits whose adjacent edges are not both set"""
+        if self.mode != 'blob':
+            return masks
+        keep = np.uint8(0x55)  # N, E, S, W
+        for corner, a, b in ((2, 1, 4), (8, 4, 16), (32, 16, 64), (128, 64, 1)):
+            both = ((masks & a) != 0) & ((masks & b) != 0)
+            keep = keep | np.where(both, np.uint8(corner), np.uint8(0))
+        return masks & keep
+
+
+class _TerrainCache:
+    """Membership (padded by one cell) and neighbour masks of one layer/terrain"""
+    
+    def __init__(self, layer, rule: AutoTileRule):
+        self.layer = layer
+        self.padded = np.full((layer.height + 2, layer.width + 2), rule.edges_connect, dtype=bool)
+        self.padded[1:-1, 1:-1] = rule.is_member(layer.tile_grid)
+        self.masks = AutoTileEngine._masks_in_rect(self, rule, 0, 0, layer.width, layer.height)
+
+
+class AutoTileEngine:
+    """Picks tiles from neighbour bitmasks, recomputing only around edited cells"""
+    
+    def __init__(self):
+        self.rules: Dict[str, AutoTileRule] = {}
+        self._caches: Dict[Tuple[int, str], _TerrainCache] = {}
+        self._applying = False
+    
+    def set_rules(self, metadata: dict):
+        """Load rules from project metadata (the 'autotile' entry) and drop caches"""
+        terrains = (metadata or {}).get('autotile', {}).get('terrains', {})
+        self.rules = {name: AutoTileRule(name, data) for name, data in terrains.items()}
+        self.clear()
+    
+    def clear(self):
+        """Forget cached masks and stop listening to layers"""
+        for cache in self._caches.values():
+            cache.layer.changes.unsubscribe(self._on_layer_changed)
+        self._caches.clear()
+    
+    def paint(self, layer, indices: np.ndarray, terrain: str, history):
+        """Add cells to a terrain and re-tile them plus their neighbours as one write"""
+        rule = self.rules.get(terrain)
+        if rule is None or len(indices) == 0:
+            return
+        cache = self._cache(layer, rule)
+        
+        rows, cols = np.divmod(indices, layer.width)
+        cache.padded[rows + 1, cols + 1] = True
+        
+        # Only the 3x3 neighbourhood of each edited cell can change its mask
+        affected = self._neighbourhood(rows, cols, layer.width, layer.height)
+        rows, cols = np.divmod(affected, layer.width)
+        masks = self._masks_at(cache, rule, rows, cols)
+        cache.masks[rows, cols] = masks
+        
+        members = cache.padded[rows + 1, cols + 1]
+        self._applying = True
+        try:
+            history.apply(layer, affected[members], rule.lookup[masks[members]])
+        finally:
+            self._applying = False
+    
+    def masks(self, layer, terrain: str) -> Optional[np.ndarray]:
+        """Current neighbour masks of a layer for a terrain (computed on first use)"""
+        rule = self.rules.get(terrain)
+        return None if rule is None else self._cache(layer, rule).masks
+    
+    def _cache(self, layer, rule: AutoTileRule) -> _TerrainCache:
+        key = (id(layer), rule.name)
+        cache = self._caches.get(key)
+        if cache is None:
+            # First use: membership and masks for the whole layer at once
+            cache = _TerrainCache(layer, rule)
+            self._caches[key] = cache
+            layer.changes.subscribe(self._on_layer_changed)
+        return cache
+    
+    def _on_layer_changed(self, event):
+        # Keep caches in sync with edits made by other tools (or undo)
+        if self._applying or event.rect is None:
+            return
+        
+        layer = event.layer
+        x0, y0, x1, y1 = event.rect
+        for (layer_id, terrain), cache in self._caches.items():
+            if layer_id != id(layer):
+                continue
+            rule = self.rules[terrain]
+            if cache.masks.shape != layer.tile_grid.shape:
+                self._caches[(layer_id, terrain)] = _TerrainCache(layer, rule)
+                continue
+            
+            cache.padded[y0 + 1:y1 + 1, x0 + 1:x1 + 1] = rule.is_member(layer.tile_grid[y0:y1, x0:x1])
+            mx0, my0 = max(x0 - 1, 0), max(y0 - 1, 0)
+            mx1, my1 = min(x1 + 1, layer.width), min(y1 + 1, layer.height)
+            cache.masks[my0:my1, mx0:mx1] = self._masks_in_rect(cache, rule, mx0, my0, mx1, my1)
+    
+    @staticmethod
+    def _masks_in_rect(cache: _TerrainCache, rule: AutoTileRule, x0: int, y0: int, x1: int, y1: int):
+        # Convolve membership with the neighbour bit weights using shifted slices
+        masks = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for dx, dy, bit in rule.neighbours:
+            shifted = cache.padded[y0 + 1 + dy:y1 + 1 + dy, x0 + 1 + dx:x1 + 1 + dx]
+            masks |= shifted.astype(np.uint8) * np.uint8(bit)
+        return rule.canonical(masks)
+    
+    @staticmethod
+    def _masks_at(cache: _TerrainCache, rule: AutoTileRule, rows: np.ndarray, cols: np.ndarray):
+        masks = np.zeros(len(rows), dtype=np.uint8)
+        for dx, dy, bit in rule.neighbours:
+            masks |= cache.padded[rows + 1 + dy, cols + 1 + dx].astype(np.uint8) * np.uint8(bit)
+        return rule.canonical(masks)
+    
+    @staticmethod
+    def _neighbourhood(rows: np.ndarray, cols: np.ndarray, width: int, height: int) -> np.ndarray:
+        offsets = np.arange(-1, 2)
+        r = (rows[:, None, None] + offsets[None, :, None]).repeat(3, axis=2).ravel()
+        c = (cols[:, None, None] + offsets[None, None, :]).repeat(3, axis=1).ravel()
+        inside = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+        return np.unique(r[inside] * width + c[inside])
@@ -0,0 +1,69 @@
+import zlib
+import numpy as np
+from typing import Iterator, List, Optional, Tuple
+
+from core.constants import CLIPBOARD_COMPRESS_THRESHOLD
+
+
+class ClipboardBuffer:
+    """Rectangular block of tiles copied from one or more layers"""
+    
+    def __init__(self, width: int, height: int, blocks: List[Tuple[str, np.ndarray]]):
+        self.width = width
+        self.height = height
+        self.layer_names = [name for name, _ in blocks]
+        
+        # Small blocks stay as arrays, large ones are kept zlib-compressed
+        self._payloads = [self._pack(block) for _, block in blocks]
+    
+    @property
+    def single_layer(self) -> bool:
+        return len(self.layer_names) == 1
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(len(p) if isinstance(p, bytes) else p.nbytes for p in self._payloads)
+    
+    def block(self, index: int) -> np.ndarray:
+        """Decoded tile block for one copied layer"""
+        payload = self._payloads[index]
+        if isinstance(payload, bytes):
+            data = np.frombuffer(zlib.decompress(payload), dtype=np.int32)
+            return data.reshape((self.height, self.width))
+        return payload
+    
+    def blocks(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """Yield (layer_name, block) for every copied layer"""
+        for i, name in enumerate(self.layer_names):
+            yield name, self.block(i)
+    
+    @staticmethod
+    def _pack(block: np.ndarray):
+        block = np.ascontiguousarray(block, dtype=np.int32)
+        if block.nbytes >= CLIPBOARD_COMPRESS_THRESHOLD:
+            return zlib.compress(block.tobytes(), 1)
+        return block.copy()
+
+
+class FloatingPaste:
+    """Clipboard contents being positioned before they are committed"""
+    
+    def __init__(self, buffer: ClipboardBuffer, x: int, y: int):
+        self.buffer = buffer
+        self.x = x
+        self.y = y
+        self._preview: Optional[np.ndarray] = None
+    
+    @property
+    def rect(self) -> Tuple[int, int, int, int]:
+        return self.x, self.y, self.x + self.buffer.width, self.y + self.buffer.height
+    
+    def contains(self, grid_x: int, grid_y: int) -> bool:
+        x0, y0, x1, y1 = self.rect
+        return x0 <= grid_x < x1 and y0 <= grid_y < y1
+    
+    def preview_block(self) -> np.ndarray:
+        """Block drawn while floating (the first copied layer, decoded once)"""
+        if self._preview is None:
+            self._preview = self.buffer.block(0)
+        return self._preview
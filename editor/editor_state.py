@@ -1,3 +1,8 @@
+from editor.history import EditHistory
+from editor.autotile import AutoTileEngine
+from editor.autosave import AutosaveService
+from editor.project_loader import ProgressiveLoader
+
 class EditorState:
     """Manages global editor state"""
     
@@ -8,6 +13,49 @@ class EditorState:
         self.grid_visible = True
         self.mouse_grid_x = 0
         self.mouse_grid_y = 0
+        self.history = EditHistory()
+        self.autosave = AutosaveService()
+        self.journal = None  # EditJournal of the open project, set by the main window
+        self.loader = ProgressiveLoader()  # Streams layers in after a project is opened
+        self.status_callback = None  # Shows tool feedback in the status bar, set by the main window
+        
+        # Visible cells and rectangular selection as (x0, y0, x1, y1), end exclusive
+        self.viewport_rect = None
+        self.selection_rect = None
+        
+        # Clipboard and a paste that is still being positioned
+        self.clipboard = None
+        self.floating_paste = None
+        self.clipboard_all_layers = False  # Copy/cut every layer instead of the active one
+        
+        # Brush footprint for paint/erase strokes
+        self.brush_size = 1
+        self.brush_shape = 'square'  # 'square' or 'circle'
+        
+        # Auto-tiling rules and the terrain painted by the auto-tile tool
+        self.autotile = AutoTileEngine()
+        self.autotile_terrain = None
+        
+        # Stamp brush: a 2D pattern of tile IDs, or {tile_id: weight} for random picks
+        self.stamp_pattern = None
+        self.stamp_weights = None
+        self.stamp_seed = 0  # Also restarts stamp_strokes, see the setter
+        
+        # Fill tool options
+        self.fill_connectivity = 4  # 4 or 8
+        self.fill_global = False  # Replace every matching tile instead of a connected region
+        self.fill_limit = None  # None, 'viewport' or 'selection'
+    
+    @property
+    def stamp_seed(self) -> int:
+        """Seed of the random stamp brush"""
+        return self._stamp_seed
+    
+    @stamp_seed.setter
+    def stamp_seed(self, seed: int):
+        # Strokes are numbered from the seed on, so setting it (even to the same value) replays them
+        self._stamp_seed = seed
+        self.stamp_strokes = 0
     
     def get_active_layer(self):
         """Get currently active layer"""
@@ -25,3 +73,8 @@ class EditorState:
     def set_tool(self, tool_name: str):
         """Set current tool"""
         self.current_tool = tool_name
+    
+    def show_status(self, message: str):
+        """Report something to the user (a tool refusing an action, for example)"""
+        if self.status_callback:
+            self.status_callback(message)
@@ -0,0 +1,267 @@
+import numpy as np
+from typing import Callable, List, Optional, Tuple, Union
+
+from core.constants import UNDO_MEMORY_BUDGET
+
+
+class LayerDelta:
+    """Cells changed on one layer: flat indices with their old and new tile IDs"""
+    
+    __slots__ = ('layer', 'indices', 'old_ids', 'new_ids')
+    
+    def __init__(self, layer, indices: np.ndarray, old_ids: np.ndarray, new_ids: np.ndarray):
+        self.layer = layer
+        self.indices = indices
+        self.old_ids = old_ids
+        self.new_ids = new_ids
+    
+    @property
+    def nbytes(self) -> int:
+        return self.indices.nbytes + self.old_ids.nbytes + self.new_ids.nbytes
+    
+    @property
+    def cells(self) -> np.ndarray:
+        return self.indices
+    
+    def undo(self) -> np.ndarray:
+        """Write the old IDs back, returning them"""
+        self.layer.write_cells(self.indices, self.old_ids)
+        return self.old_ids
+    
+    def redo(self) -> np.ndarray:
+        """Write the new IDs again, returning them"""
+        self.layer.write_cells(self.indices, self.new_ids)
+        return self.new_ids
+
+
+class RegionDelta:
+    """A rectangle rewritten on one layer, stored as its origin plus one block
+    
+    Only the block the layer does not currently hold is kept: the old tiles after
+    the edit or a redo, the new tiles after an undo. Undo and redo swap it with the
+    layer's cells, so a region costs 4 bytes per cell instead of 12 as flat cells.
+    """
+    
+    __slots__ = ('layer', 'x', 'y', 'block')
+    
+    def __init__(self, layer, x: int, y: int, block: np.ndarray):
+        self.layer = layer
+        self.x = x
+        self.y = y
+        self.block = block
+    
+    @property
+    def nbytes(self) -> int:
+        return self.block.nbytes
+    
+    @property
+    def cells(self) -> Tuple[int, int]:
+        return self.x, self.y
+    
+    def undo(self) -> np.ndarray:
+        """Write the old block back, returning it"""
+        return self._swap()
+    
+    def redo(self) -> np.ndarray:
+        """Write the new block again, returning it"""
+        return self._swap()
+    
+    def _swap(self) -> np.ndarray:
+        written = self.block
+        self.block = self.layer.write_region(self.x, self.y, written)
+        return written
+
+
+class HistoryEntry:
+    """One undoable operation (a stroke, a fill, a paste...)"""
+    
+    def __init__(self, label: str, deltas: List[Union[LayerDelta, RegionDelta]]):
+        self.label = label
+        self.deltas = deltas
+        self.nbytes = sum(delta.nbytes for delta in deltas)
+
+
+class EditHistory:
+    """Undo/redo journal storing per-layer cell deltas instead of grid copies"""
+    
+    def __init__(self, max_bytes: int = UNDO_MEMORY_BUDGET):
+        self.max_bytes = max_bytes
+        self.undo_stack: List[HistoryEntry] = []
+        self.redo_stack: List[HistoryEntry] = []
+        self.nbytes = 0
+        
+        # Called as fn(layer, cells, tile_ids) for every committed, undone or redone delta:
+        # cells is flat indices with one tile ID each, or the (x, y) origin of a 2D block
+        self.listeners: List[Callable] = []
+        
+        # Open transaction: label plus raw records grouped by layer
+        self._label: Optional[str] = None
+        self._pending = {}
+    
+    @property
+    def in_transaction(self) -> bool:
+        return self._label is not None
+    
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack) or bool(self._pending)
+    
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack) and not self._pending
+    
+    def begin(self, label: str):
+        """Start grouping edits into one entry (commits any open one first)"""
+        self.commit()
+        self._label = label
+    
+    def record(self, layer, indices: np.ndarray, old_ids: np.ndarray, new_ids):
+        """Record cells already written to a layer (indices unique within one call)"""
+        if len(indices) == 0:
+            return
+        
+        new_ids = np.broadcast_to(np.asarray(new_ids, dtype=np.int32), np.shape(indices))
+        records = self._pending.setdefault(id(layer), (layer, []))[1]
+        records.append((np.asarray(indices), np.asarray(old_ids, dtype=np.int32), new_ids))
+        self._commit_loose_edit()
+    
+    def record_region(self, layer, x: int, y: int, old_block: np.ndarray, new_block: np.ndarray):
+        """Record a 2D block already written at (x, y) of a layer, without expanding it to cells"""
+        if old_block.size == 0:
+            return
+        
+        records = self._pending.setdefault(id(layer), (layer, []))[1]
+        records.append((x, y, np.ascontiguousarray(old_block, dtype=np.int32),
+                        np.ascontiguousarray(new_block, dtype=np.int32)))
+        self._commit_loose_edit()
+    
+    def apply(self, layer, indices: np.ndarray, tile_ids):
+        """Write tile IDs at flat indices of a layer and record the change"""
+        self.record(layer, indices, layer.write_cells(indices, tile_ids), tile_ids)
+    
+    def apply_region(self, layer, x: int, y: int, block: np.ndarray):
+        """Write a 2D block of tile IDs at (x, y) as one slice assignment and record the change"""
+        self.record_region(layer, x, y, layer.write_region(x, y, block), block)
+    
+    def commit(self):
+        """Close the open transaction and push it as a single entry"""
+        label, pending = self._label, self._pending
+        self._label = None
+        self._pending = {}
+        
+        deltas, new_ids = [], []
+        for layer, records in pending.values():
+            compacted = self._compact(layer, records)
+            if compacted is not None:
+                deltas.append(compacted[0])
+                new_ids.append(compacted[1])
+        
+        if label is None or not deltas:
+            return
+        
+        entry = HistoryEntry(label, deltas)
+        self._notify(deltas, new_ids)
+        self.undo_stack.append(entry)
+        self.nbytes += entry.nbytes
+        
+        # A new edit invalidates everything that was undone
+        self.nbytes -= sum(e.nbytes for e in self.redo_stack)
+        self.redo_stack.clear()
+        self._enforce_budget()
+    
+    def undo(self) -> Optional[str]:
+        """Revert the latest entry, returning its label"""
+        self.commit()
+        if not self.undo_stack:
+            return None
+        
+        entry = self.undo_stack.pop()
+        deltas = entry.deltas[::-1]
+        self._notify(deltas, [delta.undo() for delta in deltas])
+        
+        self.redo_stack.append(entry)
+        return entry.label
+    
+    def redo(self) -> Optional[str]:
+        """Re-apply the latest undone entry, returning its label"""
+        self.commit()
+        if not self.redo_stack:
+            return None
+        
+        entry = self.redo_stack.pop()
+        self._notify(entry.deltas, [delta.redo() for delta in entry.deltas])
+        
+        self.undo_stack.append(entry)
+        return entry.label
+    
+    def clear(self):
+        """Drop all history (e.g. when switching projects)"""
+        self._label = None
+        self._pending = {}
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.nbytes = 0
+    
+    def _commit_loose_edit(self):
+        # Edits outside begin()/commit() become their own entry
+        if self._label is None:
+            self._label = "Edit"
+            self.commit()
+    
+    def _notify(self, deltas: list, tile_ids: List[np.ndarray]):
+        for listener in self.listeners:
+            for delta, ids in zip(deltas, tile_ids):
+                listener(delta.layer, delta.cells, ids)
+    
+    def _enforce_budget(self):
+        # Drop oldest entries; the newest one is always kept even if it alone is over budget
+        while self.nbytes > self.max_bytes and len(self.undo_stack) > 1:
+            self.nbytes -= self.undo_stack.pop(0).nbytes
+    
+    @staticmethod
+    def _compact(layer, records) -> Optional[tuple]:
+        # Merge a transaction's records into one delta plus the tile IDs it wrote.
+        # A lone region stays a region; otherwise each cell appears once, with
+        # the first old value and the last new value winning.
+        if len(records) == 1 and len(records[0]) == 4:
+            x, y, old_block, new_block = records[0]
+            if np.array_equal(old_block, new_block):
+                return None
+            return RegionDelta(layer, x, y, old_block), new_block
+        
+        records = [EditHistory._region_cells(layer, *r) if len(r) == 4 else r for r in records]
+        if len(records) == 1:
+            indices, old_ids, new_ids = records[0]
+        else:
+            indices = np.concatenate([r[0] for r in records])
+            old_ids = np.concatenate([r[1] for r in records])
+            new_ids = np.concatenate([r[2] for r in records])
+            
+            unique, first = np.unique(indices, return_index=True)
+            _, last_reversed = np.unique(indices[::-1], return_index=True)
+            last = len(indices) - 1 - last_reversed
+            
+            indices, old_ids, new_ids = unique, old_ids[first], new_ids[last]
+        
+        changed = old_ids != new_ids
+        delta = EditHistory._make_delta(layer, indices[changed], old_ids[changed], new_ids[changed])
+        return None if delta is None else (delta, delta.new_ids)
+    
+    @staticmethod
+    def _region_cells(layer, x: int, y: int, old_block: np.ndarray, new_block: np.ndarray) -> tuple:
+        # A region record as flat indices with old and new IDs, for merging with other records
+        h, w = old_block.shape
+        index_dtype = np.int32 if layer.tile_grid.size < 2 ** 31 else np.int64
+        rows = np.arange(y, y + h, dtype=index_dtype)[:, None]
+        cols = np.arange(x, x + w, dtype=index_dtype)[None, :]
+        return (rows * layer.width + cols).ravel(), old_block.ravel(), new_block.ravel()
+    
+    @staticmethod
+    def _make_delta(layer, indices, old_ids, new_ids) -> Optional[LayerDelta]:
+        if len(indices) == 0:
+            return None
+        index_dtype = np.int32 if layer.tile_grid.size < 2 ** 31 else np.int64
+        return LayerDelta(
+            layer,
+            np.ascontiguousarray(indices, dtype=index_dtype),
+            np.ascontiguousarray(old_ids, dtype=np.int32),
+            np.ascontiguousarray(new_ids, dtype=np.int32)
+        )
@@ -0,0 +1,381 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+from core.events import ChangeEvent, ChangeKind
+from fileio.project_io import ProjectIO
+
+
+LAYER_PROPERTIES = ('type', 'visible', 'locked', 'opacity', 'z_index', 'interacts_with_layers')
+
+
+def layer_properties(layer) -> Dict:
+    """A layer's diffable properties as plain values (the metadata.json layer fields)"""
+    return {
+        'type': layer.layer_type.value,
+        'visible': layer.visible,
+        'locked': layer.locked,
+        'opacity': layer.opacity,
+        'z_index': layer.z_index,
+        'interacts_with_layers': layer.interacts_with_layers,
+    }
+
+
+class CellRuns:
+    """Changed cells of one layer: runs of consecutive flat indices with their old and new tile IDs"""
+    
+    __slots__ = ('starts', 'lengths', 'old_ids', 'new_ids')
+    
+    def __init__(self, starts: np.ndarray, lengths: np.ndarray, old_ids: np.ndarray, new_ids: np.ndarray):
+        self.starts = starts
+        self.lengths = lengths
+        self.old_ids = old_ids
+        self.new_ids = new_ids
+    
+    @property
+    def count(self) -> int:
+        return len(self.old_ids)
+    
+    def indices(self) -> np.ndarray:
+        """Flat indices of every cell in the runs, in order"""
+        offsets = np.cumsum(self.lengths) - self.lengths
+        return np.repeat(self.starts - offsets, self.lengths) + np.arange(self.count, dtype=np.int64)
+    
+    def reversed(self) -> 'CellRuns':
+        return CellRuns(self.starts, self.lengths, self.new_ids, self.old_ids)
+    
+    @staticmethod
+    def from_indices(indices: np.ndarray, old_ids: np.ndarray, new_ids: np.ndarray) -> Optional['CellRuns']:
+        """Group sorted, unique flat indices into runs (None when there are none)"""
+        if len(indices) == 0:
+            return None
+        breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+        bounds = np.concatenate(([0], breaks, [len(indices)]))
+        return CellRuns(
+            np.asarray(indices[bounds[:-1]], dtype=np.int64),
+            np.diff(bounds).astype(np.int64),
+            np.ascontiguousarray(old_ids, dtype=np.int32),
+            np.ascontiguousarray(new_ids, dtype=np.int32)
+        )
+
+
+class LayerChange:
+    """One layer's part of a patch
+    
+    'change': properties maps a property to (old, new) and runs holds changed cells (or None).
+    'add' / 'remove': properties holds every property of the layer and grid its tile IDs, so
+    either direction of the patch can rebuild it.
+    """
+    
+    __slots__ = ('op', 'name', 'properties', 'runs', 'grid')
+    
+    def __init__(self, op: str, name: str, properties: dict, runs: Optional[CellRuns] = None,
+                 grid: Optional[np.ndarray] = None):
+        self.op = op
+        self.name = name
+        self.properties = properties
+        self.runs = runs
+        self.grid = grid
+    
+    def reversed(self) -> 'LayerChange':
+        if self.op == 'change':
+            properties = {key: (new, old) for key, (old, new) in self.properties.items()}
+            return LayerChange('change', self.name, properties, self.runs.reversed() if self.runs else None)
+        return LayerChange('remove' if self.op == 'add' else 'add', self.name, self.properties, grid=self.grid)
+    
+    def __str__(self) -> str:
+        if self.op != 'change':
+            height, width = self.grid.shape
+            return f"{'+' if self.op == 'add' else '-'} {self.name} ({width}x{height})"
+        parts = [f"{key} {old!r} -> {new!r}" for key, (old, new) in self.properties.items()]
+        if self.runs is not None:
+            parts.insert(0, f"{self.runs.count} cells in {len(self.runs.starts)} runs")
+        return f"~ {self.name}: {', '.join(parts)}"
+
+
+class ProjectPatch:
+    """Differences between two projects, layer by layer (layers are matched by name)"""
+    
+    def __init__(self, changes: Optional[List[LayerChange]] = None):
+        self.changes = changes or []
+    
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+    
+    @property
+    def cell_count(self) -> int:
+        """Changed cells, not counting added or removed layers"""
+        return sum(change.runs.count for change in self.changes if change.runs is not None)
+    
+    def reversed(self) -> 'ProjectPatch':
+        """Patch that undoes this one"""
+        return ProjectPatch([change.reversed() for change in reversed(self.changes)])
+    
+    def apply(self, project, check: bool = True):
+        """Apply to a project matching the patch's old side, in place
+        
+        With check, the project is verified first (layers present or absent, old property
+        values and old cells) and ValueError is raised before anything is modified.
+        """
+        if check:
+            problems = self.check(project)
+            if problems:
+                raise ValueError("Patch does not apply:\n" + "\n".join(problems))
+        
+        from core.models import Layer
+        
+        layers = {layer.name: layer for layer in project.layers}
+        with project.changes.transaction():
+            for change in self.changes:
+                if change.op == 'remove':
+                    # Not remove_layer(): that renumbers z_index, which the patch carries itself
+                    layer = layers.pop(change.name)
+                    project.layers.remove(layer)
+                    layer.changes.unsubscribe(project.changes.publish)
+                    project.changes.publish(ChangeEvent(ChangeKind.LAYER_REMOVED, layer))
+                elif change.op == 'add':
+                    height, width = change.grid.shape
+                    layer = Layer(change.name, width, height)
+                    ProjectIO._apply_layer_meta(layer, dict(change.properties, name=change.name))
+                    layer.tile_grid = change.grid.copy()
+                    project.append_layer(layer)
+                    layers[change.name] = layer
+                else:
+                    layer = layers[change.name]
+                    if change.properties:
+                        properties = layer_properties(layer)
+                        properties.update({key: new for key, (_, new) in change.properties.items()})
+                        ProjectIO._apply_layer_meta(layer, dict(properties, name=layer.name))
+                    if change.runs is not None:
+                        layer.write_cells(change.runs.indices(), change.runs.new_ids)
+            
+            project.layers.sort(key=lambda l: l.z_index)
+            project.changes.publish(ChangeEvent(ChangeKind.LAYER_REORDERED))
+    
+    def check(self, project) -> List[str]:
+        """Reasons the patch does not apply to a project (empty when it does)"""
+        problems = []
+        present = {layer.name: layer for layer in project.layers}
+        for change in self.changes:
+            if change.op == 'add':
+                if change.name in present:
+                    problems.append(f"layer '{change.name}' already exists")
+                present[change.name] = None  # Added by this patch: nothing to compare against
+                continue
+            if change.name not in present:
+                problems.append(f"layer '{change.name}' is missing")
+                continue
+            
+            layer = present[change.name]
+            if change.op == 'remove':
+                del present[change.name]
+                continue
+            if layer is None:
+                continue
+            properties = layer_properties(layer)
+            for key, (old, _) in change.properties.items():
+                if properties.get(key) != old:
+                    problems.append(f"layer '{change.name}': {key} is {properties.get(key)!r}, expected {old!r}")
+            if change.runs is not None:
+                indices = change.runs.indices()
+                if int(indices[-1]) >= layer.tile_grid.size:
+                    problems.append(f"layer '{change.name}': cells outside the layer")
+                else:
+                    differing = np.count_nonzero(layer.tile_grid.reshape(-1)[indices] != change.runs.old_ids)
+                    if differing:
+                        problems.append(f"layer '{change.name}': {differing} cells differ from the patch's old side")
+        return problems
+
+
+class MergeConflict:
+    """Something both sides changed differently; the merge keeps ours
+    
+    kind is 'cells' (indices with base, ours and theirs tile IDs), 'property' (detail names it)
+    or 'layer' (added, removed or resized on one side while the other changed it).
+    """
+    
+    __slots__ = ('layer', 'kind', 'detail', 'width', 'indices', 'base_ids', 'ours_ids', 'theirs_ids')
+    
+    def __init__(self, layer: str, kind: str, detail: str = '', width: int = 0, indices=None,
+                 base_ids=None, ours_ids=None, theirs_ids=None):
+        self.layer = layer
+        self.kind = kind
+        self.detail = detail
+        self.width = width
+        self.indices = indices
+        self.base_ids = base_ids
+        self.ours_ids = ours_ids
+        self.theirs_ids = theirs_ids
+    
+    def positions(self):
+        """Conflicting cells as (xs, ys) arrays"""
+        ys, xs = np.divmod(self.indices, self.width)
+        return xs, ys
+    
+    def __str__(self) -> str:
+        if self.kind == 'cells':
+            xs, ys = self.positions()
+            return (f"layer '{self.layer}': {len(self.indices)} conflicting cells in "
+                    f"({int(xs.min())}, {int(ys.min())})-({int(xs.max())}, {int(ys.max())})")
+        return f"layer '{self.layer}': {self.detail}"
+
+
+class MergeResult:
+    """A three-way merge: the patch taking ours to the merged project, and the conflicts left as ours"""
+    
+    __slots__ = ('patch', 'conflicts')
+    
+    def __init__(self, patch: ProjectPatch, conflicts: List[MergeConflict]):
+        self.patch = patch
+        self.conflicts = conflicts
+
+
+class ProjectDiff:
+    """Vectorized layer-by-layer comparison and three-way merge of projects
+    
+    Layers are matched by name, so a rename shows up as a removed plus an added layer, as does
+    a layer whose size changed. Cells are compared with one numpy pass per layer.
+    """
+    
+    @staticmethod
+    def diff(old, new) -> ProjectPatch:
+        """Patch that turns project old into project new"""
+        new_names = {layer.name for layer in new.layers}
+        old_layers = {layer.name: layer for layer in old.layers}
+        changes = []
+        
+        for layer in old.layers:
+            if layer.name not in new_names:
+                changes.append(ProjectDiff._whole_layer('remove', layer))
+        
+        for layer in new.layers:
+            previous = old_layers.get(layer.name)
+            if previous is None:
+                changes.append(ProjectDiff._whole_layer('add', layer))
+            elif previous.tile_grid.shape != layer.tile_grid.shape:
+                changes.append(ProjectDiff._whole_layer('remove', previous))
+                changes.append(ProjectDiff._whole_layer('add', layer))
+            else:
+                change = ProjectDiff._layer_change(previous, layer)
+                if change is not None:
+                    changes.append(change)
+        return ProjectPatch(changes)
+    
+    @staticmethod
+    def merge(base, ours, theirs) -> MergeResult:
+        """Three-way merge of theirs into ours, both edited from base
+        
+        Changes only theirs made are taken; where both sides changed a cell, property or layer
+        differently ours is kept and a MergeConflict reported. Apply result.patch to ours.
+        """
+        ours_layers = {layer.name: layer for layer in ours.layers}
+        base_layers = {layer.name: layer for layer in base.layers}
+        changes, conflicts = [], []
+        removed = set()
+        skipped = set()  # Resized layers whose 'add' half must not be merged on its own
+        
+        theirs_changes = ProjectDiff.diff(base, theirs).changes
+        # diff() writes a resize as a 'remove' plus an 'add' of the same name
+        added = {change.name: change for change in theirs_changes if change.op == 'add'}
+        
+        for change in theirs_changes:
+            name = change.name
+            layer = None if name in removed else ours_layers.get(name)
+            
+            if change.op == 'add':
+                if name in skipped:
+                    continue
+                if layer is None:
+                    changes.append(change)
+                elif not ProjectDiff._same_layer(layer, change.properties, change.grid):
+                    conflicts.append(MergeConflict(name, 'layer', "added on both sides with different content"))
+            
+            elif change.op == 'remove':
+                resized = added.get(name)
+                if layer is None:
+                    if resized is not None:
+                        conflicts.append(MergeConflict(name, 'layer', "resized in theirs but removed in ours"))
+                        skipped.add(name)
+                    continue  # Otherwise removed on both sides
+                if resized is not None and ProjectDiff._same_layer(layer, resized.properties, resized.grid):
+                    skipped.add(name)  # Ours already made the same resize
+                    continue
+                
+                base_layer = base_layers[name]
+                if ProjectDiff._same_layer(layer, layer_properties(base_layer), base_layer.tile_grid):
+                    changes.append(ProjectDiff._whole_layer('remove', layer))
+                    removed.add(name)
+                else:
+                    what = "resized" if resized is not None else "removed"
+                    conflicts.append(MergeConflict(name, 'layer', f"{what} in theirs but changed in ours"))
+                    skipped.add(name)
+            
+            elif layer is None:
+                conflicts.append(MergeConflict(name, 'layer', "changed in theirs but removed in ours"))
+            elif layer.tile_grid.shape != base_layers[name].tile_grid.shape:
+                conflicts.append(MergeConflict(name, 'layer', "resized in ours but changed in theirs"))
+            else:
+                merged = ProjectDiff._merge_layer(layer, change, conflicts)
+                if merged is not None:
+                    changes.append(merged)
+        
+        return MergeResult(ProjectPatch(changes), conflicts)
+    
+    @staticmethod
+    def _merge_layer(layer, change: LayerChange, conflicts: List[MergeConflict]) -> Optional[LayerChange]:
+        # Take theirs' property and cell changes where ours still has the base value
+        ours_properties = layer_properties(layer)
+        properties = {}
+        for key, (base_value, theirs_value) in change.properties.items():
+            ours_value = ours_properties[key]
+            if ours_value == base_value:
+                properties[key] = (ours_value, theirs_value)
+            elif ours_value != theirs_value:
+                conflicts.append(MergeConflict(
+                    layer.name, 'property',
+                    f"{key}: base {base_value!r}, ours {ours_value!r}, theirs {theirs_value!r}"
+                ))
+        
+        runs = None
+        if change.runs is not None:
+            indices = change.runs.indices()
+            base_ids, theirs_ids = change.runs.old_ids, change.runs.new_ids
+            ours_ids = layer.tile_grid.reshape(-1)[indices]
+            
+            take = ours_ids == base_ids
+            runs = CellRuns.from_indices(indices[take], ours_ids[take], theirs_ids[take])
+            
+            conflicting = ~take & (ours_ids != theirs_ids)
+            if conflicting.any():
+                conflicts.append(MergeConflict(
+                    layer.name, 'cells', width=layer.tile_grid.shape[1], indices=indices[conflicting],
+                    base_ids=base_ids[conflicting], ours_ids=ours_ids[conflicting],
+                    theirs_ids=theirs_ids[conflicting]
+                ))
+        
+        if not properties and runs is None:
+            return None
+        return LayerChange('change', layer.name, properties, runs)
+    
+    @staticmethod
+    def _layer_change(old, new) -> Optional[LayerChange]:
+        old_properties, new_properties = layer_properties(old), layer_properties(new)
+        properties = {
+            key: (old_properties[key], new_properties[key])
+            for key in LAYER_PROPERTIES if old_properties[key] != new_properties[key]
+        }
+        
+        old_cells, new_cells = old.tile_grid.reshape(-1), new.tile_grid.reshape(-1)
+        indices = np.flatnonzero(old_cells != new_cells)
+        runs = CellRuns.from_indices(indices, old_cells[indices], new_cells[indices])
+        
+        if not properties and runs is None:
+            return None
+        return LayerChange('change', new.name, properties, runs)
+    
+    @staticmethod
+    def _whole_layer(op: str, layer) -> LayerChange:
+        return LayerChange(op, layer.name, layer_properties(layer), grid=np.array(layer.tile_grid, dtype=np.int32))
+    
+    @staticmethod
+    def _same_layer(layer, properties: dict, grid: np.ndarray) -> bool:
+        return layer_properties(layer) == properties and np.array_equal(layer.tile_grid, grid)
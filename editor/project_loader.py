@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+
+class ProgressiveLoader:
+    """Streams an opened project's tileset and layer cells in on worker threads
+    
+    start() takes the skeleton from ProjectIO.load_skeleton: a project whose layers
+    have properties but empty grids. Workers only read and decode. poll() runs on
+    the GUI thread and installs whatever has finished. Each layer's cells under
+    the initial viewport come first, so the visible part of the map fills in
+    before the rest. Layers stay locked until their full grid is in; a layer
+    that fails to load stays locked and gets Layer.load_error.
+    """
+    
+    def __init__(self, workers: Optional[int] = None):
+        self.project = None
+        self.total = 0
+        self.completed = 0
+        self.errors: List[str] = []
+        
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or min(4, os.cpu_count() or 1), thread_name_prefix="project-load"
+        )
+        self._futures = []  # (future, kind, layer)
+        self._loaded = set()  # Layers whose full grid is installed
+        self._locked = {}  # Layer -> its saved locked flag, restored once loaded
+    
+    @property
+    def active(self) -> bool:
+        return bool(self._futures)
+    
+    def start(self, project, tileset_reader, layer_readers, viewport: Optional[Tuple[int, int, int, int]] = None):
+        """Queue the tileset, viewport regions, then whole layers; forgets any earlier load"""
+        self.cancel()
+        self.project = project
+        self.errors = []
+        
+        if tileset_reader is not None:
+            self._submit('tileset', None, tileset_reader)
+        
+        for layer, _, read_region in layer_readers:
+            self._locked[layer] = layer.locked
+            layer.locked = True
+        
+        # Tiles under the camera for every layer first; a whole layer can take much longer
+        if viewport is not None:
+            x0, y0, x1, y1 = viewport
+            if x1 > x0 and y1 > y0:
+                for layer, _, read_region in layer_readers:
+                    if read_region is not None:
+                        self._submit('region', layer, self._read_region, read_region, x0, y0, x1 - x0, y1 - y0)
+        
+        for layer, read, _ in layer_readers:
+            self._submit('layer', layer, read)
+        
+        self.total = sum(1 for _, kind, _ in self._futures if kind != 'region')
+        self.completed = 0
+    
+    def poll(self) -> SimpleNamespace:
+        """Install finished results (GUI thread); reports what changed"""
+        result = SimpleNamespace(tileset=False, layers=[], finished=False)
+        if not self._futures:
+            return result
+        
+        pending = []
+        for future, kind, layer in self._futures:
+            if not future.done():
+                pending.append((future, kind, layer))
+                continue
+            
+            error = future.exception()
+            if error is not None:
+                if kind != 'region':
+                    self.completed += 1
+                    name = "tileset" if kind == 'tileset' else f"layer '{layer.name}'"
+                    self.errors.append(f"{name}: {error}")
+                if kind == 'layer':
+                    self._fail_layer(layer, error)
+                    result.layers.append(layer)
+                continue
+            
+            if kind == 'tileset':
+                self.project.tileset = future.result()
+                self.completed += 1
+                result.tileset = True
+            elif kind == 'region':
+                self._install_region(layer, future.result())
+            else:
+                self._install_layer(layer, future.result())
+                self.completed += 1
+                result.layers.append(layer)
+        
+        self._futures = pending
+        result.finished = not pending
+        return result
+    
+    def wait(self) -> SimpleNamespace:
+        """Block until everything is loaded and installed"""
+        for future, _, _ in self._futures:
+            future.exception()
+        return self.poll()
+    
+    def cancel(self):
+        """Drop a load in progress (results still running are discarded)"""
+        for future, _, _ in self._futures:
+            future.cancel()
+        self._futures = []
+        self._loaded.clear()
+        self._locked.clear()
+        self.project = None
+        self.total = self.completed = 0
+    
+    def shutdown(self):
+        """Cancel and stop the worker threads"""
+        self.cancel()
+        self._executor.shutdown(wait=True)
+    
+    def _submit(self, kind: str, layer, fn, *args):
+        self._futures.append((self._executor.submit(fn, *args), kind, layer))
+    
+    @staticmethod
+    def _read_region(read_region, x: int, y: int, width: int, height: int):
+        return x, y, read_region(x, y, width, height)
+    
+    def _install_region(self, layer, region):
+        x, y, block = region
+        if block is None or layer in self._loaded:
+            return  # No partial read for this file, or the whole layer already arrived
+        block = block[:max(0, layer.height - y), :max(0, layer.width - x)]  # File may be smaller or larger than the project
+        if block.size:
+            layer.write_region(x, y, block)
+        layer.dirty = False  # Cells match the saved file
+    
+    def _fail_layer(self, layer, error):
+        # The skeleton's empty grid must never overwrite the real file: forget where it was
+        # saved, keep the layer locked and let saves refuse it (see Layer.load_error)
+        layer.load_error = str(error)
+        layer.saved_file = None
+        layer.saved_hash = None
+        layer.dirty = False
+        self._locked.pop(layer, None)
+        self._loaded.add(layer)  # Ignore a viewport region that still arrives
+    
+    def _install_layer(self, layer, grid):
+        layer.width, layer.height = grid.shape[1], grid.shape[0]
+        layer.tile_grid = grid
+        layer.dirty = False
+        layer.locked = self._locked.pop(layer, False)
+        self._loaded.add(layer)
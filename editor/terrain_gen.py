@@ -0,0 +1,139 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class TerrainParams:
+    """Noise settings plus threshold-to-tile rules"""
+    seed: int = 0
+    kind: str = 'value'  # 'value' or 'perlin'
+    scale: float = 32.0  # Cells per lattice step of the first octave
+    octaves: int = 4
+    persistence: float = 0.5
+    lacunarity: float = 2.0
+    # Noise below thresholds[i] becomes tile_ids[i]; above the last threshold, tile_ids[-1]
+    thresholds: List[float] = field(default_factory=lambda: [0.4, 0.6])
+    tile_ids: List[int] = field(default_factory=lambda: [1, 2, 3])
+
+
+class TerrainGenerator:
+    """Seeded, chunk-independent noise terrain generation in numpy"""
+    
+    BAND_ROWS = 256  # Rows per worker task
+    PARALLEL_MIN_CELLS = 2_000_000  # Smaller areas are generated on the calling thread
+    
+    @staticmethod
+    def generate(width: int, height: int, params: TerrainParams,
+                 x0: int = 0, y0: int = 0, workers: Optional[int] = None) -> np.ndarray:
+        """Tile IDs for a width x height area whose top-left cell is (x0, y0)
+        
+        Large areas are split into bands on a thread pool: numpy releases the GIL in
+        the noise math, and threads (unlike forked processes) are safe to start from
+        the GUI while its other worker threads run.
+        """
+        if len(params.tile_ids) != len(params.thresholds) + 1:
+            raise ValueError("tile_ids needs exactly one more entry than thresholds")
+        
+        result = np.empty((height, width), dtype=np.int32)
+        bands = [
+            (x0, y0 + row, width, min(TerrainGenerator.BAND_ROWS, height - row), params)
+            for row in range(0, height, TerrainGenerator.BAND_ROWS)
+        ]
+        
+        if workers is None:
+            workers = os.cpu_count() or 1
+        
+        if workers > 1 and width * height >= TerrainGenerator.PARALLEL_MIN_CELLS:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="terrain") as executor:
+                blocks = executor.map(TerrainGenerator._generate_band, bands)
+                for (_, band_y, _, band_h, _), block in zip(bands, blocks):
+                    result[band_y - y0:band_y - y0 + band_h] = block
+        else:
+            for band in bands:
+                _, band_y, _, band_h, _ = band
+                result[band_y - y0:band_y - y0 + band_h] = TerrainGenerator._generate_band(band)
+        
+        return result
+    
+    @staticmethod
+    def noise(x0: int, y0: int, width: int, height: int, params: TerrainParams) -> np.ndarray:
+        """Fractal noise in [0, 1] for an area; identical however the map is split up"""
+        total = np.zeros((height, width), dtype=np.float32)
+        amplitude = 1.0
+        frequency = 1.0 / params.scale
+        norm = 0.0
+        
+        for octave in range(params.octaves):
+            seed = (params.seed * 1000003 + octave * 7919) & 0xFFFFFFFF
+            total += amplitude * TerrainGenerator._octave(x0, y0, width, height, frequency, seed, params.kind)
+            norm += amplitude
+            amplitude *= params.persistence
+            frequency *= params.lacunarity
+        
+        return total / norm
+    
+    @staticmethod
+    def _generate_band(args) -> np.ndarray:
+        # Noise for one band of rows, mapped to tile IDs (runs on pool threads)
+        x0, y0, width, height, params = args
+        values = TerrainGenerator.noise(x0, y0, width, height, params)
+        bands = np.digitize(values, np.asarray(params.thresholds, dtype=np.float32))
+        return np.asarray(params.tile_ids, dtype=np.int32)[bands]
+    
+    @staticmethod
+    def _octave(x0: int, y0: int, width: int, height: int, frequency: float, seed: int, kind: str):
+        # Sample coordinates in lattice units, split into cell index and fraction
+        fx = (np.arange(x0, x0 + width) + 0.5) * frequency
+        fy = (np.arange(y0, y0 + height) + 0.5) * frequency
+        ix = np.floor(fx).astype(np.int64)
+        iy = np.floor(fy).astype(np.int64)
+        tx = (fx - ix).astype(np.float32)
+        ty = (fy - iy).astype(np.float32)[:, None]
+        
+        # Hash only the (small) lattice covering this area, then gather per cell
+        lattice_x = np.arange(ix[0], ix[-1] + 2)
+        lattice_y = np.arange(iy[0], iy[-1] + 2)
+        lattice = TerrainGenerator._hash(lattice_x[None, :], lattice_y[:, None], seed)
+        cx = ix - ix[0]
+        cy = iy - iy[0]
+        
+        sx = tx * tx * (3 - 2 * tx)
+        sy = ty * ty * (3 - 2 * ty)
+        
+        if kind == 'perlin':
+            angle = lattice * np.float32(2 * np.pi)
+            grad_x, grad_y = np.cos(angle), np.sin(angle)
+            
+            def corner(dx, dy):
+                gx = grad_x[cy + dy][:, cx + dx]
+                gy = grad_y[cy + dy][:, cx + dx]
+                return gx * (tx - dx) + gy * (ty - dy)
+            
+            n00, n10, n01, n11 = corner(0, 0), corner(1, 0), corner(0, 1), corner(1, 1)
+        else:
+            top = lattice[cy]
+            bottom = lattice[cy + 1]
+            n00, n10 = top[:, cx], top[:, cx + 1]
+            n01, n11 = bottom[:, cx], bottom[:, cx + 1]
+        
+        upper = n00 + (n10 - n00) * sx
+        lower = n01 + (n11 - n01) * sx
+        values = upper + (lower - upper) * sy
+        
+        if kind == 'perlin':
+            # Gradient noise spans roughly [-0.71, 0.71]
+            values = np.clip(values * np.float32(0.7071) + np.float32(0.5), 0.0, 1.0)
+        return values
+    
+    @staticmethod
+    def _hash(x: np.ndarray, y: np.ndarray, seed: int) -> np.ndarray:
+        # Integer hash of lattice coordinates to floats in [0, 1)
+        h = (x.astype(np.uint32) * np.uint32(0x8DA6B343)) ^ (y.astype(np.uint32) * np.uint32(0xD8163841))
+        h ^= np.uint32(seed)
+        h ^= h >> np.uint32(13)
+        h *= np.uint32(0x5BD1E995)
+        h ^= h >> np.uint32(15)
+        return (h >> np.uint32(8)).astype(np.float32) / np.float32(1 << 24)
@@ -3,6 +3,9 @@ from tools.paint_tool import PaintTool
 from tools.erase_tool import EraseTool
 from tools.fill_tool import FillTool
 from tools.picker_tool import PickerTool
+from tools.select_tool import SelectTool
+from tools.autotile_tool import AutoTileTool
+from tools.stamp_tool import StampTool
 
 class ToolController:
     """Dispatches events to active tool"""
@@ -16,13 +19,20 @@ class ToolController:
             'erase': EraseTool(editor_state),
             'fill': FillTool(editor_state),
             'picker': PickerTool(editor_state),
+            'select': SelectTool(editor_state),
+            'autotile': AutoTileTool(editor_state),
+            'stamp': StampTool(editor_state),
         }
         
         self.active_tool = self.tools['paint']
+        
+        # Mouse events buffered between frames as (kind, grid_x, grid_y, button)
+        self.pending_events = []
     
     def set_active_tool(self, tool_name: str):
         """Switch active tool"""
         if tool_name in self.tools:
+            self.flush()
             self.active_tool = self.tools[tool_name]
             self.editor_state.set_tool(tool_name)
     
@@ -30,13 +40,30 @@ class ToolController:
         """Get current active tool"""
         return self.active_tool
     
-    def on_mouse_down(self, grid_x: int, grid_y: int, button: int):
-        self.active_tool.on_mouse_down(grid_x, grid_y, button)
+    def queue_mouse_down(self, grid_x: int, grid_y: int, button: int):
+        """Buffer a press until the next flush()"""
+        self.pending_events.append(('down', grid_x, grid_y, button))
+    
+    def queue_mouse_move(self, grid_x: int, grid_y: int):
+        """Buffer a move, dropping it if the cell did not change"""
+        if self.pending_events:
+            kind, last_x, last_y, _ = self.pending_events[-1]
+            if kind == 'move' and (last_x, last_y) == (grid_x, grid_y):
+                return
+        self.pending_events.append(('move', grid_x, grid_y, 0))
+    
+    def queue_mouse_up(self, grid_x: int, grid_y: int, button: int):
+        """Buffer a release until the next flush()"""
+        self.pending_events.append(('up', grid_x, grid_y, button))
     
-    def on_mouse_move(self, grid_x: int, grid_y: int):
+    def flush(self):
+        """Hand the frame's buffered events to the active tool as one ordered batch"""
+        if not self.pending_events:
+            return
+        events = self.pending_events
+        self.pending_events = []
+        
+        _, grid_x, grid_y, _ = events[-1]
         self.editor_state.mouse_grid_x = grid_x
         self.editor_state.mouse_grid_y = grid_y
-        self.active_tool.on_mouse_move(grid_x, grid_y)
-    
-    def on_mouse_up(self, grid_x: int, grid_y: int, button: int):
-        self.active_tool.on_mouse_up(grid_x, grid_y, button)
+        self.active_tool.on_mouse_batch(events)
@@ -0,0 +1,44 @@
+import mmap
+import os
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+
+@contextmanager
+def atomic_write(filepath: str, mode: str = 'wb'):
+    # \"\"\"Write to a temp file beside filepath and rename it into place on success\"\"\"
+    # \"\"\"Readers (and memory maps of the old file) never see a partial file\"\"\"
+    path = Path(filepath)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def release_maps(layers, filepath: str):
+    # \"\"\"Copy grids memory-mapped from filepath into memory, so atomic_write can replace the file\"\"\"
+    # \"\"\"Windows refuses to replace a mapped file; elsewhere the maps keep the old file alive and stay valid\"\"\"
+    if os.name != 'nt':
+        return
+    target = os.path.normcase(os.path.abspath(filepath))
+    for layer in layers:
+        if _mapped_from(layer.tile_grid, target):
+            # Same cells, so this is not an edit: skip Layer's change event and dirty flag
+            object.__setattr__(layer, 'tile_grid', np.array(layer.tile_grid))
+
+def _mapped_from(array, target: str) -> bool:
+    while array is not None:
+        if isinstance(array, np.memmap) and array.filename:
+            return os.path.normcase(os.path.abspath(array.filename)) == target
+        if isinstance(array, mmap.mmap):
+            return True  # A raw map does not name its file, so assume the worst
+        array = array.obj if isinstance(array, memoryview) else getattr(array, 'base', None)
+    return False
@@ -1,26 +1,206 @@
 import struct
 import numpy as np
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
 import zlib
+from core.constants import LAYER_CHUNK_SIZE
+from .atomic import atomic_write, release_maps
+from .compression import ChunkCodec
 
 class BinaryLayerIO:
     # \"\"\"Save/load layer data in binary format\"\"\"
+    #
+    # v1: 32-byte header + one (optionally zlib) stream of the whole int32 grid.
+    # v2: 32-byte header + chunk table + independently compressed chunks.
+    #     Chunks are chunk_size x chunk_size tiles in row-major chunk order
+    #     (edge chunks are cropped); all-empty chunks are omitted (length 0).
+    #     The compression byte is a codec id and the next byte holds pre-filter
+    #     flags (see fileio.compression); zlib without filters is (1, 0).
+    # v3: 32-byte header, then the raw little-endian grid at a page-aligned
+    #     offset so load_layer can memory-map it instead of reading it.
     
     MAGIC = b'AELR'
-    VERSION = 1
+    VERSION = 2
+    VERSION_MAPPED = 3
     HEADER_SIZE = 32
+    HEADER_V1 = '<4sIIIB15x'  # magic, version, width, height, compression
+    HEADER_V2 = '<4sIIIBBHI8x'  # ... codec id, filter flags, chunk size and chunk count
+    HEADER_V3 = '<4sIIIB3xQ4x'  # ... plus offset of the raw grid
+    PAGE_SIZE = 4096
+    CHUNK_TABLE_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4')])
     
     @staticmethod
-    def save_layer(layer, filepath: str, compress: bool = True):
-        # \"\"\"Save layer to binary file\"\"\"
-        with open(filepath, 'wb') as f:
+    def save_layer(layer, filepath: str, compress: bool = True, level: Optional[int] = None,
+                   version: int = VERSION, chunk_size: int = LAYER_CHUNK_SIZE,
+                   codec: Optional[str] = None, filters: Sequence[str] = ()):
+        # \"\"\"Save layer to binary file (replaced atomically, so mapped readers stay valid)\"\"\"
+        # \"\"\"codec ('none', 'zlib', 'lzma', 'bz2') and filters apply to v2; codec=None
+        # means zlib, or none when compress is False\"\"\"
+        release_maps([layer], filepath)  # The layer may be mapped from the file it replaces (v3)
+        if version == 1:
+            BinaryLayerIO._save_v1(layer, filepath, compress, 6 if level is None else level)
+            return
+        if version == BinaryLayerIO.VERSION_MAPPED:
+            BinaryLayerIO._save_mapped(layer, filepath)
+            return
+        if version != 2:
+            raise ValueError(f"Unsupported version: {version}")
+        
+        if codec is None:
+            codec = 'zlib' if compress else 'none'
+        chunk_codec = ChunkCodec(codec, filters, level)
+        
+        with atomic_write(filepath) as f:
+            BinaryLayerIO.write_chunked(f, layer, chunk_codec, chunk_size)
+    
+    @staticmethod
+    def write_chunked(f, layer, chunk_codec: ChunkCodec, chunk_size: int = LAYER_CHUNK_SIZE):
+        # \"\"\"Write a v2 layer to a seekable binary file object positioned at offset 0\"\"\"
+        grid = np.ascontiguousarray(layer.tile_grid, dtype='<i4')
+        chunks_y = -(-layer.height // chunk_size)
+        chunks_x = -(-layer.width // chunk_size)
+        table = np.zeros(chunks_x * chunks_y, dtype=BinaryLayerIO.CHUNK_TABLE_DTYPE)
+        
+        f.write(struct.pack(
+            BinaryLayerIO.HEADER_V2,
+            BinaryLayerIO.MAGIC,
+            2,
+            layer.width,
+            layer.height,
+            chunk_codec.codec_id,
+            chunk_codec.filter_flags,
+            chunk_size,
+            len(table)
+        ))
+        
+        # Chunk data follows the table; offsets are filled in as chunks are written
+        offset = BinaryLayerIO.HEADER_SIZE + table.nbytes
+        f.seek(offset)
+        
+        # Which chunks hold any tile at all, without touching each chunk twice
+        occupied = BinaryLayerIO._occupied_chunks(grid, chunk_size, chunks_x, chunks_y)
+        
+        for index in np.flatnonzero(occupied):
+            cy, cx = divmod(int(index), chunks_x)
+            data = chunk_codec.encode(grid[cy * chunk_size:(cy + 1) * chunk_size,
+                                           cx * chunk_size:(cx + 1) * chunk_size])
+            f.write(data)
+            table[index] = (offset, len(data))
+            offset += len(data)
+        
+        f.seek(BinaryLayerIO.HEADER_SIZE)
+        f.write(table.tobytes())
+        f.seek(offset)
+    
+    @staticmethod
+    def load_layer(filepath: str):
+        # \"\"\"Load layer from binary file (v3 is mapped copy-on-write rather than read)\"\"\"
+        from core.models import Layer, LayerType
+        
+        with open(filepath, 'rb') as f:
+            header = BinaryLayerIO._read_header(f)
+            width, height = header['width'], header['height']
+            
+            if header['version'] == 1:
+                tile_grid = BinaryLayerIO._read_v1_grid(f, header)
+            elif header['version'] == BinaryLayerIO.VERSION_MAPPED:
+                tile_grid = BinaryLayerIO._map_grid(filepath, header)
+            else:
+                tile_grid = BinaryLayerIO._read_chunks(f, header, 0, 0, width, height)
+            
+            # Create layer object
+            layer_name = Path(filepath).stem
+            layer = Layer(layer_name, width, height)
+            layer.tile_grid = tile_grid
+            
+            return layer
+    
+    @staticmethod
+    def load_region(filepath: str, x: int, y: int, width: int, height: int) -> np.ndarray:
+        # \"\"\"Read a width x height block at (x, y) without loading the whole layer\"\"\"
+        # \"\"\"Cells outside the layer come back as 0; v2 reads only the covering chunks\"\"\"
+        with open(filepath, 'rb') as f:
+            header = BinaryLayerIO._read_header(f)
+            
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + width, header['width']), min(y + height, header['height'])
+            block = np.zeros((max(height, 0), max(width, 0)), dtype=np.int32)
+            if x1 <= x0 or y1 <= y0:
+                return block
+            
+            if header['version'] == 1:
+                part = BinaryLayerIO._read_v1_grid(f, header)[y0:y1, x0:x1]
+            elif header['version'] == BinaryLayerIO.VERSION_MAPPED:
+                part = BinaryLayerIO._map_grid(filepath, header)[y0:y1, x0:x1]
+            else:
+                part = BinaryLayerIO._read_chunks(f, header, x0, y0, x1, y1)
+            block[y0 - y:y1 - y, x0 - x:x1 - x] = part
+            return block
+    
+    @staticmethod
+    def read_grid(f) -> np.ndarray:
+        # \"\"\"Decode a v1 or v2 layer from a binary file object positioned at offset 0\"\"\"
+        header = BinaryLayerIO._read_header(f)
+        if header['version'] == 1:
+            return BinaryLayerIO._read_v1_grid(f, header)
+        if header['version'] == BinaryLayerIO.VERSION_MAPPED:
+            raise ValueError("v3 layers are mapped from a file, not read from a stream")
+        return BinaryLayerIO._read_chunks(f, header, 0, 0, header['width'], header['height'])
+    
+    @staticmethod
+    def read_header(filepath: str) -> dict:
+        # \"\"\"Header fields (version, width, height, compression, filters, chunk_size, chunk_count, data_offset)\"\"\"
+        with open(filepath, 'rb') as f:
+            return BinaryLayerIO._read_header(f)
+    
+    @staticmethod
+    def _read_header(f) -> dict:
+        header_data = f.read(BinaryLayerIO.HEADER_SIZE)
+        if len(header_data) < BinaryLayerIO.HEADER_SIZE:
+            raise ValueError("Truncated layer file")
+        
+        magic, version = struct.unpack_from('<4sI', header_data)
+        
+        # Validate
+        if magic != BinaryLayerIO.MAGIC:
+            raise ValueError(f"Invalid file format: {magic}")
+        
+        filters, chunk_size, chunk_count, data_offset = 0, 0, 0, BinaryLayerIO.HEADER_SIZE
+        if version == 1:
+            _, _, width, height, compression = struct.unpack(BinaryLayerIO.HEADER_V1, header_data)
+        elif version == 2:
+            _, _, width, height, compression, filters, chunk_size, chunk_count = struct.unpack(
+                BinaryLayerIO.HEADER_V2,
+                header_data
+            )
+        elif version == BinaryLayerIO.VERSION_MAPPED:
+            _, _, width, height, compression, data_offset = struct.unpack(
+                BinaryLayerIO.HEADER_V3,
+                header_data
+            )
+        else:
+            raise ValueError(f"Unsupported version: {version}")
+        
+        return {
+            'version': version,
+            'width': width,
+            'height': height,
+            'compression': compression,
+            'filters': filters,
+            'chunk_size': chunk_size,
+            'chunk_count': chunk_count,
+            'data_offset': data_offset
+        }
+    
+    @staticmethod
+    def _save_v1(layer, filepath: str, compress: bool, level: int):
+        with atomic_write(filepath) as f:
             # Write header
             compression_flag = 1 if compress else 0
             header = struct.pack(
-                '<4sIIIB15x',  # < = little-endian, x = padding
+                BinaryLayerIO.HEADER_V1,  # < = little-endian, x = padding
                 BinaryLayerIO.MAGIC,
-                BinaryLayerIO.VERSION,
+                1,
                 layer.width,
                 layer.height,
                 compression_flag
@@ -31,46 +211,97 @@ class BinaryLayerIO:
             grid_bytes = layer.tile_grid.tobytes()
             
             if compress:
-                grid_bytes = zlib.compress(grid_bytes, level=6)
+                grid_bytes = zlib.compress(grid_bytes, level=level)
             
             f.write(grid_bytes)
     
     @staticmethod
-    def load_layer(filepath: str):
-        # \"\"\"Load layer from binary file\"\"\"
-        from core.models import Layer, LayerType
-        
-        with open(filepath, 'rb') as f:
-            # Read header
-            header_data = f.read(BinaryLayerIO.HEADER_SIZE)
-            magic, version, width, height, compression = struct.unpack(
-                '<4sIIIB15x',
-                header_data
+    def _save_mapped(layer, filepath: str):
+        # \"\"\"Uncompressed v3 file: header, zero padding to a page boundary, raw grid\"\"\"
+        grid = np.ascontiguousarray(layer.tile_grid, dtype='<i4')
+        with atomic_write(filepath) as f:
+            header = struct.pack(
+                BinaryLayerIO.HEADER_V3,
+                BinaryLayerIO.MAGIC,
+                BinaryLayerIO.VERSION_MAPPED,
+                layer.width,
+                layer.height,
+                0,
+                BinaryLayerIO.PAGE_SIZE
             )
+            f.write(header.ljust(BinaryLayerIO.PAGE_SIZE, b'\0'))
+            f.write(grid.reshape(-1).view(np.uint8))
+    
+    @staticmethod
+    def _map_grid(filepath: str, header: dict) -> np.ndarray:
+        # \"\"\"Copy-on-write map of a v3 grid: pages load on first touch, edits stay in memory\"\"\"
+        shape = (header['height'], header['width'])
+        if shape[0] * shape[1] == 0:
+            return np.zeros(shape, dtype=np.int32)  # mmap cannot map zero bytes
+        return np.memmap(filepath, dtype='<i4', mode='c', offset=header['data_offset'], shape=shape)
+    
+    @staticmethod
+    def _read_v1_grid(f, header: dict) -> np.ndarray:
+        shape = (header['height'], header['width'])
+        
+        if header['compression'] != 1:
+            # Read straight into a writable array, no intermediate bytes copy
+            tile_grid = np.empty(shape, dtype=np.int32)
+            if f.readinto(tile_grid.reshape(-1).view(np.uint8)) != tile_grid.nbytes:
+                raise ValueError("Truncated layer file")
+            return tile_grid
+        
+        # Decompress into a bytearray: frombuffer over bytes would give a read-only array
+        grid_bytes = bytearray(zlib.decompress(f.read()))
+        return np.frombuffer(grid_bytes, dtype=np.int32).reshape(shape)
+    
+    @staticmethod
+    def _read_chunks(f, header: dict, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        # \"\"\"Decode the chunks covering [x0, x1) x [y0, y1) into a new array\"\"\"
+        size = header['chunk_size']
+        chunks_x = -(-header['width'] // size)
+        chunk_codec = ChunkCodec.from_header(header['compression'], header['filters'])
+        
+        f.seek(BinaryLayerIO.HEADER_SIZE)
+        table = np.frombuffer(
+            f.read(header['chunk_count'] * BinaryLayerIO.CHUNK_TABLE_DTYPE.itemsize),
+            dtype=BinaryLayerIO.CHUNK_TABLE_DTYPE
+        )
+        
+        cys = np.arange(y0 // size, (y1 - 1) // size + 1)
+        cxs = np.arange(x0 // size, (x1 - 1) // size + 1)
+        wanted = (cys[:, None] * chunks_x + cxs[None, :]).ravel()
+        wanted = wanted[table['length'][wanted] > 0]
+        
+        result = np.zeros((y1 - y0, x1 - x0), dtype=np.int32)
+        
+        # Read in file order so a full load is one sequential pass
+        for index in wanted[np.argsort(table['offset'][wanted], kind='stable')]:
+            offset, length = table[index]
+            f.seek(int(offset))
+            data = f.read(int(length))
+            if len(data) != length:
+                raise ValueError(f"Truncated chunk {index}")
             
-            # Validate
-            if magic != BinaryLayerIO.MAGIC:
-                raise ValueError(f"Invalid file format: {magic}")
-            
-            if version != BinaryLayerIO.VERSION:
-                raise ValueError(f"Unsupported version: {version}")
-            
-            # Read tile grid
-            grid_bytes = f.read()
-            
-            # Decompress if needed
-            if compression == 1:
-                grid_bytes = zlib.decompress(grid_bytes)
-            
-            # Convert to numpy array
-            tile_grid = np.frombuffer(grid_bytes, dtype=np.int32)
-            tile_grid = tile_grid.reshape((height, width))
-            
-            # Create layer object
-            layer_name = Path(filepath).stem
-            layer = Layer(layer_name, width, height)
-            layer.tile_grid = tile_grid
+            cy, cx = divmod(int(index), chunks_x)
+            cx0, cy0 = cx * size, cy * size
+            ch = min(size, header['height'] - cy0)
+            cw = min(size, header['width'] - cx0)
+            chunk = chunk_codec.decode(data, (ch, cw))
             
-            return layer
-
-
+            # Overlap of this chunk with the requested rect
+            ox0, oy0 = max(cx0, x0), max(cy0, y0)
+            ox1, oy1 = min(cx0 + cw, x1), min(cy0 + ch, y1)
+            result[oy0 - y0:oy1 - y0, ox0 - x0:ox1 - x0] = chunk[oy0 - cy0:oy1 - cy0, ox0 - cx0:ox1 - cx0]
+        
+        return result
+    
+    @staticmethod
+    def _occupied_chunks(grid: np.ndarray, size: int, chunks_x: int, chunks_y: int) -> np.ndarray:
+        # \"\"\"Flat bool per chunk: does it contain any non-empty tile\"\"\"
+        if grid.size == 0:
+            return np.zeros(chunks_x * chunks_y, dtype=bool)
+        height, width = grid.shape
+        occupied = np.logical_or.reduceat(grid != 0, np.arange(0, height, size), axis=0)
+        occupied = np.logical_or.reduceat(occupied, np.arange(0, width, size), axis=1)
+        return occupied.ravel()
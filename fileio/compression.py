@@ -0,0 +1,173 @@
+import bz2
+import lzma
+import time
+import zlib
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Codec ids are stored in the layer header's compression byte; 0 and 1 keep
+# their original meaning (uncompressed / zlib) so older files decode unchanged.
+CODEC_IDS = {'none': 0, 'zlib': 1, 'lzma': 2, 'bz2': 3}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+DEFAULT_LEVELS = {'none': 0, 'zlib': 6, 'lzma': 6, 'bz2': 9}
+
+# Pre-filter bit flags, stored in their own header byte. Encoding applies them
+# in this order (delta, rle, shuffle) and decoding in reverse.
+FILTER_FLAGS = {'delta': 1, 'rle': 2, 'shuffle': 4}
+FILTER_ORDER = ('delta', 'rle', 'shuffle')
+
+# Chunks are small, so LZMA runs in raw mode without per-stream headers
+_LZMA_DICT_SIZE = 1 << 20
+
+
+class ChunkCodec:
+    # \"\"\"Codec plus tile-aware pre-filters applied to each int32 chunk of a layer\"\"\"
+    
+    def __init__(self, codec: str = 'zlib', filters: Sequence[str] = (), level: Optional[int] = None):
+        if codec not in CODEC_IDS:
+            raise ValueError(f"Unknown codec: {codec}")
+        unknown = set(filters) - set(FILTER_FLAGS)
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+        
+        self.codec = codec
+        self.filters = tuple(name for name in FILTER_ORDER if name in filters)
+        self.level = DEFAULT_LEVELS[codec] if level is None else level
+    
+    @staticmethod
+    def from_header(codec_id: int, filter_flags: int) -> 'ChunkCodec':
+        # \"\"\"Codec described by a layer header's compression and filter bytes\"\"\"
+        if codec_id not in CODEC_NAMES:
+            raise ValueError(f"Unsupported codec id: {codec_id}")
+        filters = [name for name, flag in FILTER_FLAGS.items() if filter_flags & flag]
+        return ChunkCodec(CODEC_NAMES[codec_id], filters)
+    
+    @property
+    def codec_id(self) -> int:
+        return CODEC_IDS[self.codec]
+    
+    @property
+    def filter_flags(self) -> int:
+        return sum(FILTER_FLAGS[name] for name in self.filters)
+    
+    @property
+    def name(self) -> str:
+        return "+".join((self.codec,) + self.filters)
+    
+    def encode(self, chunk: np.ndarray) -> bytes:
+        # \"\"\"Filter and compress a 2D int32 chunk\"\"\"
+        data = np.ascontiguousarray(chunk, dtype='<i4')
+        
+        if 'delta' in self.filters:
+            # Horizontal runs of one tile become runs of zeros (wraps like the decoder's cumsum)
+            delta = data.copy()
+            delta[:, 1:] -= data[:, :-1]
+            data = delta
+        
+        data = data.reshape(-1)
+        if 'rle' in self.filters:
+            data = ChunkCodec._rle_encode(data)
+        
+        if 'shuffle' in self.filters:
+            # Group byte 0 of every value, then byte 1, ... (small IDs leave long zero planes)
+            raw = data.view(np.uint8).reshape(-1, 4).T.tobytes()
+        else:
+            raw = data.tobytes()
+        
+        return ChunkCodec._compress(self.codec, raw, self.level)
+    
+    def decode(self, data: bytes, shape: Tuple[int, int]) -> np.ndarray:
+        # \"\"\"Inverse of encode for a chunk of the given (rows, cols) shape\"\"\"
+        raw = ChunkCodec._decompress(self.codec, data)
+        
+        if 'shuffle' in self.filters:
+            values = np.frombuffer(raw, dtype=np.uint8).reshape(4, -1).T.copy().view('<i4').reshape(-1)
+        else:
+            values = np.frombuffer(raw, dtype='<i4')
+        
+        if 'rle' in self.filters:
+            values = ChunkCodec._rle_decode(values)
+        
+        values = values.reshape(shape)
+        if 'delta' in self.filters:
+            values = np.cumsum(values, axis=1, dtype='<i4')
+        return values
+    
+    @staticmethod
+    def _rle_encode(values: np.ndarray) -> np.ndarray:
+        # \"\"\"[run count, run values..., run lengths...] as int32\"\"\"
+        if len(values) == 0:
+            return np.zeros(1, dtype='<i4')
+        starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+        lengths = np.diff(np.append(starts, len(values)))
+        return np.concatenate(([len(starts)], values[starts], lengths)).astype('<i4')
+    
+    @staticmethod
+    def _rle_decode(encoded: np.ndarray) -> np.ndarray:
+        count = int(encoded[0])
+        return np.repeat(encoded[1:1 + count], encoded[1 + count:1 + 2 * count])
+    
+    @staticmethod
+    def _compress(codec: str, raw: bytes, level: int) -> bytes:
+        if codec == 'zlib':
+            return zlib.compress(raw, level=level)
+        if codec == 'lzma':
+            filters = [{'id': lzma.FILTER_LZMA2, 'preset': level, 'dict_size': _LZMA_DICT_SIZE}]
+            return lzma.compress(raw, format=lzma.FORMAT_RAW, filters=filters)
+        if codec == 'bz2':
+            return bz2.compress(raw, compresslevel=max(level, 1))
+        return raw
+    
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == 'zlib':
+            return zlib.decompress(data)
+        if codec == 'lzma':
+            filters = [{'id': lzma.FILTER_LZMA2, 'dict_size': _LZMA_DICT_SIZE}]
+            return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=filters)
+        if codec == 'bz2':
+            return bz2.decompress(data)
+        return data
+
+
+# Configurations tried by benchmark_codecs when none are given
+BENCH_CODECS = ('none', 'zlib', 'lzma', 'bz2')
+BENCH_FILTER_SETS = ((), ('shuffle',), ('delta',), ('rle',), ('delta', 'shuffle'), ('delta', 'rle', 'shuffle'))
+
+
+def benchmark_codecs(grids: List[np.ndarray], codecs: Optional[List[ChunkCodec]] = None,
+                     chunk_size: int = 64) -> List[Dict]:
+    # \"\"\"Encode/decode every grid chunk-wise with each codec; returns size ratio and MB/s\"\"\"
+    if codecs is None:
+        codecs = [ChunkCodec(codec, filters) for codec in BENCH_CODECS for filters in BENCH_FILTER_SETS]
+    
+    # Same chunking as BinaryLayerIO v2, empty chunks included so ratios compare fairly
+    chunks = [
+        np.ascontiguousarray(grid[y:y + chunk_size, x:x + chunk_size])
+        for grid in grids
+        for y in range(0, grid.shape[0], chunk_size)
+        for x in range(0, grid.shape[1], chunk_size)
+    ]
+    raw_bytes = sum(chunk.nbytes for chunk in chunks)
+    
+    results = []
+    for codec in codecs:
+        start = time.perf_counter()
+        encoded = [codec.encode(chunk) for chunk in chunks]
+        encode_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for data, chunk in zip(encoded, chunks):
+            codec.decode(data, chunk.shape)
+        decode_seconds = time.perf_counter() - start
+        
+        encoded_bytes = sum(len(data) for data in encoded)
+        results.append({
+            'codec': codec.name,
+            'raw_bytes': raw_bytes,
+            'encoded_bytes': encoded_bytes,
+            'ratio': raw_bytes / max(encoded_bytes, 1),
+            'encode_mb_s': raw_bytes / 1e6 / max(encode_seconds, 1e-9),
+            'decode_mb_s': raw_bytes / 1e6 / max(decode_seconds, 1e-9)
+        })
+    return results
@@ -0,0 +1,247 @@
+import io
+import json
+import mmap
+import struct
+import numpy as np
+from functools import partial
+from pathlib import Path
+from typing import Optional, Sequence
+from core.constants import EXT_PROJECT
+from .atomic import atomic_write, release_maps
+from .binary import BinaryLayerIO
+from .compression import ChunkCodec
+from .metadata import MetadataIO
+
+class ContainerIO:
+    # \"\"\"Single-file .aether project: metadata, layers and tileset image behind a central index\"\"\"
+    #
+    # 32-byte header '<4sIQQ8x': magic, version, index offset, index length. The index is JSON
+    # written after every member and maps member names to offset, length and kind:
+    #   'metadata'  the project's metadata.json (layer 'file' entries name layer members)
+    #   'chunked'   a complete v2 layer file (see BinaryLayerIO)
+    #   'raw'       the uncompressed '<i4' grid, starting on a page boundary so it can be mapped
+    #   'tileset'   the embedded tileset image file
+    # Opening reads the header, the index and the metadata, then each compressed layer once;
+    # raw layers are mapped copy-on-write. All through one file handle.
+    
+    MAGIC = b'AEPK'
+    VERSION = 1
+    HEADER = '<4sIQQ8x'
+    HEADER_SIZE = 32
+    PAGE_SIZE = BinaryLayerIO.PAGE_SIZE
+    
+    @staticmethod
+    def is_container(path: str) -> bool:
+        # \"\"\"Is path a container file (or, if it does not exist yet, named like one)\"\"\"
+        path = Path(path)
+        if path.is_file():
+            with open(path, 'rb') as f:
+                return f.read(len(ContainerIO.MAGIC)) == ContainerIO.MAGIC
+        return not path.is_dir() and path.suffix.lower() == EXT_PROJECT
+    
+    @staticmethod
+    def sidecar_dir(project_path: str) -> Path:
+        # \"\"\"Where autosaves and the edit journal of a project live\"\"\"
+        # \"\"\"A directory project keeps them inside itself; a container uses .<file name>.d beside it\"\"\"
+        path = Path(project_path)
+        if ContainerIO.is_container(path):
+            return path.with_name(f".{path.name}.d")
+        return path
+    
+    @staticmethod
+    def save_container(project, filepath: str, raw_layers: bool = False, embed_tileset: bool = True,
+                       codec: str = 'zlib', filters: Sequence[str] = (), workers: Optional[int] = None):
+        # \"\"\"Write a project to one container file (replaced atomically)\"\"\"
+        # \"\"\"raw_layers stores grids uncompressed and page-aligned for mapping; otherwise layers
+        # are v2-encoded with codec/filters on `workers` threads\"\"\"
+        from .project_io import ProjectIO
+        
+        release_maps(project.layers, filepath)  # Raw layers may be mapped from the file being replaced
+        metadata = MetadataIO.build_metadata(project)
+        members = []  # (name, kind, bytes or array)
+        
+        if raw_layers:
+            encoded = [np.ascontiguousarray(layer.tile_grid, dtype='<i4') for layer in project.layers]
+        else:
+            chunk_codec = ChunkCodec(codec, filters)
+            encoded = ProjectIO._map_layers(
+                lambda layer: ContainerIO._encode_layer(layer, chunk_codec), project.layers, workers
+            )
+        for layer, layer_meta, data in zip(project.layers, metadata['layers'], encoded):
+            layer_meta['file'] = f"layers/{layer.name}"
+            layer_meta['hash'] = None  # Layer files are not rewritten individually
+            members.append((layer_meta['file'], 'raw' if raw_layers else 'chunked', data))
+        
+        image_bytes = project.tileset.image_file_bytes() if embed_tileset and project.tileset else None
+        if image_bytes is not None:
+            name = f"tileset/{Path(project.tileset.image_path).name}"
+            metadata['tileset']['embedded'] = name
+            members.append((name, 'tileset', image_bytes))
+        
+        members.insert(0, ('metadata.json', 'metadata', json.dumps(metadata, indent=2).encode('utf-8')))
+        
+        with atomic_write(filepath) as f:
+            f.write(bytes(ContainerIO.HEADER_SIZE))
+            index = {}
+            for name, kind, data in members:
+                entry = {'kind': kind, 'offset': f.tell()}
+                if kind == 'raw':
+                    entry['offset'] = -(-entry['offset'] // ContainerIO.PAGE_SIZE) * ContainerIO.PAGE_SIZE
+                    f.write(bytes(entry['offset'] - f.tell()))
+                    entry['shape'] = list(data.shape)
+                    data = data.reshape(-1).view(np.uint8)
+                f.write(data)
+                entry['length'] = len(data)
+                index[name] = entry
+            
+            index_offset = f.tell()
+            index_bytes = json.dumps({'members': index}).encode('utf-8')
+            f.write(index_bytes)
+            f.seek(0)
+            f.write(struct.pack(
+                ContainerIO.HEADER, ContainerIO.MAGIC, ContainerIO.VERSION, index_offset, len(index_bytes)
+            ))
+    
+    @staticmethod
+    def load_container(filepath: str, workers: Optional[int] = None):
+        # \"\"\"Load a project from a container file\"\"\"
+        from core.models import Layer
+        from .project_io import ProjectIO
+        
+        with open(filepath, 'rb') as f:
+            index = ContainerIO._read_index(f)
+            metadata = json.loads(ContainerIO._read_member(f, index, 'metadata.json'))
+            
+            image_bytes = None
+            embedded = (metadata.get('tileset') or {}).get('embedded')
+            if embedded in index:
+                image_bytes = ContainerIO._read_member(f, index, embedded)
+            project = ProjectIO._project_from_metadata(metadata, Path(filepath).parent, image_bytes)
+            
+            layer_metas = [layer_meta for layer_meta in metadata.get('layers', []) if layer_meta['file'] in index]
+            
+            # One private map of the whole file backs every raw layer
+            mapped = None
+            if any(index[layer_meta['file']]['kind'] == 'raw' for layer_meta in layer_metas):
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            
+            # Compressed members are read in file order here and decoded on worker threads
+            encoded = {
+                layer_meta['file']: ContainerIO._read_member(f, index, layer_meta['file'])
+                for layer_meta in sorted(layer_metas, key=lambda m: index[m['file']]['offset'])
+                if index[layer_meta['file']]['kind'] == 'chunked'
+            }
+        
+        grids = ProjectIO._map_layers(
+            lambda layer_meta: ContainerIO._decode_layer(layer_meta, index, encoded, mapped, project),
+            layer_metas,
+            workers
+        )
+        
+        for layer_meta, grid in zip(layer_metas, grids):
+            layer = Layer(layer_meta['name'], grid.shape[1], grid.shape[0])
+            layer.tile_grid = grid
+            ProjectIO._apply_layer_meta(layer, layer_meta)
+            layer.dirty = False
+            project.append_layer(layer)
+        
+        project.layers.sort(key=lambda l: l.z_index)
+        return project
+    
+    @staticmethod
+    def load_skeleton(filepath: str):
+        # \"\"\"Project with empty layer grids plus readers for the tileset and layers (see ProjectIO.load_skeleton)\"\"\"
+        from core.models import Layer
+        from .project_io import ProjectIO
+        
+        with open(filepath, 'rb') as f:
+            index = ContainerIO._read_index(f)
+            metadata = json.loads(ContainerIO._read_member(f, index, 'metadata.json'))
+        project = ProjectIO._project_from_metadata(metadata, Path(filepath).parent, load_tileset=False)
+        
+        tileset_reader = None
+        if metadata.get('tileset'):
+            tileset_reader = partial(
+                ContainerIO._read_tileset, filepath, index, metadata['tileset'], Path(filepath).parent
+            )
+        
+        layer_readers = []
+        for layer_meta in metadata.get('layers', []):
+            entry = index.get(layer_meta['file'])
+            if entry is None:
+                continue
+            layer = Layer(layer_meta['name'], project.grid_width, project.grid_height)
+            ProjectIO._apply_layer_meta(layer, layer_meta)
+            layer.dirty = False
+            project.append_layer(layer)
+            
+            shape = tuple(entry.get('shape', (project.grid_height, project.grid_width)))
+            layer_readers.append((layer, partial(ContainerIO._read_layer, filepath, entry, shape), None))
+        
+        project.layers.sort(key=lambda l: l.z_index)
+        return project, tileset_reader, layer_readers
+    
+    @staticmethod
+    def _read_layer(filepath: str, entry: dict, shape: tuple) -> np.ndarray:
+        # \"\"\"Decode (or map copy-on-write) one layer member through its own file handle\"\"\"
+        if entry['kind'] == 'raw':
+            if shape[0] * shape[1] == 0:
+                return np.zeros(shape, dtype=np.int32)
+            return np.memmap(filepath, dtype='<i4', mode='c', offset=entry['offset'], shape=shape)
+        
+        with open(filepath, 'rb') as f:
+            f.seek(entry['offset'])
+            return BinaryLayerIO.read_grid(io.BytesIO(f.read(entry['length'])))
+    
+    @staticmethod
+    def _read_tileset(filepath: str, index: dict, ts_meta: dict, project_dir: Path):
+        from .project_io import ProjectIO
+        
+        image_bytes = None
+        if ts_meta.get('embedded') in index:
+            with open(filepath, 'rb') as f:
+                image_bytes = ContainerIO._read_member(f, index, ts_meta['embedded'])
+        return ProjectIO._load_tileset(ts_meta, project_dir, image_bytes)
+    
+    @staticmethod
+    def _encode_layer(layer, chunk_codec: ChunkCodec) -> bytes:
+        buffer = io.BytesIO()
+        BinaryLayerIO.write_chunked(buffer, layer, chunk_codec)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def _decode_layer(layer_meta: dict, index: dict, encoded: dict, mapped, project) -> np.ndarray:
+        entry = index[layer_meta['file']]
+        if entry['kind'] == 'chunked':
+            return BinaryLayerIO.read_grid(io.BytesIO(encoded[layer_meta['file']]))
+        
+        shape = tuple(entry.get('shape', (project.grid_height, project.grid_width)))
+        if shape[0] * shape[1] == 0:
+            return np.zeros(shape, dtype=np.int32)
+        return np.frombuffer(mapped, dtype='<i4', count=shape[0] * shape[1], offset=entry['offset']).reshape(shape)
+    
+    @staticmethod
+    def _read_index(f) -> dict:
+        header = f.read(ContainerIO.HEADER_SIZE)
+        if len(header) < ContainerIO.HEADER_SIZE:
+            raise ValueError("Truncated container file")
+        magic, version, index_offset, index_length = struct.unpack(ContainerIO.HEADER, header)
+        if magic != ContainerIO.MAGIC:
+            raise ValueError(f"Invalid container format: {magic}")
+        if version != ContainerIO.VERSION:
+            raise ValueError(f"Unsupported container version: {version}")
+        
+        f.seek(index_offset)
+        index_bytes = f.read(index_length)
+        if len(index_bytes) != index_length:
+            raise ValueError("Truncated container index")
+        return json.loads(index_bytes)['members']
+    
+    @staticmethod
+    def _read_member(f, index: dict, name: str) -> bytes:
+        entry = index[name]
+        f.seek(entry['offset'])
+        data = f.read(entry['length'])
+        if len(data) != entry['length']:
+            raise ValueError(f"Truncated container member: {name}")
+        return data
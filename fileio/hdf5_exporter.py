@@ -1,78 +1,46 @@
 import h5py
 import json
 import numpy as np
-from pathlib import Path
 import io
+from typing import List, Tuple
+from core.constants import LAYER_CHUNK_SIZE
 
 class HDF5Exporter:
     # \"\"\"Export/import entire project to/from HDF5 container\"\"\"
+    #
+    # Layout (format 2): tileset/ and layers/<name>/ keep their properties as HDF5 attributes;
+    # tile definitions are the typed datasets tileset/tiles (TILE_DTYPE records sorted by ID),
+    # tileset/frame_offsets + tileset/frames (ragged animation frames: tile i owns
+    # frames[offsets[i]:offsets[i + 1]]) and, only for tiles that have any, JSON
+    # tileset/tile_metadata. Format 1 files (JSON string datasets) still import.
+    
+    COMPRESSIONS = ('gzip', 'lzf', 'none')
+    FORMAT = 2
+    TILE_DTYPE = np.dtype([('id', '<i4'), ('rect', '<i4', (4,)), ('solid', 'u1')])
+    LAYER_ATTRS = ('name', 'type', 'visible', 'locked', 'opacity', 'z_index', 'interacts_with_layers')
     
     @staticmethod
-    def export_project(project, filepath: str):
+    def export_project(project, filepath: str, compression: str = 'gzip', level: int = 6,
+                       chunk_size: int = LAYER_CHUNK_SIZE, shuffle: bool = True):
         # \"\"\"Export MapProject to HDF5 file\"\"\"
-        from core.models import LayerType
+        # \"\"\"Tile grids are stored in chunk_size x chunk_size chunks so regions can be read
+        # without the rest of the layer; compression is 'gzip' (at level), 'lzf' or 'none'\"\"\"
+        if compression not in HDF5Exporter.COMPRESSIONS:
+            raise ValueError(f"Unknown HDF5 compression: {compression}")
         
         with h5py.File(filepath, 'w') as f:
+            f.attrs['format'] = HDF5Exporter.FORMAT
+            
             # Create groups
             tileset_group = f.create_group('tileset')
             layers_group = f.create_group('layers')
             
             # Save project metadata
-            metadata = {
-                'project': {
-                    'name': project.name,
-                    'version': '1.0'
-                },
-                'dimensions': {
-                    'grid_width': project.grid_width,
-                    'grid_height': project.grid_height,
-                    'tile_width': project.tile_width,
-                    'tile_height': project.tile_height
-                }
-            }
-            
-            f.create_dataset(
-                'project_metadata',
-                data=json.dumps(metadata, indent=2),
-                dtype=h5py.string_dtype()
-            )
+            HDF5Exporter._write_project_metadata(f, project)
             
             # Save tileset
             if project.tileset and project.tileset.image:
-                # Save image as bytes
-                if Path(project.tileset.image_path).exists():
-                    with open(project.tileset.image_path, 'rb') as img_file:
-                        image_bytes = img_file.read()
-                        tileset_group.create_dataset(
-                            'image',
-                            data=np.frombuffer(image_bytes, dtype=np.uint8)
-                        )
-                
-                # Save tileset metadata
-                tileset_meta = {
-                    'name': project.tileset.name,
-                    'path': project.tileset.image_path,
-                    'tile_width': project.tileset.tile_width,
-                    'tile_height': project.tileset.tile_height
-                }
-                
-                tileset_group.create_dataset(
-                    'metadata',
-                    data=json.dumps(tileset_meta),
-                    dtype=h5py.string_dtype()
-                )
-                
-                # Save tile definitions
-                tile_defs = {
-                    str(tid): tile.to_dict()
-                    for tid, tile in project.tileset.tiles.items()
-                }
-                
-                tileset_group.create_dataset(
-                    'tile_definitions',
-                    data=json.dumps(tile_defs),
-                    dtype=h5py.string_dtype()
-                )
+                HDF5Exporter._write_tileset(tileset_group, HDF5Exporter._tileset_payload(project.tileset))
             
             # Save each layer
             for layer in project.layers:
@@ -82,102 +50,363 @@ class HDF5Exporter:
                 layer_group.create_dataset(
                     'tile_grid',
                     data=layer.tile_grid,
-                    compression='gzip',
-                    compression_opts=6
+                    **HDF5Exporter._grid_storage(layer.tile_grid.shape, compression, level, chunk_size, shuffle)
                 )
                 
                 # Save layer properties
-                properties = {
-                    'name': layer.name,
-                    'type': layer.layer_type.value,
-                    'visible': layer.visible,
-                    'locked': layer.locked,
-                    'opacity': layer.opacity,
-                    'z_index': layer.z_index,
-                    'interacts_with_layers': layer.interacts_with_layers
-                }
-                
-                layer_group.create_dataset(
-                    'properties',
-                    data=json.dumps(properties),
-                    dtype=h5py.string_dtype()
-                )
+                HDF5Exporter._write_layer_attrs(layer_group, layer)
+    
+    @staticmethod
+    def _write_project_metadata(root, project):
+        metadata = {
+            'project': {
+                'name': project.name,
+                'version': '1.0'
+            },
+            'dimensions': {
+                'grid_width': project.grid_width,
+                'grid_height': project.grid_height,
+                'tile_width': project.tile_width,
+                'tile_height': project.tile_height
+            },
+            'metadata': project.metadata
+        }
+        
+        root.create_dataset(
+            'project_metadata',
+            data=json.dumps(metadata, indent=2),
+            dtype=h5py.string_dtype()
+        )
+    
+    @staticmethod
+    def _write_layer_attrs(layer_group, layer):
+        layer_group.attrs['name'] = layer.name
+        layer_group.attrs['type'] = layer.layer_type.value
+        layer_group.attrs['visible'] = layer.visible
+        layer_group.attrs['locked'] = layer.locked
+        layer_group.attrs['opacity'] = layer.opacity
+        layer_group.attrs['z_index'] = layer.z_index
+        layer_group.attrs['interacts_with_layers'] = layer.interacts_with_layers
     
     @staticmethod
     def import_project(filepath: str):
         # \"\"\"Load MapProject from HDF5 file\"\"\"
-        from core.models import MapProject, Layer, TileSet, TileData, LayerType
+        with h5py.File(filepath, 'r') as f:
+            return HDF5Exporter.read_project(f)
+    
+    @staticmethod
+    def read_project(root):
+        # \"\"\"Load MapProject from an open HDF5 file or group laid out like an exported file\"\"\"
+        from core.models import MapProject, TileSet, TileData
         import pygame
         
-        with h5py.File(filepath, 'r') as f:
-            # Load project metadata
-            metadata = json.loads(f['project_metadata'][()])
-            
-            # Create project
-            project = MapProject(
-                name=metadata['project']['name'],
-                grid_width=metadata['dimensions']['grid_width'],
-                grid_height=metadata['dimensions']['grid_height'],
-                tile_width=metadata['dimensions']['tile_width'],
-                tile_height=metadata['dimensions']['tile_height']
-            )
+        # Load project metadata
+        metadata = json.loads(root['project_metadata'][()])
+        
+        # Create project
+        project = MapProject(
+            name=metadata['project']['name'],
+            grid_width=metadata['dimensions']['grid_width'],
+            grid_height=metadata['dimensions']['grid_height'],
+            tile_width=metadata['dimensions']['tile_width'],
+            tile_height=metadata['dimensions']['tile_height']
+        )
+        project.metadata = metadata.get('metadata', {})
+        
+        # Load tileset (the group is written even without a tileset)
+        tileset_meta = HDF5Exporter._read_tileset_meta(root['tileset']) if 'tileset' in root else None
+        if tileset_meta is not None:
             
-            # Load tileset
-            if 'tileset' in f:
-                tileset_meta = json.loads(f['tileset/metadata'][()])
+            # Load image from bytes
+            if 'image' in root['tileset']:
+                image_bytes = bytes(root['tileset/image'][:])
+                image_surface = pygame.image.load(io.BytesIO(image_bytes))
                 
-                # Load image from bytes
-                if 'image' in f['tileset']:
-                    image_bytes = bytes(f['tileset/image'][:])
-                    image_surface = pygame.image.load(io.BytesIO(image_bytes))
-                    
-                    tileset = TileSet(
-                        name=tileset_meta['name'],
-                        image_path=tileset_meta['path'],
-                        tile_width=tileset_meta['tile_width'],
-                        tile_height=tileset_meta['tile_height']
-                    )
-                    tileset.image = image_surface
-                    
-                    # Load tile definitions
-                    if 'tile_definitions' in f['tileset']:
-                        tile_defs = json.loads(f['tileset/tile_definitions'][()])
-                        for tid_str, tdef in tile_defs.items():
-                            tid = int(tid_str)
-                            tileset.tiles[tid] = TileData.from_dict(tdef)
-                    
-                    project.tileset = tileset
-            
-            # Load layers
-            if 'layers' in f:
-                for layer_name in f['layers'].keys():
-                    layer_group = f['layers'][layer_name]
-                    
-                    # Load properties
-                    props = json.loads(layer_group['properties'][()])
-                    
-                    # Create layer
-                    layer_type = LayerType(props['type'])
-                    layer = Layer(
-                        props['name'],
-                        project.grid_width,
-                        project.grid_height,
-                        layer_type
-                    )
-                    layer.visible = props['visible']
-                    layer.locked = props.get('locked', False)
-                    layer.opacity = props.get('opacity', 1.0)
-                    layer.z_index = props['z_index']
-                    layer.interacts_with_layers = props.get('interacts_with_layers', True)
-                    
-                    # Load tile grid
-                    layer.tile_grid = layer_group['tile_grid'][:]
-                    
-                    project.layers.append(layer)
-            
-            # Sort layers by z_index
-            project.layers.sort(key=lambda l: l.z_index)
-            
-            return project
+                tileset = TileSet(
+                    name=tileset_meta['name'],
+                    image_path=tileset_meta['path'],
+                    tile_width=tileset_meta['tile_width'],
+                    tile_height=tileset_meta['tile_height'],
+                    margin=tileset_meta.get('margin', 0),
+                    spacing=tileset_meta.get('spacing', 0)
+                )
+                tileset.image = image_surface
+                tileset.image_bytes = image_bytes
+                
+                # Load tile definitions
+                if 'tiles' in root['tileset']:
+                    tileset.tiles.update(HDF5Exporter._read_tiles(root['tileset']))
+                elif 'tile_definitions' in root['tileset']:
+                    tile_defs = json.loads(root['tileset/tile_definitions'][()])
+                    for tid_str, tdef in tile_defs.items():
+                        tid = int(tid_str)
+                        tileset.tiles[tid] = TileData.from_dict(tdef)
+                
+                project.tileset = tileset
+        
+        # Load layers
+        if 'layers' in root:
+            for layer_name in root['layers'].keys():
+                layer_group = root['layers'][layer_name]
+                project.append_layer(
+                    HDF5Exporter._build_layer(layer_group, project.grid_width, project.grid_height)
+                )
+        
+        # Sort layers by z_index
+        project.layers.sort(key=lambda l: l.z_index)
+        
+        return project
+    
+    @staticmethod
+    def open_project(filepath: str) -> 'HDF5ProjectReader':
+        # \"\"\"Open an HDF5 export for lazy, region-by-region reading (see HDF5ProjectReader)\"\"\"
+        return HDF5ProjectReader(filepath)
+    
+    @staticmethod
+    def _grid_storage(shape: Tuple[int, int], compression: str, level: int,
+                      chunk_size: int, shuffle: bool) -> dict:
+        # \"\"\"create_dataset options for a tile grid: tile-aligned chunks, shuffle, compression\"\"\"
+        if 0 in shape:
+            return {}  # HDF5 cannot chunk empty datasets
+        
+        options = {'chunks': (min(chunk_size, shape[0]), min(chunk_size, shape[1]))}
+        if compression != 'none':
+            # Shuffle groups the bytes of the int32 IDs, so the mostly-zero high bytes compress away
+            options['shuffle'] = shuffle
+            options['compression'] = compression
+            if compression == 'gzip':
+                options['compression_opts'] = level
+        return options
+    
+    @staticmethod
+    def _tileset_payload(tileset) -> dict:
+        # \"\"\"Everything written for a tileset: image file bytes, attributes and typed tile arrays\"\"\"
+        payload = {
+            'image': None,
+            'attrs': {
+                'name': tileset.name,
+                'path': tileset.image_path,
+                'tile_width': tileset.tile_width,
+                'tile_height': tileset.tile_height,
+                'margin': tileset.margin,
+                'spacing': tileset.spacing
+            }
+        }
+        payload['image'] = tileset.image_file_bytes()
+        payload.update(HDF5Exporter._tile_arrays(tileset.tiles))
+        return payload
+    
+    @staticmethod
+    def _write_tileset(tileset_group, payload: dict):
+        # Save image as bytes
+        if payload['image'] is not None:
+            tileset_group.create_dataset('image', data=np.frombuffer(payload['image'], dtype=np.uint8))
+        
+        # Save tileset metadata
+        for key, value in payload['attrs'].items():
+            tileset_group.attrs[key] = value
+        
+        # Save tile definitions
+        tileset_group.create_dataset('tiles', data=payload['tiles'])
+        tileset_group.create_dataset('frame_offsets', data=payload['frame_offsets'])
+        tileset_group.create_dataset('frames', data=payload['frames'])
+        if payload['tile_metadata'] is not None:
+            tileset_group.create_dataset(
+                'tile_metadata',
+                data=payload['tile_metadata'],
+                dtype=h5py.string_dtype()
+            )
+    
+    @staticmethod
+    def _tile_arrays(tiles: dict) -> dict:
+        # \"\"\"Tile definitions as typed arrays (see the class comment for the layout)\"\"\"
+        ordered = [tiles[tid] for tid in sorted(tiles)]
+        
+        records = np.zeros(len(ordered), dtype=HDF5Exporter.TILE_DTYPE)
+        records['id'] = [tile.id for tile in ordered]
+        records['rect'] = np.array(
+            [(tile.texture_rect.x, tile.texture_rect.y, tile.texture_rect.width, tile.texture_rect.height)
+             for tile in ordered],
+            dtype=np.int32
+        ).reshape(-1, 4)
+        records['solid'] = [tile.solid for tile in ordered]
+        
+        counts = np.array([len(tile.animation_frames) for tile in ordered], dtype=np.int64)
+        offsets = np.zeros(len(ordered) + 1, dtype='<u8')
+        np.cumsum(counts, out=offsets[1:])
+        frames = np.fromiter(
+            (frame for tile in ordered for frame in tile.animation_frames),
+            dtype='<i4', count=int(offsets[-1])
+        )
+        
+        # Free-form per-tile metadata is rare; keep it as JSON for just those tiles
+        tile_metadata = {str(tile.id): tile.metadata for tile in ordered if tile.metadata}
+        return {
+            'tiles': records,
+            'frame_offsets': offsets,
+            'frames': frames,
+            'tile_metadata': json.dumps(tile_metadata) if tile_metadata else None
+        }
+    
+    @staticmethod
+    def _read_tiles(tileset_group) -> dict:
+        # \"\"\"Tile ID -> TileData from the typed tile datasets\"\"\"
+        from core.models import TileData
+        import pygame
+        
+        records = tileset_group['tiles'][:]
+        offsets = tileset_group['frame_offsets'][:].tolist()
+        frames = tileset_group['frames'][:].tolist()
+        tile_metadata = {}
+        if 'tile_metadata' in tileset_group:
+            tile_metadata = json.loads(tileset_group['tile_metadata'][()])
+        
+        tiles = {}
+        for i, (tid, rect, solid) in enumerate(zip(
+            records['id'].tolist(), records['rect'].tolist(), records['solid'].tolist()
+        )):
+            tiles[tid] = TileData(
+                id=tid,
+                texture_rect=pygame.Rect(*rect),
+                solid=bool(solid),
+                animation_frames=frames[offsets[i]:offsets[i + 1]],
+                metadata=tile_metadata.get(str(tid), {})
+            )
+        return tiles
+    
+    @staticmethod
+    def _read_tileset_meta(tileset_group):
+        # \"\"\"Tileset name/path/tile size from attributes or a format 1 JSON dataset; None if absent\"\"\"
+        if 'name' in tileset_group.attrs:
+            attrs = tileset_group.attrs
+            return {
+                'name': str(attrs['name']),
+                'path': str(attrs['path']),
+                'tile_width': int(attrs['tile_width']),
+                'tile_height': int(attrs['tile_height']),
+                'margin': int(attrs.get('margin', 0)),
+                'spacing': int(attrs.get('spacing', 0))
+            }
+        if 'metadata' in tileset_group:
+            return json.loads(tileset_group['metadata'][()])
+        return None
+    
+    @staticmethod
+    def _read_properties(layer_group) -> dict:
+        # \"\"\"Layer properties from attributes, or a format 1 JSON dataset\"\"\"
+        if 'properties' in layer_group:
+            return json.loads(layer_group['properties'][()])
+        
+        attrs = layer_group.attrs
+        props = {key: attrs[key] for key in HDF5Exporter.LAYER_ATTRS if key in attrs}
+        props['name'] = str(props['name'])
+        props['type'] = str(props['type'])
+        props['z_index'] = int(props['z_index'])
+        for key in ('visible', 'locked', 'interacts_with_layers'):
+            if key in props:
+                props[key] = bool(props[key])
+        if 'opacity' in props:
+            props['opacity'] = float(props['opacity'])
+        return props
+    
+    @staticmethod
+    def _build_layer(layer_group, grid_width: int, grid_height: int):
+        # \"\"\"Layer (properties and whole grid) from a layers/<name> group\"\"\"
+        from core.models import Layer, LayerType
+        
+        # Load properties
+        props = HDF5Exporter._read_properties(layer_group)
+        
+        # Create layer
+        layer_type = LayerType(props['type'])
+        layer = Layer(
+            props['name'],
+            grid_width,
+            grid_height,
+            layer_type
+        )
+        layer.visible = props['visible']
+        layer.locked = props.get('locked', False)
+        layer.opacity = props.get('opacity', 1.0)
+        layer.z_index = props['z_index']
+        layer.interacts_with_layers = props.get('interacts_with_layers', True)
+        
+        # Load tile grid
+        layer.tile_grid = layer_group['tile_grid'][:]
+        return layer
+
+
+class HDF5ProjectReader:
+    # \"\"\"Lazy view of an HDF5 export: the file stays open and layer cells are read on demand\"\"\"
+    #
+    # Only the chunks covering a requested region are read and decompressed, so tools can
+    # sample a many-layer world file without loading every grid. root selects a project
+    # stored below the file root (a level of a world file). Use as a context manager
+    # or call close().
+    
+    def __init__(self, filepath: str, root: str = '/'):
+        self.path = filepath
+        self._file = h5py.File(filepath, 'r')
+        self._root = self._file[root]
+        
+        metadata = json.loads(self._root['project_metadata'][()])
+        dims = metadata['dimensions']
+        self.name = metadata['project']['name']
+        self.grid_width = dims['grid_width']
+        self.grid_height = dims['grid_height']
+        self.tile_width = dims['tile_width']
+        self.tile_height = dims['tile_height']
+        self.metadata = metadata.get('metadata', {})
+        
+        # Group names in z order (properties are small JSON strings, read once)
+        groups = self._root['layers'] if 'layers' in self._root else {}
+        self._properties = {key: HDF5Exporter._read_properties(groups[key]) for key in groups.keys()}
+        self._groups = sorted(self._properties, key=lambda key: self._properties[key]['z_index'])
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        self._file.close()
+    
+    @property
+    def layer_names(self) -> List[str]:
+        return [self._properties[key]['name'] for key in self._groups]
+    
+    def layer_properties(self, name: str) -> dict:
+        return dict(self._properties[self._group_key(name)])
+    
+    def layer_shape(self, name: str) -> Tuple[int, int]:
+        return self._dataset(name).shape
+    
+    def read_region(self, name: str, x: int, y: int, width: int, height: int) -> np.ndarray:
+        # \"\"\"Read a width x height block at (x, y); cells outside the layer come back as 0\"\"\"
+        dataset = self._dataset(name)
+        grid_height, grid_width = dataset.shape
+        
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, grid_width), min(y + height, grid_height)
+        block = np.zeros((max(height, 0), max(width, 0)), dtype=np.int32)
+        if x1 > x0 and y1 > y0:
+            block[y0 - y:y1 - y, x0 - x:x1 - x] = dataset[y0:y1, x0:x1]
+        return block
+    
+    def load_layer(self, name: str):
+        # \"\"\"Fully load one layer as a regular Layer\"\"\"
+        return HDF5Exporter._build_layer(
+            self._root['layers'][self._group_key(name)], self.grid_width, self.grid_height
+        )
+    
+    def _group_key(self, name: str) -> str:
+        for key in self._groups:
+            if self._properties[key]['name'] == name:
+                return key
+        raise KeyError(f"No layer named '{name}'")
+    
+    def _dataset(self, name: str):
+        return self._root['layers'][self._group_key(name)]['tile_grid']
 
 
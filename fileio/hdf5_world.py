@@ -0,0 +1,196 @@
+import hashlib
+import os
+import zlib
+import h5py
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional, Sequence, Tuple
+from core.constants import LAYER_CHUNK_SIZE
+from .hdf5_exporter import HDF5Exporter, HDF5ProjectReader
+
+class HDF5WorldExporter:
+    # \"\"\"Many projects (levels) in one HDF5 file, with each distinct tileset stored once\"\"\"
+    #
+    # Layout: /tilesets/<key>/ is a tileset group as HDF5Exporter writes it, keyed by a hash of
+    # the image bytes, tile size and tile definitions. /levels/<name>/ is laid out like an
+    # exported project file whose 'tileset' member is a soft link to its shared tileset group,
+    # so HDF5Exporter.read_project and HDF5ProjectReader read a level as they read a file.
+    # The root attribute 'levels' lists level names in export order.
+    
+    FORMAT = 'world'
+    
+    @staticmethod
+    def export_world(levels: Sequence[Tuple[str, object]], filepath: str, compression: str = 'gzip',
+                     level: int = 6, chunk_size: int = LAYER_CHUNK_SIZE, workers: Optional[int] = None) -> dict:
+        # \"\"\"Write (name, project) pairs to one HDF5 file; returns counts of levels and tilesets\"\"\"
+        # \"\"\"A project may also be given as a project directory or HDF5 file path. Worker threads
+        # load levels, hash tilesets and compress gzip chunks; only this thread writes the file,
+        # which replaces filepath once complete\"\"\"
+        if compression not in HDF5Exporter.COMPRESSIONS:
+            raise ValueError(f"Unknown HDF5 compression: {compression}")
+        
+        names = [name for name, _ in levels]
+        for name in names:
+            if not name or '/' in name or name == '.':
+                raise ValueError(f"Invalid level name: {name!r}")
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate level names: {', '.join(duplicates)}")
+        
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(levels)))
+        
+        target = Path(filepath)
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        summary = {'levels': 0, 'tilesets': 0, 'shared_tileset_bytes': 0}
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor, h5py.File(tmp_path, 'w') as f:
+                f.attrs['format'] = HDF5WorldExporter.FORMAT
+                f.attrs['levels'] = names
+                f.create_group('tilesets')
+                f.create_group('levels')
+                
+                # Keep a bounded number of prepared levels in flight; write them in input order
+                items = iter(levels)
+                pending = deque()
+                
+                def submit_next():
+                    item = next(items, None)
+                    if item is not None:
+                        pending.append(executor.submit(
+                            HDF5WorldExporter._prepare_level, item[0], item[1], compression, level, chunk_size
+                        ))
+                
+                for _ in range(workers * 2):
+                    submit_next()
+                while pending:
+                    prepared = pending.popleft().result()
+                    submit_next()
+                    HDF5WorldExporter._write_level(f, prepared, compression, level, chunk_size, summary)
+            
+            os.replace(tmp_path, target)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        
+        return summary
+    
+    @staticmethod
+    def level_names(filepath: str) -> List[str]:
+        with h5py.File(filepath, 'r') as f:
+            return [str(name) for name in f.attrs['levels']]
+    
+    @staticmethod
+    def load_level(filepath: str, name: str):
+        # \"\"\"Load one level as a MapProject; other levels are not read\"\"\"
+        with h5py.File(filepath, 'r') as f:
+            return HDF5Exporter.read_project(HDF5WorldExporter._level_group(f, name))
+    
+    @staticmethod
+    def open_level(filepath: str, name: str) -> HDF5ProjectReader:
+        # \"\"\"Open one level lazily; its layer regions are read on demand\"\"\"
+        with h5py.File(filepath, 'r') as f:
+            HDF5WorldExporter._level_group(f, name)  # Fail early on unknown names
+        return HDF5ProjectReader(filepath, root=f"levels/{name}")
+    
+    @staticmethod
+    def _level_group(f, name: str):
+        if name not in f['levels']:
+            raise KeyError(f"No level named '{name}'")
+        return f['levels'][name]
+    
+    @staticmethod
+    def _prepare_level(name: str, project, compression: str, level: int, chunk_size: int) -> SimpleNamespace:
+        # Worker thread: everything CPU-heavy, so the writer only copies bytes into the file
+        if isinstance(project, (str, Path)):
+            project = HDF5WorldExporter._load(str(project))
+        
+        tileset_key, tileset_payload = None, None
+        if project.tileset and project.tileset.image:
+            tileset_payload = HDF5Exporter._tileset_payload(project.tileset)
+            tileset_key = HDF5WorldExporter._tileset_key(tileset_payload)
+        
+        layers = []
+        for layer in project.layers:
+            storage = HDF5Exporter._grid_storage(layer.tile_grid.shape, compression, level, chunk_size, True)
+            chunks = None
+            if compression == 'gzip' and 'chunks' in storage:
+                chunks = HDF5WorldExporter._compress_chunks(layer.tile_grid, storage['chunks'], level)
+            layers.append((layer, chunks))
+        
+        return SimpleNamespace(
+            name=name, project=project, tileset_key=tileset_key,
+            tileset_payload=tileset_payload, layers=layers
+        )
+    
+    @staticmethod
+    def _write_level(f, prepared: SimpleNamespace, compression: str, level: int, chunk_size: int, summary: dict):
+        level_group = f['levels'].create_group(prepared.name)
+        HDF5Exporter._write_project_metadata(level_group, prepared.project)
+        
+        if prepared.tileset_key is not None:
+            tilesets = f['tilesets']
+            if prepared.tileset_key in tilesets:
+                summary['shared_tileset_bytes'] += len(prepared.tileset_payload['image'] or b'')
+            else:
+                HDF5Exporter._write_tileset(tilesets.create_group(prepared.tileset_key), prepared.tileset_payload)
+                summary['tilesets'] += 1
+            level_group['tileset'] = h5py.SoftLink(f"/tilesets/{prepared.tileset_key}")
+        
+        layers_group = level_group.create_group('layers')
+        for layer, chunks in prepared.layers:
+            layer_group = layers_group.create_group(layer.name)
+            storage = HDF5Exporter._grid_storage(layer.tile_grid.shape, compression, level, chunk_size, True)
+            if chunks is None:
+                layer_group.create_dataset('tile_grid', data=layer.tile_grid, **storage)
+            else:
+                # Chunks were deflated by a worker with the shuffle + gzip pipeline HDF5 expects
+                dataset = layer_group.create_dataset('tile_grid', shape=layer.tile_grid.shape, dtype='<i4', **storage)
+                for offset, data in chunks:
+                    dataset.id.write_direct_chunk(offset, data)
+            HDF5Exporter._write_layer_attrs(layer_group, layer)
+        
+        summary['levels'] += 1
+    
+    @staticmethod
+    def _compress_chunks(grid: np.ndarray, chunks: Tuple[int, int], level: int) -> List[Tuple[Tuple[int, int], bytes]]:
+        # \"\"\"Chunks as HDF5's shuffle + deflate filters would store them (edge chunks zero-padded)\"\"\"
+        chunk_h, chunk_w = chunks
+        height, width = grid.shape
+        out = []
+        for y in range(0, height, chunk_h):
+            for x in range(0, width, chunk_w):
+                block = grid[y:y + chunk_h, x:x + chunk_w]
+                if block.shape != (chunk_h, chunk_w):
+                    padded = np.zeros((chunk_h, chunk_w), dtype='<i4')
+                    padded[:block.shape[0], :block.shape[1]] = block
+                    block = padded
+                # Shuffle: byte 0 of every ID, then byte 1, ... (element size 4)
+                shuffled = np.ascontiguousarray(block, dtype='<i4').view(np.uint8).reshape(-1, 4).T.tobytes()
+                out.append(((y, x), zlib.compress(shuffled, level)))
+        return out
+    
+    @staticmethod
+    def _tileset_key(payload: dict) -> str:
+        # \"\"\"Content hash of a tileset: image, tile size and tile definitions (not its name or path)\"\"\"
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(payload['image'] or b'')
+        digest.update(np.array(
+            [payload['attrs']['tile_width'] or 0, payload['attrs']['tile_height'] or 0], dtype='<i8'
+        ).tobytes())
+        for key in ('tiles', 'frame_offsets', 'frames'):
+            digest.update(np.ascontiguousarray(payload[key]).tobytes())
+        digest.update((payload['tile_metadata'] or '').encode('utf-8'))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _load(path: str):
+        from .project_io import ProjectIO
+        
+        if Path(path).suffix.lower() in ('.h5', '.hdf5'):
+            return ProjectIO.import_from_hdf5(path)
+        return ProjectIO.load_project(path, workers=1)  # Levels are already loaded in parallel
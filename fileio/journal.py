@@ -0,0 +1,225 @@
+import os
+import struct
+import threading
+import zlib
+import numpy as np
+from pathlib import Path
+from typing import Iterator, Tuple
+from core.constants import JOURNAL_FILE, JOURNAL_FLUSH_INTERVAL
+from .container import ContainerIO
+
+class EditJournal:
+    # \"\"\"Append-only write-ahead log of cell edits made since the last save\"\"\"
+    #
+    # File: 8-byte header (magic, version) followed by records of
+    #   '<II' payload length, crc32(payload)
+    #   payload: '<BHI' flags, layer name length, cell count; layer name (utf-8);
+    #            indices ('<u4', or '<u8' with FLAG_WIDE); tile IDs ('<i4')
+    #            (the arrays zlib-compressed together when FLAG_ZLIB is set)
+    # With FLAG_REGION (version 2) the indices are replaced by '<IIII' x, y, width, height
+    # and the tile IDs are that block in row-major order.
+    # A torn or corrupt tail (e.g. a crash mid-write) ends replay at the last good record.
+    
+    MAGIC = b'AEJL'
+    VERSION = 2
+    READ_VERSIONS = (1, 2)
+    HEADER = '<4sI'
+    HEADER_SIZE = 8
+    RECORD_HEADER = '<II'
+    PAYLOAD_HEADER = '<BHI'
+    FLAG_WIDE = 1
+    FLAG_ZLIB = 2
+    FLAG_REGION = 4
+    REGION_HEADER = '<IIII'
+    COMPRESS_MIN_CELLS = 4096  # Smaller records are cheaper to write raw
+    
+    def __init__(self, filepath: str, flush_interval: float = JOURNAL_FLUSH_INTERVAL):
+        self.path = Path(filepath)
+        self.flush_interval = flush_interval
+        self.error = None  # Last write error, reported by the editor
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(struct.pack(EditJournal.HEADER, EditJournal.MAGIC, EditJournal.VERSION))
+            self._file.flush()
+        
+        # Edits are queued as (layer name, cells, tile IDs); a worker encodes and writes
+        # them in batches with one fsync each. History never writes into arrays it has
+        # passed to listeners, so queuing them without a copy is safe.
+        self._pending = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # Keeps batches in order between worker and flush()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="edit-journal", daemon=True)
+        self._thread.start()
+    
+    @staticmethod
+    def journal_path(project_path: str) -> Path:
+        return ContainerIO.sidecar_dir(project_path) / JOURNAL_FILE
+    
+    def append(self, layer, cells, tile_ids: np.ndarray):
+        # \"\"\"Queue one record (EditHistory listener signature); returns at once, the journal
+        # thread does the encoding, compression and disk writes\"\"\"
+        with self._cond:
+            self._pending.append((layer.name, cells, tile_ids))
+            self._cond.notify()
+    
+    def flush(self):
+        # \"\"\"Write and fsync everything appended so far (e.g. right before a save)\"\"\"
+        self._write_pending()
+    
+    def truncate(self):
+        # \"\"\"Drop all records after a successful save (pending ones included)\"\"\"
+        with self._io_lock:
+            with self._cond:
+                self._pending.clear()
+            EditJournal.truncate_file(self.path)
+    
+    def close(self):
+        # \"\"\"Flush remaining records and stop the worker\"\"\"
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._cond:
+            self._cond.notify()
+        self._thread.join()
+        self._write_pending()
+        self._file.close()
+    
+    def _run(self):
+        while not self._closed.is_set():
+            with self._cond:
+                while not self._pending and not self._closed.is_set():
+                    self._cond.wait()
+            
+            # Group commit: let more records arrive so one fsync covers the batch
+            self._closed.wait(self.flush_interval)
+            self._write_pending()
+    
+    def _write_pending(self):
+        with self._io_lock:
+            with self._cond:
+                if not self._pending:
+                    return
+                pending = self._pending
+                self._pending = []
+            try:
+                data = b''.join(EditJournal.encode_record(*record) for record in pending)
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except (OSError, struct.error) as e:  # struct.error: a record that cannot be encoded
+                self.error = str(e)
+    
+    @staticmethod
+    def truncate_file(filepath: str):
+        # \"\"\"Reset a journal on disk to just its header\"\"\"
+        path = Path(filepath)
+        if not path.exists():
+            return
+        with open(path, 'r+b') as f:
+            f.truncate(EditJournal.HEADER_SIZE)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    @staticmethod
+    def encode_record(layer_name: str, cells, tile_ids: np.ndarray) -> bytes:
+        # \"\"\"Binary record for cells of one layer set to tile_ids\"\"\"
+        # \"\"\"cells is flat indices, or the (x, y) origin of tile_ids as a 2D block\"\"\"
+        if isinstance(cells, tuple):
+            height, width = tile_ids.shape
+            count = height * width
+            flags = EditJournal.FLAG_REGION
+            arrays = (
+                struct.pack(EditJournal.REGION_HEADER, cells[0], cells[1], width, height)
+                + np.ascontiguousarray(tile_ids, dtype='<i4').tobytes()
+            )
+        else:
+            indices = np.asarray(cells)
+            count = len(indices)
+            wide = count > 0 and int(indices.max()) >= 2 ** 32
+            flags = EditJournal.FLAG_WIDE if wide else 0
+            arrays = (
+                np.ascontiguousarray(indices, dtype='<u8' if wide else '<u4').tobytes()
+                + np.ascontiguousarray(np.broadcast_to(tile_ids, indices.shape), dtype='<i4').tobytes()
+            )
+        
+        if count >= EditJournal.COMPRESS_MIN_CELLS:
+            arrays = zlib.compress(arrays, level=1)
+            flags |= EditJournal.FLAG_ZLIB
+        
+        name = layer_name.encode('utf-8')
+        payload = struct.pack(EditJournal.PAYLOAD_HEADER, flags, len(name), count) + name + arrays
+        return struct.pack(EditJournal.RECORD_HEADER, len(payload), zlib.crc32(payload)) + payload
+    
+    @staticmethod
+    def read_records(filepath: str) -> Iterator[Tuple[str, object, np.ndarray]]:
+        # \"\"\"Yield (layer name, cells, tile IDs) up to the first torn or corrupt record\"\"\"
+        # \"\"\"cells is int64 flat indices, or an (x, y) origin with the tile IDs as a 2D block\"\"\"
+        with open(filepath, 'rb') as f:
+            header = f.read(EditJournal.HEADER_SIZE)
+            if len(header) < EditJournal.HEADER_SIZE:
+                return
+            magic, version = struct.unpack(EditJournal.HEADER, header)
+            if magic != EditJournal.MAGIC:
+                raise ValueError(f"Invalid journal format: {magic}")
+            if version not in EditJournal.READ_VERSIONS:
+                raise ValueError(f"Unsupported journal version: {version}")
+            
+            record_header_size = struct.calcsize(EditJournal.RECORD_HEADER)
+            payload_header_size = struct.calcsize(EditJournal.PAYLOAD_HEADER)
+            while True:
+                record_header = f.read(record_header_size)
+                if len(record_header) < record_header_size:
+                    return
+                length, crc = struct.unpack(EditJournal.RECORD_HEADER, record_header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                
+                flags, name_length, count = struct.unpack_from(EditJournal.PAYLOAD_HEADER, payload)
+                name_end = payload_header_size + name_length
+                name = payload[payload_header_size:name_end].decode('utf-8')
+                arrays = payload[name_end:]
+                if flags & EditJournal.FLAG_ZLIB:
+                    arrays = zlib.decompress(arrays)
+                
+                if flags & EditJournal.FLAG_REGION:
+                    x, y, width, height = struct.unpack_from(EditJournal.REGION_HEADER, arrays)
+                    block = np.frombuffer(
+                        arrays, dtype='<i4', count=count, offset=struct.calcsize(EditJournal.REGION_HEADER)
+                    )
+                    yield name, (x, y), block.reshape(height, width)
+                    continue
+                
+                index_dtype = np.dtype('<u8' if flags & EditJournal.FLAG_WIDE else '<u4')
+                split = count * index_dtype.itemsize
+                yield (
+                    name,
+                    np.frombuffer(arrays, dtype=index_dtype, count=count).astype(np.int64),
+                    np.frombuffer(arrays, dtype='<i4', count=count, offset=split)
+                )
+    
+    @staticmethod
+    def replay(filepath: str, project) -> int:
+        # \"\"\"Apply a journal's records to a project's layers in order; returns records applied\"\"\"
+        # \"\"\"Records for layers that no longer exist (renamed/removed since the save) or whose
+        # cells failed to load are skipped\"\"\"
+        layers = {layer.name: layer for layer in project.layers if not layer.load_error}
+        applied = 0
+        for name, cells, tile_ids in EditJournal.read_records(filepath):
+            layer = layers.get(name)
+            if layer is None:
+                continue
+            if isinstance(cells, tuple):
+                x, y = cells
+                if x + tile_ids.shape[1] > layer.width or y + tile_ids.shape[0] > layer.height:
+                    continue
+                layer.write_region(x, y, tile_ids)
+            else:
+                if len(cells) and int(cells.max()) >= layer.tile_grid.size:
+                    continue
+                layer.write_cells(cells, tile_ids)
+            applied += 1
+        return applied
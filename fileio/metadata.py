@@ -1,7 +1,9 @@
+import copy
 import json
 from datetime import datetime
 from typing import Dict, Any
 from pathlib import Path
+from .atomic import atomic_write
 
 class MetadataIO:
     # \"\"\"Save/load project metadata as JSON\"\"\"
@@ -9,6 +11,11 @@ class MetadataIO:
     @staticmethod
     def save_metadata(project, filepath: str):
         # \"\"\"Save project metadata to JSON\"\"\"
+        MetadataIO.write_metadata(MetadataIO.build_metadata(project), filepath)
+    
+    @staticmethod
+    def build_metadata(project) -> Dict[str, Any]:
+        # \"\"\"Snapshot project metadata as a plain dict (cheap; safe to hand to another thread)\"\"\"
         from core.models import LayerType
         
         metadata = {
@@ -25,7 +32,8 @@ class MetadataIO:
                 'tile_height': project.tile_height
             },
             'tileset': None,
-            'layers': []
+            'layers': [],
+            'metadata': copy.deepcopy(project.metadata)
         }
         
         # Add tileset info
@@ -35,6 +43,8 @@ class MetadataIO:
                 'path': project.tileset.image_path,
                 'tile_width': project.tileset.tile_width,
                 'tile_height': project.tileset.tile_height,
+                'margin': project.tileset.margin,
+                'spacing': project.tileset.spacing,
                 'tile_count': len(project.tileset.tiles)
             }
         
@@ -48,12 +58,17 @@ class MetadataIO:
                 'locked': layer.locked,
                 'opacity': layer.opacity,
                 'z_index': layer.z_index,
-                'interacts_with_layers': layer.interacts_with_layers
+                'interacts_with_layers': layer.interacts_with_layers,
+                'hash': layer.saved_hash
             }
             metadata['layers'].append(layer_data)
         
-        # Write JSON
-        with open(filepath, 'w') as f:
+        return metadata
+    
+    @staticmethod
+    def write_metadata(metadata: Dict[str, Any], filepath: str):
+        # \"\"\"Write a metadata dict from build_metadata to JSON\"\"\"
+        with atomic_write(filepath, 'w') as f:
             json.dump(metadata, f, indent=2)
     
     @staticmethod
@@ -0,0 +1,103 @@
+import json
+import struct
+import zlib
+import numpy as np
+from .atomic import atomic_write
+
+class PatchIO:
+    # \"\"\"Save/load project patches (editor.project_diff.ProjectPatch) as compact binary files\"\"\"
+    #
+    # File: '<4sII' magic, version, header length; the JSON header (one entry per layer change:
+    # op, name, properties, and run/cell counts or the grid shape); then one zlib stream of the
+    # arrays in header order. A 'change' stores runs as gap-before-run and run-length arrays
+    # ('<u4', or '<u8' when 'wide'), then old and new tile IDs ('<i4'); 'add' and 'remove' store
+    # the layer's grid ('<i4'). Gaps keep the run starts small, which zlib packs tightly.
+    
+    MAGIC = b'AEPT'
+    VERSION = 1
+    HEADER = '<4sII'
+    HEADER_SIZE = 12
+    
+    @staticmethod
+    def save_patch(patch, filepath: str, level: int = 1):
+        # \"\"\"Write a patch (replaced atomically)\"\"\"
+        entries, arrays = [], []
+        for change in patch.changes:
+            entry = {'op': change.op, 'name': change.name}
+            if change.op == 'change':
+                entry['properties'] = {key: list(values) for key, values in change.properties.items()}
+                runs = change.runs
+                entry['runs'] = 0 if runs is None else len(runs.starts)
+                entry['cells'] = 0 if runs is None else runs.count
+                if runs is not None:
+                    wide = int(runs.starts[-1] + runs.lengths[-1]) >= 2 ** 32
+                    index_dtype = '<u8' if wide else '<u4'
+                    entry['wide'] = wide
+                    previous_ends = np.concatenate(([0], (runs.starts + runs.lengths)[:-1]))
+                    arrays += [
+                        np.ascontiguousarray(runs.starts - previous_ends, dtype=index_dtype),
+                        np.ascontiguousarray(runs.lengths, dtype=index_dtype),
+                        np.ascontiguousarray(runs.old_ids, dtype='<i4'),
+                        np.ascontiguousarray(runs.new_ids, dtype='<i4'),
+                    ]
+            else:
+                entry['properties'] = change.properties
+                entry['shape'] = list(change.grid.shape)
+                arrays.append(np.ascontiguousarray(change.grid, dtype='<i4'))
+            entries.append(entry)
+        
+        header = json.dumps({'changes': entries}).encode('utf-8')
+        with atomic_write(filepath) as f:
+            f.write(struct.pack(PatchIO.HEADER, PatchIO.MAGIC, PatchIO.VERSION, len(header)))
+            f.write(header)
+            compressor = zlib.compressobj(level)
+            for array in arrays:
+                f.write(compressor.compress(array.reshape(-1).view(np.uint8)))
+            f.write(compressor.flush())
+    
+    @staticmethod
+    def load_patch(filepath: str):
+        # \"\"\"Read a patch written by save_patch\"\"\"
+        from editor.project_diff import CellRuns, LayerChange, ProjectPatch
+        
+        with open(filepath, 'rb') as f:
+            fixed = f.read(PatchIO.HEADER_SIZE)
+            if len(fixed) < PatchIO.HEADER_SIZE:
+                raise ValueError("Truncated patch file")
+            magic, version, header_length = struct.unpack(PatchIO.HEADER, fixed)
+            if magic != PatchIO.MAGIC:
+                raise ValueError(f"Invalid patch format: {magic}")
+            if version != PatchIO.VERSION:
+                raise ValueError(f"Unsupported patch version: {version}")
+            header = json.loads(f.read(header_length))
+            data = zlib.decompress(f.read())
+        
+        offset = 0
+        
+        def take(dtype: str, count: int) -> np.ndarray:
+            nonlocal offset
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+        
+        changes = []
+        for entry in header['changes']:
+            if entry['op'] == 'change':
+                runs = None
+                if entry['runs']:
+                    index_dtype = '<u8' if entry.get('wide') else '<u4'
+                    gaps = take(index_dtype, entry['runs']).astype(np.int64)
+                    lengths = take(index_dtype, entry['runs']).astype(np.int64)
+                    # Each run starts its gap after the previous run's end
+                    starts = np.cumsum(gaps) + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+                    runs = CellRuns(starts, lengths, take('<i4', entry['cells']), take('<i4', entry['cells']))
+                properties = {key: tuple(values) for key, values in entry['properties'].items()}
+                changes.append(LayerChange('change', entry['name'], properties, runs))
+            else:
+                height, width = entry['shape']
+                grid = take('<i4', height * width).reshape(height, width).astype(np.int32)
+                changes.append(LayerChange(entry['op'], entry['name'], entry['properties'], grid=grid))
+        
+        if offset != len(data):
+            raise ValueError("Patch data does not match its header")
+        return ProjectPatch(changes)
@@ -1,15 +1,41 @@
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Callable, List, Optional, Sequence
 from .binary import BinaryLayerIO
+from .compression import ChunkCodec
+from .container import ContainerIO
 from .metadata import MetadataIO
 from .hdf5_exporter import HDF5Exporter
+from .hdf5_world import HDF5WorldExporter
+from .journal import EditJournal
+from .tiled_exporter import TiledExporter
 
 class ProjectIO:
     # \"\"\"Manage complete project save/load\"\"\"
     
     @staticmethod
-    def save_project(project, directory: str):
-        # \"\"\"Save project to directory (binary layers + JSON metadata)\"\"\"
+    def save_project(project, directory: str, layer_version: int = BinaryLayerIO.VERSION,
+                     workers: Optional[int] = None, codec: str = 'zlib', filters: Sequence[str] = ()):
+        # \"\"\"Save project to directory (binary layers + JSON metadata), or to a single
+        # .aether container file when directory is one (see ContainerIO)\"\"\"
+        # \"\"\"layer_version=BinaryLayerIO.VERSION_MAPPED stores raw layers that open via mmap;
+        # layers are written on `workers` threads (default: CPU count, 1 = serial);
+        # codec/filters select the v2 chunk compression (see fileio.compression)\"\"\"
+        ProjectIO.check_loaded(project)
+        if ContainerIO.is_container(directory):
+            ContainerIO.save_container(
+                project, directory, raw_layers=layer_version == BinaryLayerIO.VERSION_MAPPED,
+                codec=codec, filters=filters, workers=workers
+            )
+            for layer in project.layers:
+                layer.dirty = False
+            EditJournal.truncate_file(EditJournal.journal_path(directory))
+            project.project_path = str(directory)
+            return str(directory)
+        
         project_dir = Path(directory)
         project_dir.mkdir(parents=True, exist_ok=True)
         
@@ -17,26 +43,121 @@ class ProjectIO:
         layers_dir = project_dir / "layers"
         layers_dir.mkdir(exist_ok=True)
         
-        # Save each layer as binary file
-        for layer in project.layers:
-            layer_path = layers_dir / f"{layer.name}.layer"
-            BinaryLayerIO.save_layer(layer, str(layer_path))
+        # Save each layer as binary file, skipping layers whose file is already current
+        chunk_codec = ChunkCodec(codec, filters)
+        layer_paths = [layers_dir / f"{layer.name}.layer" for layer in project.layers]
+        ProjectIO._map_layers(
+            lambda item: ProjectIO._save_layer_if_changed(item[0], item[1], layer_version, chunk_codec),
+            list(zip(project.layers, layer_paths)),
+            workers
+        )
+        layer_files = {path.name for path in layer_paths}
         
         # Save metadata
         metadata_path = project_dir / "metadata.json"
         MetadataIO.save_metadata(project, str(metadata_path))
         
+        # Remove files of deleted or renamed layers (after metadata no longer lists them)
+        for stale_path in layers_dir.glob("*.layer"):
+            if stale_path.name not in layer_files:
+                stale_path.unlink()
+        
+        # Everything journaled since the last save is now on disk
+        EditJournal.truncate_file(EditJournal.journal_path(project_dir))
+        
         # Store project path
         project.project_path = str(project_dir)
         
         return str(project_dir)
     
     @staticmethod
-    def load_project(directory: str):
-        # \"\"\"Load project from directory\"\"\"
-        from core.models import MapProject, TileSet, LayerType
-        import pygame
+    def load_project(directory: str, workers: Optional[int] = None, replay_journal: bool = True):
+        # \"\"\"Load project from directory or .aether container (layers are decoded on worker threads)\"\"\"
+        # \"\"\"Edits journaled after the last save are replayed unless replay_journal is False\"\"\"
+        if Path(directory).is_file():
+            project = ContainerIO.load_container(directory, workers)
+        else:
+            project = ProjectIO._load_directory(directory, workers)
+        project.project_path = str(directory)
+        
+        # Re-apply edits made after the last save (replayed layers are left dirty)
+        journal_path = EditJournal.journal_path(directory)
+        if replay_journal and journal_path.exists():
+            EditJournal.replay(str(journal_path), project)
+        
+        return project
+    
+    @staticmethod
+    def load_skeleton(directory: str):
+        # \"\"\"Open a project without reading layer cells or the tileset image (fast, for progressive opens)\"\"\"
+        # \"\"\"Returns (project, tileset_reader, layer_readers). Layers have their properties but
+        # empty grids. tileset_reader() -> TileSet (or None when there is no tileset), and each
+        # layer reader is (layer, read(), read_region(x, y, w, h) or None); read_region returns
+        # None when the file has no cheaper partial read. Readers are safe on worker threads.
+        # Journaled edits are not replayed; apply EditJournal.replay once the layers are in.\"\"\"
+        if Path(directory).is_file():
+            project, tileset_reader, layer_readers = ContainerIO.load_skeleton(directory)
+            project.project_path = str(directory)
+            return project, tileset_reader, layer_readers
+        
+        from core.models import Layer
         
+        project_dir = Path(directory)
+        metadata_path = project_dir / "metadata.json"
+        if not metadata_path.exists():
+            raise FileNotFoundError(f"No metadata.json found in {directory}")
+        
+        metadata = MetadataIO.load_metadata(str(metadata_path))
+        project = ProjectIO._project_from_metadata(metadata, project_dir, load_tileset=False)
+        project.project_path = str(directory)
+        
+        tileset_reader = None
+        if metadata.get('tileset'):
+            tileset_reader = partial(ProjectIO._load_tileset, metadata['tileset'], project_dir)
+        
+        layers_dir = project_dir / "layers"
+        layer_readers = []
+        for layer_meta in metadata.get('layers', []):
+            layer_path = layers_dir / layer_meta['file']
+            if not layer_path.exists():
+                continue
+            
+            layer = Layer(layer_meta['name'], project.grid_width, project.grid_height)
+            ProjectIO._apply_layer_meta(layer, layer_meta)
+            layer.saved_file = os.path.abspath(layer_path)
+            layer.saved_hash = layer_meta.get('hash')
+            layer.dirty = False
+            project.append_layer(layer)
+            
+            layer_readers.append((
+                layer,
+                partial(ProjectIO._read_layer_grid, str(layer_path)),
+                partial(ProjectIO._read_layer_region, str(layer_path))
+            ))
+        
+        project.layers.sort(key=lambda l: l.z_index)
+        return project, tileset_reader, layer_readers
+    
+    @staticmethod
+    def check_loaded(project):
+        # \"\"\"Raise ValueError if a layer's cells failed to load (writing it would store an empty grid)\"\"\"
+        for layer in project.layers:
+            if layer.load_error:
+                raise ValueError(f"Layer '{layer.name}' failed to load ({layer.load_error}); reopen the project first")
+    
+    @staticmethod
+    def _read_layer_grid(layer_path: str):
+        return BinaryLayerIO.load_layer(layer_path).tile_grid
+    
+    @staticmethod
+    def _read_layer_region(layer_path: str, x: int, y: int, width: int, height: int):
+        # Only chunked (v2) files read a region for less than the whole layer
+        if BinaryLayerIO.read_header(layer_path)['version'] != 2:
+            return None
+        return BinaryLayerIO.load_region(layer_path, x, y, width, height)
+    
+    @staticmethod
+    def _load_directory(directory: str, workers: Optional[int]):
         project_dir = Path(directory)
         metadata_path = project_dir / "metadata.json"
         
@@ -45,6 +166,40 @@ class ProjectIO:
         
         # Load metadata
         metadata = MetadataIO.load_metadata(str(metadata_path))
+        project = ProjectIO._project_from_metadata(metadata, project_dir)
+        
+        # Load layers: decode files concurrently, then set them up in metadata order
+        layers_dir = project_dir / "layers"
+        layer_metas = [
+            layer_meta for layer_meta in metadata.get('layers', [])
+            if (layers_dir / layer_meta['file']).exists()
+        ]
+        loaded = ProjectIO._map_layers(
+            lambda layer_meta: BinaryLayerIO.load_layer(str(layers_dir / layer_meta['file'])),
+            layer_metas,
+            workers
+        )
+        
+        for layer_meta, layer in zip(layer_metas, loaded):
+            ProjectIO._apply_layer_meta(layer, layer_meta)
+            
+            # The file on disk matches the grid, so an unedited layer is not rewritten
+            layer.saved_file = os.path.abspath(layers_dir / layer_meta['file'])
+            layer.saved_hash = layer_meta.get('hash')
+            layer.dirty = False
+            
+            project.append_layer(layer)
+        
+        # Sort by z_index
+        project.layers.sort(key=lambda l: l.z_index)
+        
+        return project
+    
+    @staticmethod
+    def _project_from_metadata(metadata: dict, project_dir: Path, image_bytes: Optional[bytes] = None,
+                               load_tileset: bool = True):
+        # \"\"\"Empty project plus tileset from a metadata dict; image_bytes is an embedded tileset image\"\"\"
+        from core.models import MapProject
         
         # Create project
         dims = metadata['dimensions']
@@ -55,55 +210,139 @@ class ProjectIO:
             tile_width=dims['tile_width'],
             tile_height=dims['tile_height']
         )
-        project.project_path = str(project_dir)
+        project.metadata = metadata.get('metadata', {})
         
         # Load tileset
-        if metadata.get('tileset'):
-            ts_meta = metadata['tileset']
-            tileset_path = ts_meta['path']
-            
-            # Try relative path first
-            if not Path(tileset_path).exists():
-                tileset_path = project_dir / Path(tileset_path).name
-            
-            if Path(tileset_path).exists():
-                tileset = TileSet(
-                    name=ts_meta['name'],
-                    image_path=str(tileset_path),
-                    tile_width=ts_meta['tile_width'],
-                    tile_height=ts_meta['tile_height']
-                )
-                tileset.slice_from_image()
-                project.tileset = tileset
-        
-        # Load layers
-        layers_dir = project_dir / "layers"
-        for layer_meta in metadata.get('layers', []):
-            layer_file = layers_dir / layer_meta['file']
-            
-            if layer_file.exists():
-                layer = BinaryLayerIO.load_layer(str(layer_file))
-                layer.name = layer_meta['name']
-                layer.layer_type = LayerType(layer_meta['type'])
-                layer.visible = layer_meta.get('visible', True)
-                layer.locked = layer_meta.get('locked', False)
-                layer.opacity = layer_meta.get('opacity', 1.0)
-                layer.z_index = layer_meta.get('z_index', 0)
-                layer.interacts_with_layers = layer_meta.get('interacts_with_layers', True)
-                
-                project.layers.append(layer)
-        
-        # Sort by z_index
-        project.layers.sort(key=lambda l: l.z_index)
+        if load_tileset and metadata.get('tileset'):
+            project.tileset = ProjectIO._load_tileset(metadata['tileset'], project_dir, image_bytes)
         
         return project
     
     @staticmethod
-    def export_to_hdf5(project, filepath: str):
-        # \"\"\"Export project to HDF5 file\"\"\"
-        HDF5Exporter.export_project(project, filepath)
+    def _load_tileset(ts_meta: dict, project_dir: Path, image_bytes: Optional[bytes] = None):
+        # \"\"\"TileSet described by metadata, or None when its image is neither on disk nor embedded\"\"\"
+        from core.models import TileSet
+        import pygame
+        
+        tileset_path = ts_meta['path']
+        
+        # Try relative path first
+        if not Path(tileset_path).exists():
+            tileset_path = project_dir / Path(tileset_path).name
+        
+        if not Path(tileset_path).exists() and image_bytes is None:
+            return None
+        
+        tileset = TileSet(
+            name=ts_meta['name'],
+            image_path=str(tileset_path) if Path(tileset_path).exists() else ts_meta['path'],
+            tile_width=ts_meta['tile_width'],
+            tile_height=ts_meta['tile_height'],
+            margin=ts_meta.get('margin', 0),
+            spacing=ts_meta.get('spacing', 0)
+        )
+        if tileset.image is None:
+            tileset.image = pygame.image.load(io.BytesIO(image_bytes))
+            tileset.image_bytes = image_bytes  # Kept so a later save can embed it again
+        tileset.slice_from_image()
+        return tileset
+    
+    @staticmethod
+    def _apply_layer_meta(layer, layer_meta: dict):
+        from core.models import LayerType
+        
+        layer.name = layer_meta['name']
+        layer.layer_type = LayerType(layer_meta['type'])
+        layer.visible = layer_meta.get('visible', True)
+        layer.locked = layer_meta.get('locked', False)
+        layer.opacity = layer_meta.get('opacity', 1.0)
+        layer.z_index = layer_meta.get('z_index', 0)
+        layer.interacts_with_layers = layer_meta.get('interacts_with_layers', True)
+    
+    @staticmethod
+    def _map_layers(func: Callable, items: list, workers: Optional[int]) -> List:
+        # \"\"\"Run func over items on a thread pool (zlib and file IO release the GIL)\"\"\"
+        # \"\"\"Results come back in item order. Once every item has finished, the first
+        # failure in item order is raised, so errors do not depend on thread timing\"\"\"
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(items))
+        
+        if workers <= 1:
+            return [func(item) for item in items]
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(func, item) for item in items]
+        
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                raise error
+        return [future.result() for future in futures]
+    
+    @staticmethod
+    def _save_layer_if_changed(layer, layer_path: Path, layer_version: int, chunk_codec: ChunkCodec) -> bool:
+        # \"\"\"Write a layer file unless it already holds this layer's cells; returns True if written\"\"\"
+        target = os.path.abspath(layer_path)
+        current = (
+            layer.saved_file == target
+            and layer_path.exists()
+            and ProjectIO._file_format_matches(target, layer_version, chunk_codec)
+        )
+        if current and not layer.dirty:
+            return False
+        
+        # Edited, but possibly back to the saved state (e.g. undo): compare content
+        digest = layer.content_hash()
+        if current and digest == layer.saved_hash:
+            layer.dirty = False
+            return False
+        
+        BinaryLayerIO.save_layer(layer, target, version=layer_version,
+                                 codec=chunk_codec.codec, filters=chunk_codec.filters)
+        layer.saved_file = target
+        layer.saved_hash = digest
+        layer.dirty = False
+        return True
+    
+    @staticmethod
+    def _file_format_matches(filepath: str, layer_version: int, chunk_codec: ChunkCodec) -> bool:
+        # \"\"\"Does an existing layer file already use the requested format and codec\"\"\"
+        header = BinaryLayerIO.read_header(filepath)
+        if header['version'] != layer_version:
+            return False
+        if layer_version != 2:
+            return True
+        return (header['compression'], header['filters']) == (chunk_codec.codec_id, chunk_codec.filter_flags)
+    
+    @staticmethod
+    def export_to_hdf5(project, filepath: str, compression: str = 'gzip'):
+        # \"\"\"Export project to HDF5 file (compression: 'gzip', 'lzf' or 'none')\"\"\"
+        ProjectIO.check_loaded(project)
+        HDF5Exporter.export_project(project, filepath, compression=compression)
     
     @staticmethod
     def import_from_hdf5(filepath: str):
         # \"\"\"Import project from HDF5 file\"\"\"
         return HDF5Exporter.import_project(filepath)
+    
+    @staticmethod
+    def open_hdf5(filepath: str):
+        # \"\"\"Open HDF5 file lazily; layer regions are read on demand\"\"\"
+        return HDF5Exporter.open_project(filepath)
+    
+    @staticmethod
+    def export_world_to_hdf5(levels, filepath: str, compression: str = 'gzip', workers: Optional[int] = None) -> dict:
+        # \"\"\"Export (name, project or path) levels into one HDF5 file with shared tilesets\"\"\"
+        return HDF5WorldExporter.export_world(levels, filepath, compression=compression, workers=workers)
+    
+    @staticmethod
+    def export_to_tiled(project, filepath: str, encoding: str = 'base64-zlib'):
+        # \"\"\"Export project as a Tiled map (.tmx, or .tmj/.json); encoding: 'base64-zlib' or 'csv'\"\"\"
+        ProjectIO.check_loaded(project)
+        TiledExporter.export_project(project, filepath, encoding=encoding)
+    
+    @staticmethod
+    def import_from_tiled(filepath: str, workers: Optional[int] = None):
+        # \"\"\"Import a Tiled map (.tmx, or .tmj/.json) as a new, unsaved project\"\"\"
+        return TiledExporter.import_project(filepath, workers=workers)
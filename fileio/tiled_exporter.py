@@ -0,0 +1,517 @@
+import base64
+import json
+import os
+import re
+import zlib
+import xml.etree.ElementTree as ET
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+from xml.sax.saxutils import quoteattr
+from core.constants import TILED_BLOCK_CELLS
+from .atomic import atomic_write
+from .metadata import MetadataIO
+
+class TiledExporter:
+    # \"\"\"Export/import projects as Tiled maps: TMX (XML) or JSON (.tmj/.json)\"\"\"
+    #
+    # Layers are written in MetadataIO order with its visibility and opacity. The tileset is one
+    # external-image tileset with firstgid 1, so a tile ID is its GID (IDs count from 1 across
+    # the sliced spritesheet; 0 stays empty). Layer data is generated a block of rows at a time
+    # and written as it is produced: 'base64-zlib' feeds one zlib stream and base64-encodes
+    # whole 3-byte groups as they come out; 'csv' writes each block's digits straight into a
+    # byte array (no per-tile str()). Only a block of GIDs and its text are ever in memory.
+    #
+    # Importing reads TMX incrementally (iterparse; each layer's data is dropped once handed
+    # off) and decodes CSV, base64, zlib and gzip layer data with numpy on worker threads.
+    
+    ENCODINGS = ('base64-zlib', 'csv')
+    TMX_SUFFIXES = ('.tmx',)
+    JSON_SUFFIXES = ('.tmj', '.json')
+    TILED_VERSION = '1.10'
+    GID_MASK = 0x0FFFFFFF  # Above it: horizontal, vertical, diagonal flip and hex rotation bits
+    JSON_DATA_ARRAY = re.compile(r'"data"\s*:\s*\[([0-9,\s]*)\]')
+    
+    @staticmethod
+    def export_project(project, filepath: str, encoding: str = 'base64-zlib', level: int = 6,
+                       block_cells: int = TILED_BLOCK_CELLS):
+        # \"\"\"Write a project as a Tiled map; the format follows the suffix (.tmx, .tmj or .json)\"\"\"
+        # \"\"\"level is the zlib level of 'base64-zlib' data (1 is several times faster on noisy maps)\"\"\"
+        if encoding not in TiledExporter.ENCODINGS:
+            raise ValueError(f"Unknown Tiled layer encoding: {encoding}")
+        suffix = Path(filepath).suffix.lower()
+        if suffix not in TiledExporter.TMX_SUFFIXES + TiledExporter.JSON_SUFFIXES:
+            raise ValueError(f"Tiled maps are .tmx, .tmj or .json files: {filepath}")
+        
+        metadata = MetadataIO.build_metadata(project)
+        tileset = TiledExporter._tileset_info(project, Path(filepath).parent)
+        layers = list(zip(project.layers, metadata['layers']))
+        
+        with atomic_write(filepath, 'w') as f:
+            if suffix in TiledExporter.TMX_SUFFIXES:
+                TiledExporter._write_tmx(f, project, tileset, layers, encoding, level, block_cells)
+            else:
+                TiledExporter._write_json(f, project, tileset, layers, encoding, level, block_cells)
+    
+    @staticmethod
+    def _write_tmx(f, project, tileset, layers, encoding: str, level: int, block_cells: int):
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(
+            f'<map version="{TiledExporter.TILED_VERSION}" orientation="orthogonal" renderorder="right-down"'
+            f' width="{project.grid_width}" height="{project.grid_height}"'
+            f' tilewidth="{project.tile_width}" tileheight="{project.tile_height}"'
+            f' infinite="0" nextlayerid="{len(layers) + 1}" nextobjectid="1">\n'
+        )
+        
+        if tileset is not None:
+            padding = ''.join(f' {key}="{tileset[key]}"' for key in ('spacing', 'margin') if tileset[key])
+            f.write(
+                f' <tileset firstgid="1" name={quoteattr(tileset["name"])}'
+                f' tilewidth="{tileset["tilewidth"]}" tileheight="{tileset["tileheight"]}"{padding}'
+                f' tilecount="{tileset["tilecount"]}" columns="{tileset["columns"]}">\n'
+            )
+            size = ''
+            if 'imagewidth' in tileset:
+                size = f' width="{tileset["imagewidth"]}" height="{tileset["imageheight"]}"'
+            f.write(f'  <image source={quoteattr(tileset["image"])}{size}/>\n')
+            for tile_id in tileset['solid']:
+                f.write(
+                    f'  <tile id="{tile_id}"><properties>'
+                    f'<property name="solid" type="bool" value="true"/></properties></tile>\n'
+                )
+            f.write(' </tileset>\n')
+        
+        for layer_id, (layer, layer_meta) in enumerate(layers, start=1):
+            height, width = layer.tile_grid.shape
+            attrs = f'id="{layer_id}" name={quoteattr(layer_meta["name"])} width="{width}" height="{height}"'
+            if not layer_meta['visible']:
+                attrs += ' visible="0"'
+            if layer_meta['opacity'] != 1.0:
+                attrs += f' opacity="{layer_meta["opacity"]:g}"'
+            f.write(f' <layer {attrs}>\n')
+            
+            if encoding == 'csv':
+                f.write('  <data encoding="csv">\n')
+                TiledExporter._write_csv(f, layer.tile_grid, block_cells, ',\n')
+            else:
+                f.write('  <data encoding="base64" compression="zlib">\n   ')
+                TiledExporter._write_base64_zlib(f, layer.tile_grid, level, block_cells)
+            f.write('\n  </data>\n </layer>\n')
+        
+        f.write('</map>\n')
+    
+    @staticmethod
+    def _write_json(f, project, tileset, layers, encoding: str, level: int, block_cells: int):
+        # The map is written as JSON text around the streamed 'data' members
+        header = {
+            'type': 'map',
+            'version': TiledExporter.TILED_VERSION,
+            'orientation': 'orthogonal',
+            'renderorder': 'right-down',
+            'width': project.grid_width,
+            'height': project.grid_height,
+            'tilewidth': project.tile_width,
+            'tileheight': project.tile_height,
+            'infinite': False,
+            'nextlayerid': len(layers) + 1,
+            'nextobjectid': 1,
+            'tilesets': [],
+        }
+        if tileset is not None:
+            entry = {
+                'firstgid': 1,
+                'name': tileset['name'],
+                'tilewidth': tileset['tilewidth'],
+                'tileheight': tileset['tileheight'],
+                'margin': tileset['margin'],
+                'spacing': tileset['spacing'],
+                'tilecount': tileset['tilecount'],
+                'columns': tileset['columns'],
+                'image': tileset['image'],
+            }
+            if 'imagewidth' in tileset:
+                entry['imagewidth'] = tileset['imagewidth']
+                entry['imageheight'] = tileset['imageheight']
+            if tileset['solid']:
+                entry['tiles'] = [
+                    {'id': tile_id, 'properties': [{'name': 'solid', 'type': 'bool', 'value': True}]}
+                    for tile_id in tileset['solid']
+                ]
+            header['tilesets'].append(entry)
+        
+        f.write(json.dumps(header)[:-1] + ', "layers": [')
+        for layer_id, (layer, layer_meta) in enumerate(layers, start=1):
+            height, width = layer.tile_grid.shape
+            layer_header = {
+                'id': layer_id,
+                'name': layer_meta['name'],
+                'type': 'tilelayer',
+                'x': 0,
+                'y': 0,
+                'width': width,
+                'height': height,
+                'visible': layer_meta['visible'],
+                'opacity': layer_meta['opacity'],
+            }
+            if encoding == 'base64-zlib':
+                layer_header['encoding'] = 'base64'
+                layer_header['compression'] = 'zlib'
+            
+            f.write(('\n' if layer_id == 1 else ',\n') + json.dumps(layer_header)[:-1] + ', "data": ')
+            if encoding == 'csv':
+                f.write('[')
+                TiledExporter._write_csv(f, layer.tile_grid, block_cells, ',')
+                f.write(']}')
+            else:
+                f.write('"')
+                TiledExporter._write_base64_zlib(f, layer.tile_grid, level, block_cells)
+                f.write('"}')
+        f.write('\n]}\n')
+    
+    @staticmethod
+    def _gid_blocks(grid: np.ndarray, block_cells: int):
+        # \"\"\"Yield '<u4' GIDs a block of whole rows at a time (negative IDs become empty)\"\"\"
+        height, width = grid.shape
+        rows = max(1, block_cells // max(1, width))
+        for y in range(0, height, rows):
+            yield np.clip(grid[y:y + rows], 0, None).astype('<u4')
+    
+    @staticmethod
+    def _write_csv(f, grid: np.ndarray, block_cells: int, row_separator: str):
+        first = True
+        for block in TiledExporter._gid_blocks(grid, block_cells):
+            if block.size:
+                text = TiledExporter._csv_text(block, row_separator)
+                f.write(text if first else row_separator + text)
+                first = False
+    
+    @staticmethod
+    def _csv_text(block: np.ndarray, row_separator: str) -> str:
+        # \"\"\"Comma-separated GIDs of a block, rows joined by row_separator (no trailing separator)\"\"\"
+        values = block.reshape(-1)
+        digits = np.ones(values.shape, dtype=np.int64)
+        for power in range(1, 10):
+            digits += values >= 10 ** power
+        
+        # Every tile is followed by ',' and a row's last tile by the row separator
+        separator = np.frombuffer(row_separator.encode('ascii'), dtype=np.uint8)
+        separator_widths = np.ones(values.shape, dtype=np.int64)
+        separator_widths[block.shape[1] - 1::block.shape[1]] = len(separator)
+        ends = np.cumsum(digits + separator_widths)
+        out = np.full(int(ends[-1]), ord(','), dtype=np.uint8)
+        
+        row_ends = ends[block.shape[1] - 1::block.shape[1]]
+        for i, byte in enumerate(separator):
+            out[row_ends - len(separator) + i] = byte
+        
+        # Digits right to left, one vectorized pass per decimal place
+        last_digit = ends - separator_widths - 1
+        remaining = values.astype(np.int64)
+        for place in range(int(digits.max())):
+            mask = digits > place
+            out[last_digit[mask] - place] = ord('0') + remaining[mask] % 10
+            remaining //= 10
+        return out[:-len(separator)].tobytes().decode('ascii')
+    
+    @staticmethod
+    def _write_base64_zlib(f, grid: np.ndarray, level: int, block_cells: int):
+        compressor = zlib.compressobj(level)
+        pending = b''  # Compressed bytes not yet a multiple of 3 (base64 needs whole groups)
+        for block in TiledExporter._gid_blocks(grid, block_cells):
+            pending += compressor.compress(block.tobytes())
+            whole = len(pending) - len(pending) % 3
+            if whole:
+                f.write(base64.b64encode(pending[:whole]).decode('ascii'))
+                pending = pending[whole:]
+        f.write(base64.b64encode(pending + compressor.flush()).decode('ascii'))
+    
+    @staticmethod
+    def _tileset_info(project, output_dir: Path):
+        tileset = project.tileset
+        if tileset is None:
+            return None
+        
+        tile_width = tileset.tile_width or project.tile_width
+        tile_height = tileset.tile_height or project.tile_height
+        info = {
+            'name': tileset.name,
+            'tilewidth': tile_width,
+            'tileheight': tile_height,
+            'margin': tileset.margin,
+            'spacing': tileset.spacing,
+            'image': tileset.image_path or '',
+            # Tiled tile IDs count from 0; ours from 1
+            'solid': sorted(tile_id - 1 for tile_id, tile in tileset.tiles.items() if tile.solid and tile_id > 0),
+        }
+        if tileset.image_path:
+            try:
+                info['image'] = Path(os.path.relpath(tileset.image_path, output_dir)).as_posix()
+            except ValueError:
+                pass  # Another drive on Windows: keep the absolute path
+        
+        if tileset.image is not None:
+            image_width, image_height = tileset.image.get_size()
+            info['imagewidth'], info['imageheight'] = image_width, image_height
+            columns = (image_width - tileset.margin + tileset.spacing) // (tile_width + tileset.spacing)
+            rows = (image_height - tileset.margin + tileset.spacing) // (tile_height + tileset.spacing)
+            info['columns'] = max(0, columns)
+            info['tilecount'] = info['columns'] * max(0, rows)
+        else:
+            info['columns'] = 0
+            info['tilecount'] = max(tileset.tiles, default=0)
+        return info
+    
+    @staticmethod
+    def import_project(filepath: str, workers: Optional[int] = None):
+        # \"\"\"Read a Tiled map (.tmx, or .tmj/.json) into a new MapProject\"\"\"
+        # \"\"\"Tile layers are imported in map order (group layers flattened; object and image layers
+        # skipped). Flip and rotation bits are dropped, and GIDs of the map's first tileset become
+        # that TileSet's IDs; tiles of any further tileset import as empty. Layer data is decoded
+        # on `workers` threads (default: CPU count) while the rest of the file is parsed\"\"\"
+        suffix = Path(filepath).suffix.lower()
+        if suffix in TiledExporter.TMX_SUFFIXES:
+            parse = TiledExporter._parse_tmx
+        elif suffix in TiledExporter.JSON_SUFFIXES:
+            parse = TiledExporter._parse_json
+        else:
+            raise ValueError(f"Tiled maps are .tmx, .tmj or .json files: {filepath}")
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as executor:
+            project, tilesets, layers = parse(filepath, executor)
+            if tilesets:
+                project.tileset = TiledExporter._build_tileset(min(tilesets, key=lambda t: t['firstgid']))
+            
+            names = set()
+            for properties, future in layers:
+                grid = future.result()
+                name, suffix_number = properties['name'] or "Layer", 2
+                while name in names:
+                    name, suffix_number = f"{properties['name']} {suffix_number}", suffix_number + 1
+                names.add(name)
+                
+                layer = project.add_layer(name)
+                layer.width, layer.height = grid.shape[1], grid.shape[0]
+                layer.tile_grid = grid
+                layer.visible = properties['visible']
+                layer.locked = properties['locked']
+                layer.opacity = properties['opacity']
+        return project
+    
+    @staticmethod
+    def _parse_tmx(filepath: str, executor):
+        from core.models import MapProject
+        
+        base_dir = Path(filepath).parent
+        project, tilesets, layers = None, [], []
+        layer_attrs, gid_range = {}, None
+        
+        for event, elem in ET.iterparse(filepath, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == 'map' and project is None:
+                    if elem.get('infinite') == '1':
+                        raise ValueError("Infinite Tiled maps are not supported")
+                    project = MapProject(
+                        Path(filepath).stem, int(elem.get('width')), int(elem.get('height')),
+                        int(elem.get('tilewidth')), int(elem.get('tileheight'))
+                    )
+                elif elem.tag == 'layer':
+                    layer_attrs = dict(elem.attrib)
+                continue
+            
+            if elem.tag == 'tileset':
+                tileset = TiledExporter._tileset_from_xml(elem, base_dir)
+                tileset['firstgid'] = int(elem.get('firstgid', 1))
+                tilesets.append(tileset)
+                elem.clear()
+            
+            elif elem.tag == 'data':
+                if elem.find('chunk') is not None:
+                    raise ValueError("Infinite Tiled maps are not supported")
+                encoding = elem.get('encoding')
+                data = elem.text or ''
+                if encoding is None:
+                    # Legacy <tile gid="..."/> elements: the only per-tile path
+                    data = np.array([int(tile.get('gid', 0)) for tile in elem.iter('tile')], dtype='<u4')
+                if gid_range is None:
+                    gid_range = TiledExporter._gid_range(tilesets)
+                future = executor.submit(
+                    TiledExporter._decode_layer, data, encoding, elem.get('compression'),
+                    int(layer_attrs.get('width', project.grid_width)),
+                    int(layer_attrs.get('height', project.grid_height)), gid_range
+                )
+                layers.append(({
+                    'name': layer_attrs.get('name', ''),
+                    'visible': layer_attrs.get('visible', '1') != '0',
+                    'locked': layer_attrs.get('locked', '0') == '1',
+                    'opacity': float(layer_attrs.get('opacity', 1.0)),
+                }, future))
+                elem.clear()
+            
+            elif elem.tag == 'layer':
+                elem.clear()
+        
+        if project is None:
+            raise ValueError(f"No <map> element in {filepath}")
+        return project, tilesets, layers
+    
+    @staticmethod
+    def _parse_json(filepath: str, executor):
+        # \"\"\"json has no incremental parser in the standard library, so the document is read whole;
+        # CSV data arrays are cut out first and parsed by numpy, so tiles never become Python ints\"\"\"
+        from core.models import MapProject
+        
+        with open(filepath, 'r', encoding='utf-8') as f:
+            text = f.read()
+        arrays = []
+        
+        def cut_array(match):
+            arrays.append(match.group(1))
+            return f'"data": {len(arrays) - 1}'
+        
+        tiled = json.loads(TiledExporter.JSON_DATA_ARRAY.sub(cut_array, text))
+        del text
+        
+        if tiled.get('infinite'):
+            raise ValueError("Infinite Tiled maps are not supported")
+        project = MapProject(
+            Path(filepath).stem, int(tiled['width']), int(tiled['height']),
+            int(tiled['tilewidth']), int(tiled['tileheight'])
+        )
+        
+        base_dir = Path(filepath).parent
+        tilesets = []
+        for entry in tiled.get('tilesets', []):
+            tileset = TiledExporter._tileset_from_json(entry, base_dir)
+            tileset['firstgid'] = int(entry.get('firstgid', 1))
+            tilesets.append(tileset)
+        gid_range = TiledExporter._gid_range(tilesets)
+        
+        layers = []
+        for layer in TiledExporter._json_tile_layers(tiled.get('layers', [])):
+            if 'chunks' in layer:
+                raise ValueError("Infinite Tiled maps are not supported")
+            encoding = layer.get('encoding', 'csv')
+            data = arrays[layer['data']] if encoding == 'csv' else layer['data']
+            future = executor.submit(
+                TiledExporter._decode_layer, data, encoding, layer.get('compression'),
+                int(layer.get('width', project.grid_width)), int(layer.get('height', project.grid_height)), gid_range
+            )
+            layers.append(({
+                'name': layer.get('name', ''),
+                'visible': bool(layer.get('visible', True)),
+                'locked': bool(layer.get('locked', False)),
+                'opacity': float(layer.get('opacity', 1.0)),
+            }, future))
+        return project, tilesets, layers
+    
+    @staticmethod
+    def _json_tile_layers(layers: list):
+        for layer in layers:
+            if layer.get('type') == 'group':
+                yield from TiledExporter._json_tile_layers(layer.get('layers', []))
+            elif layer.get('type') == 'tilelayer':
+                yield layer
+    
+    @staticmethod
+    def _decode_layer(data, encoding: Optional[str], compression: Optional[str],
+                      width: int, height: int, gid_range: tuple) -> np.ndarray:
+        # \"\"\"Layer data (CSV text, base64 text or a GID array) -> int32 grid of TileSet IDs\"\"\"
+        if encoding is None:
+            gids = data
+        elif encoding == 'csv':
+            gids = np.fromstring(data, dtype='<u4', sep=',') if data.strip() else np.zeros(0, dtype='<u4')
+        elif encoding == 'base64':
+            raw = base64.b64decode(data)
+            if compression in ('zlib', 'gzip'):
+                raw = zlib.decompress(raw, wbits=47)  # 32 + 15: either header
+            elif compression:
+                raise ValueError(f"Unsupported Tiled layer compression: {compression}")
+            gids = np.frombuffer(raw, dtype='<u4')
+        else:
+            raise ValueError(f"Unsupported Tiled layer encoding: {encoding}")
+        
+        if gids.size != width * height:
+            raise ValueError(f"Tiled layer data has {gids.size} tiles, expected {width}x{height}")
+        
+        # Masked GIDs fit in int32, so the masked copy is the result; usually no further pass is needed
+        tile_ids = (gids.reshape(height, width) & np.uint32(TiledExporter.GID_MASK)).view(np.int32)
+        first_gid, end_gid = gid_range
+        if first_gid != 1:
+            tile_ids -= first_gid - 1
+            np.maximum(tile_ids, 0, out=tile_ids)  # GIDs below the tileset
+        if end_gid <= TiledExporter.GID_MASK:
+            tile_ids[tile_ids > end_gid - first_gid] = 0  # GIDs of later tilesets
+        return tile_ids
+    
+    @staticmethod
+    def _gid_range(tilesets: list) -> tuple:
+        # \"\"\"[first, end) GIDs of the imported tileset; without tilesets GIDs are kept as IDs\"\"\"
+        first_gids = sorted(tileset['firstgid'] for tileset in tilesets)
+        if not first_gids:
+            return 1, TiledExporter.GID_MASK + 1
+        return first_gids[0], first_gids[1] if len(first_gids) > 1 else TiledExporter.GID_MASK + 1
+    
+    @staticmethod
+    def _tileset_from_xml(elem, base_dir: Path) -> dict:
+        if elem.get('source'):
+            return TiledExporter._external_tileset(base_dir / elem.get('source'))
+        
+        image = elem.find('image')
+        solid = []
+        for tile in elem.iter('tile'):
+            if any(prop.get('name') == 'solid' and prop.get('value') == 'true' for prop in tile.iter('property')):
+                solid.append(int(tile.get('id')))
+        return {
+            'name': elem.get('name', ''),
+            'tilewidth': int(elem.get('tilewidth', 0)) or None,
+            'tileheight': int(elem.get('tileheight', 0)) or None,
+            'margin': int(elem.get('margin', 0)),
+            'spacing': int(elem.get('spacing', 0)),
+            'image': str(base_dir / image.get('source')) if image is not None else None,
+            'solid': solid,
+        }
+    
+    @staticmethod
+    def _tileset_from_json(entry: dict, base_dir: Path) -> dict:
+        if entry.get('source'):
+            return TiledExporter._external_tileset(base_dir / entry['source'])
+        
+        solid = []
+        for tile in entry.get('tiles', []):
+            properties = tile.get('properties', [])
+            if isinstance(properties, dict):  # Pre-1.2 JSON
+                properties = [{'name': name, 'value': value} for name, value in properties.items()]
+            if any(prop.get('name') == 'solid' and prop.get('value') is True for prop in properties):
+                solid.append(int(tile['id']))
+        return {
+            'name': entry.get('name', ''),
+            'tilewidth': entry.get('tilewidth'),
+            'tileheight': entry.get('tileheight'),
+            'margin': entry.get('margin', 0),
+            'spacing': entry.get('spacing', 0),
+            'image': str(base_dir / entry['image']) if entry.get('image') else None,
+            'solid': solid,
+        }
+    
+    @staticmethod
+    def _external_tileset(path: Path) -> dict:
+        # \"\"\"A .tsx or .tsj/.json tileset file; its image path is relative to that file\"\"\"
+        if path.suffix.lower() == '.tsx':
+            return TiledExporter._tileset_from_xml(ET.parse(path).getroot(), path.parent)
+        with open(path, 'r', encoding='utf-8') as f:
+            return TiledExporter._tileset_from_json(json.load(f), path.parent)
+    
+    @staticmethod
+    def _build_tileset(info: dict):
+        from core.models import TileSet
+        
+        tileset = TileSet(
+            info['name'], info['image'] or '', info['tilewidth'], info['tileheight'], info['margin'], info['spacing']
+        )
+        tileset.slice_from_image()
+        for tile_id in info['solid']:
+            tile = tileset.tiles.get(tile_id + 1)  # Tiled tile IDs count from 0; ours from 1
+            if tile is not None:
+                tile.solid = True
+        return tileset
@@ -84,6 +84,20 @@ class TileRenderer:
                     pass
         # print(f"  Total tiles rendered: {tiles_rendered}")
     
+    def visible_tile_range(self, layer_width: int, layer_height: int,
+                           tile_width: int, tile_height: int) -> tuple:
+        """Grid cells covered by the screen as (x0, y0, x1, y1), end exclusive"""
+        screen_w, screen_h = self.surface.get_size()
+        scaled_tile_w = tile_width * self.zoom
+        scaled_tile_h = tile_height * self.zoom
+        
+        start_x = max(0, int(self.camera_x / scaled_tile_w))
+        start_y = max(0, int(self.camera_y / scaled_tile_h))
+        end_x = min(layer_width, int((self.camera_x + screen_w) / scaled_tile_w) + 1)
+        end_y = min(layer_height, int((self.camera_y + screen_h) / scaled_tile_h) + 1)
+        
+        return start_x, start_y, max(start_x, end_x), max(start_y, end_y)
+    
     def draw_grid(self, layer_width: int, layer_height: int,
                   tile_width: int, tile_height: int):
         """Draw grid overlay - WITH DEBUG"""
@@ -134,6 +148,51 @@ class TileRenderer:
         
         # print(f"  Drew {grid_lines} grid lines")
     
+    def render_block(self, block, origin_x: int, origin_y: int, tileset,
+                     tile_width: int, tile_height: int, alpha: int = 160):
+        """Render a detached block of tile IDs (e.g. a floating paste) translucently"""
+        if tileset is None or tileset.image is None:
+            return
+        
+        block_h, block_w = block.shape
+        start_x, start_y, end_x, end_y = self.visible_tile_range(
+            origin_x + block_w, origin_y + block_h, tile_width, tile_height
+        )
+        scaled_tile_w = int(tile_width * self.zoom)
+        scaled_tile_h = int(tile_height * self.zoom)
+        
+        # Only the part of the block that is on screen
+        for y in range(max(start_y, origin_y), end_y):
+            for x in range(max(start_x, origin_x), end_x):
+                tile_id = int(block[y - origin_y, x - origin_x])
+                tile_surface = tileset.get_tile_surface(tile_id) if tile_id else None
+                if tile_surface is None:
+                    continue
+                
+                if self.zoom != 1.0:
+                    tile_surface = pygame.transform.scale(tile_surface, (scaled_tile_w, scaled_tile_h))
+                else:
+                    tile_surface = tile_surface.copy()
+                tile_surface.set_alpha(alpha)
+                
+                self.surface.blit(tile_surface, (int(x * scaled_tile_w - self.camera_x),
+                                                 int(y * scaled_tile_h - self.camera_y)))
+    
+    def draw_rect_outline(self, rect: tuple, tile_width: int, tile_height: int,
+                          color: tuple = (255, 255, 0)):
+        """Outline a cell rectangle (x0, y0, x1, y1), end exclusive"""
+        x0, y0, x1, y1 = rect
+        scaled_tile_w = tile_width * self.zoom
+        scaled_tile_h = tile_height * self.zoom
+        
+        screen_rect = pygame.Rect(
+            int(x0 * scaled_tile_w - self.camera_x),
+            int(y0 * scaled_tile_h - self.camera_y),
+            int((x1 - x0) * scaled_tile_w),
+            int((y1 - y0) * scaled_tile_h)
+        )
+        pygame.draw.rect(self.surface, color, screen_rect, 1)
+    
     def draw_selection_highlight(self, grid_x: int, grid_y: int,
                                    tile_width: int, tile_height: int):
         """Draw highlight around selected tile position"""
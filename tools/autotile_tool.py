@@ -0,0 +1,20 @@
+from .stroke_tool import StrokeTool
+
+class AutoTileTool(StrokeTool):
+    # \"\"\"Paints a terrain, choosing each tile from its neighbour bitmask\"\"\"
+    
+    history_label = "Auto-tile"
+    
+    def _apply_cells(self, layer, indices):
+        # \"\"\"Re-tile the painted cells and their neighbours in one write\"\"\"
+        terrain = self.editor_state.autotile_terrain
+        if terrain is None:
+            return
+        self.editor_state.autotile.paint(layer, indices, terrain, self.editor_state.history)
+    
+    def _tile_ids(self, indices, layer):
+        # \"\"\"Unused: _apply_cells lets the auto-tile engine pick every tile\"\"\"
+        return None
+    
+    def get_cursor_name(self) -> str:
+        return "autotile"
@@ -23,6 +23,16 @@ class BaseTool(ABC):
         # \"\"\"Called when mouse button is released\"\"\"
         pass
     
+    def on_mouse_batch(self, events):
+        # \"\"\"Handle one frame of (kind, grid_x, grid_y, button) events in order\"\"\"
+        for kind, grid_x, grid_y, button in events:
+            if kind == 'move':
+                self.on_mouse_move(grid_x, grid_y)
+            elif kind == 'down':
+                self.on_mouse_down(grid_x, grid_y, button)
+            else:
+                self.on_mouse_up(grid_x, grid_y, button)
+    
     @abstractmethod
     def get_cursor_name(self) -> str:
         # \"\"\"Return cursor name for this tool\"\"\"
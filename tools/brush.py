@@ -0,0 +1,48 @@
+import numpy as np
+
+BRUSH_SHAPES = ('square', 'circle')
+
+def rasterize_line(x0: int, y0: int, x1: int, y1: int):
+    # \"\"\"Cells on the line between two grid points (both ends included)\"\"\"
+    steps = max(abs(x1 - x0), abs(y1 - y0))
+    if steps == 0:
+        return np.array([x0]), np.array([y0])
+    t = np.arange(steps + 1) / steps
+    xs = np.rint(x0 + (x1 - x0) * t).astype(np.int64)
+    ys = np.rint(y0 + (y1 - y0) * t).astype(np.int64)
+    return xs, ys
+
+def rasterize_polyline(points):
+    # \"\"\"Cells covered by consecutive line segments through points\"\"\"
+    if len(points) == 1:
+        return np.array([points[0][0]]), np.array([points[0][1]])
+    segments = [rasterize_line(*a, *b) for a, b in zip(points, points[1:])]
+    return (np.concatenate([s[0] for s in segments]),
+            np.concatenate([s[1] for s in segments]))
+
+def brush_offsets(size: int, shape: str = 'square'):
+    # \"\"\"Cell offsets of an NxN brush footprint centred on the cursor\"\"\"
+    size = max(1, int(size))
+    span = np.arange(size) - size // 2
+    dx, dy = np.meshgrid(span, span)
+    dx, dy = dx.ravel(), dy.ravel()
+    
+    if shape == 'circle' and size > 2:
+        center = (size - 1) / 2 - size // 2
+        radius = size / 2 - 0.25
+        inside = (dx - center) ** 2 + (dy - center) ** 2 <= radius ** 2
+        dx, dy = dx[inside], dy[inside]
+    
+    return dx, dy
+
+def stroke_cells(points, width: int, height: int, size: int = 1, shape: str = 'square') -> np.ndarray:
+    # \"\"\"Unique flat indices covered by a brush dragged along points, clipped to the layer\"\"\"
+    xs, ys = rasterize_polyline(points)
+    
+    if size > 1:
+        dx, dy = brush_offsets(size, shape)
+        xs = (xs[:, None] + dx[None, :]).ravel()
+        ys = (ys[:, None] + dy[None, :]).ravel()
+    
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    return np.unique(ys[inside] * width + xs[inside])
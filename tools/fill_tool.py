@@ -1,5 +1,70 @@
 from .base_tool import BaseTool
-from collections import deque
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+def connected_region(grid: np.ndarray, x: int, y: int, connectivity: int = 4, bounds=None) -> np.ndarray:
+    # \"\"\"Flat indices of cells connected to (x, y) that share its tile ID\"\"\"
+    # Works on horizontal runs instead of cells: runs of matching tiles are
+    # extracted with numpy, then a BFS links runs that touch on adjacent rows.
+    # bounds is an optional (x0, y0, x1, y1) clip rectangle, end exclusive.
+    grid_h, grid_w = grid.shape
+    x0, y0, x1, y1 = bounds if bounds else (0, 0, grid_w, grid_h)
+    if not (x0 <= x < x1 and y0 <= y < y1):
+        return np.empty(0, dtype=np.int64)
+
+    mask = grid[y0:y1, x0:x1] == grid[y, x]
+    h, w = mask.shape
+
+    # Run boundaries per row: +1 where a run starts, -1 one past where it ends
+    padded = np.zeros((h, w + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+    row_first = np.searchsorted(run_rows, np.arange(h + 1)).tolist()
+    starts = run_starts.tolist()
+    ends = run_ends.tolist()
+
+    # 8-connectivity also links runs that only touch diagonally
+    reach = 1 if connectivity == 8 else 0
+
+    row, col = y - y0, x - x0
+    seed = bisect_right(starts, col, row_first[row], row_first[row + 1]) - 1
+    visited = bytearray(len(starts))
+    visited[seed] = 1
+    stack = [(seed, row)]
+    filled = []
+
+    while stack:
+        run, row = stack.pop()
+        filled.append(run)
+        lo, hi = starts[run] - reach, ends[run] + reach
+
+        for next_row in (row - 1, row + 1):
+            if not 0 <= next_row < h:
+                continue
+            first, last = row_first[next_row], row_first[next_row + 1]
+            # Runs overlapping [lo, hi): end > lo and start < hi
+            j = bisect_right(ends, lo, first, last)
+            stop = bisect_left(starts, hi, first, last)
+            for j in range(j, stop):
+                if not visited[j]:
+                    visited[j] = 1
+                    stack.append((j, next_row))
+
+    # Expand the filled runs into flat indices of the full grid
+    filled = np.array(filled)
+    lengths = run_ends[filled] - run_starts[filled]
+    run_offsets = (run_rows[filled] + y0).astype(np.int64) * grid_w + run_starts[filled] + x0
+    first_in_run = np.cumsum(lengths) - lengths
+    return np.repeat(run_offsets - first_in_run, lengths) + np.arange(lengths.sum())
+
+def matching_cells(grid: np.ndarray, tile_id: int, bounds=None) -> np.ndarray:
+    # \"\"\"Flat indices of every cell holding tile_id, optionally inside bounds\"\"\"
+    grid_h, grid_w = grid.shape
+    x0, y0, x1, y1 = bounds if bounds else (0, 0, grid_w, grid_h)
+    rows, cols = np.nonzero(grid[y0:y1, x0:x1] == tile_id)
+    return (rows + y0).astype(np.int64) * grid_w + cols + x0
 
 class FillTool(BaseTool):
     # \"\"\"Flood fill tool\"\"\"
@@ -15,7 +80,7 @@ class FillTool(BaseTool):
         pass
     
     def _flood_fill(self, start_x: int, start_y: int):
-        # \"\"\"Flood fill algorithm (BFS)\"\"\"
+        # \"\"\"Fill the region under the cursor (or every matching cell in global mode)\"\"\"
         layer = self.editor_state.current_layer
         new_tile = self.editor_state.selected_tile_id
         
@@ -32,30 +97,34 @@ class FillTool(BaseTool):
         if target_tile == new_tile:
             return
         
-        # BFS flood fill
-        queue = deque([(start_x, start_y)])
-        visited = set()
+        bounds = self._fill_bounds()
+        if self.editor_state.fill_limit == 'selection' and bounds is None:
+            self.editor_state.show_status("Fill is limited to the selection, but nothing is selected")
+            return
         
-        while queue:
-            x, y = queue.popleft()
-            
-            if (x, y) in visited:
-                continue
-            
-            if not (0 <= x < layer.width and 0 <= y < layer.height):
-                continue
-            
-            if layer.get_tile(x, y) != target_tile:
-                continue
-            
-            visited.add((x, y))
-            layer.set_tile(x, y, new_tile)
-            
-            # Add neighbors (4-directional)
-            queue.append((x + 1, y))
-            queue.append((x - 1, y))
-            queue.append((x, y + 1))
-            queue.append((x, y - 1))
+        if self.editor_state.fill_global:
+            indices = matching_cells(layer.tile_grid, target_tile, bounds)
+        else:
+            indices = connected_region(
+                layer.tile_grid, start_x, start_y,
+                self.editor_state.fill_connectivity, bounds
+            )
+        
+        if len(indices) == 0:
+            return
+        
+        # Apply the whole fill as one history entry
+        self.editor_state.history.begin("Fill")
+        self.editor_state.history.apply(layer, indices, new_tile)
+        self.editor_state.history.commit()
+    
+    def _fill_bounds(self):
+        # \"\"\"Clip rectangle for the current fill limit, or None for the whole layer\"\"\"
+        if self.editor_state.fill_limit == 'viewport':
+            return self.editor_state.viewport_rect
+        if self.editor_state.fill_limit == 'selection':
+            return self.editor_state.selection_rect
+        return None
     
     def get_cursor_name(self) -> str:
         return "fill"
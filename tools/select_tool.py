@@ -0,0 +1,140 @@
+from .base_tool import BaseTool
+import numpy as np
+from editor.clipboard import ClipboardBuffer, FloatingPaste
+
+class SelectTool(BaseTool):
+    # \"\"\"Rectangle selection with copy/cut/paste of one or all layers\"\"\"
+    
+    def __init__(self, editor_state):
+        super().__init__(editor_state)
+        self.anchor = None
+        self.drag_offset = None  # Grab point while moving a floating paste
+    
+    def on_mouse_down(self, grid_x: int, grid_y: int, button: int):
+        if button != 1:  # Left click only
+            return
+        
+        paste = self.editor_state.floating_paste
+        if paste is not None and paste.contains(grid_x, grid_y):
+            self.drag_offset = (grid_x - paste.x, grid_y - paste.y)
+        else:
+            self.anchor = (grid_x, grid_y)
+            self._update_selection(grid_x, grid_y)
+        self.is_active = True
+    
+    def on_mouse_move(self, grid_x: int, grid_y: int):
+        if not self.is_active:
+            return
+        
+        if self.drag_offset is not None:
+            paste = self.editor_state.floating_paste
+            paste.x = grid_x - self.drag_offset[0]
+            paste.y = grid_y - self.drag_offset[1]
+        elif self.anchor is not None:
+            self._update_selection(grid_x, grid_y)
+    
+    def on_mouse_up(self, grid_x: int, grid_y: int, button: int):
+        self.is_active = False
+        self.anchor = None
+        self.drag_offset = None
+    
+    def _update_selection(self, grid_x: int, grid_y: int):
+        # \"\"\"Selection spans the anchor and the cursor cell, both included\"\"\"
+        ax, ay = self.anchor
+        self.editor_state.selection_rect = (
+            min(ax, grid_x), min(ay, grid_y),
+            max(ax, grid_x) + 1, max(ay, grid_y) + 1
+        )
+    
+    def clear_selection(self):
+        # \"\"\"Drop the selection rectangle\"\"\"
+        self.editor_state.selection_rect = None
+    
+    def copy(self, layers) -> bool:
+        # \"\"\"Copy the selected region of layers to the clipboard\"\"\"
+        rect = self._clipped_selection(layers)
+        if rect is None:
+            return False
+        
+        x0, y0, x1, y1 = rect
+        blocks = [(layer.name, layer.tile_grid[y0:y1, x0:x1]) for layer in layers]
+        self.editor_state.clipboard = ClipboardBuffer(x1 - x0, y1 - y0, blocks)
+        return True
+    
+    def cut(self, layers) -> bool:
+        # \"\"\"Copy the selected region, then clear it as one undoable edit\"\"\"
+        if not self.copy(layers):
+            return False
+        
+        x0, y0, x1, y1 = self._clipped_selection(layers)
+        history = self.editor_state.history
+        history.begin("Cut")
+        for layer in layers:
+            if not layer.locked:
+                history.apply_region(layer, x0, y0, np.zeros((y1 - y0, x1 - x0), dtype=np.int32))
+        history.commit()
+        return True
+    
+    def paste(self) -> bool:
+        # \"\"\"Float the clipboard at the selection (or view) origin so it can be moved\"\"\"
+        clipboard = self.editor_state.clipboard
+        if clipboard is None:
+            return False
+        
+        origin = self.editor_state.selection_rect or self.editor_state.viewport_rect or (0, 0)
+        self.editor_state.floating_paste = FloatingPaste(clipboard, origin[0], origin[1])
+        return True
+    
+    def commit_paste(self, layers, current_layer) -> bool:
+        # \"\"\"Write the floating paste into the layers as one undoable edit\"\"\"
+        paste = self.editor_state.floating_paste
+        if paste is None:
+            return False
+        self.editor_state.floating_paste = None
+        
+        buffer = paste.buffer
+        if buffer.single_layer:
+            targets = [(current_layer, buffer.block(0))]
+        else:
+            by_name = {layer.name: layer for layer in layers}
+            targets = [(by_name.get(name), block) for name, block in buffer.blocks()]
+        
+        history = self.editor_state.history
+        history.begin("Paste")
+        for layer, block in targets:
+            if layer is None or layer.locked:
+                continue
+            
+            # Clip the block against the layer edges
+            x0, y0 = max(paste.x, 0), max(paste.y, 0)
+            x1 = min(paste.x + buffer.width, layer.width)
+            y1 = min(paste.y + buffer.height, layer.height)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            
+            clipped = block[y0 - paste.y:y1 - paste.y, x0 - paste.x:x1 - paste.x]
+            history.apply_region(layer, x0, y0, clipped)
+        history.commit()
+        
+        self.editor_state.selection_rect = paste.rect
+        return True
+    
+    def cancel_paste(self):
+        # \"\"\"Discard the floating paste\"\"\"
+        self.editor_state.floating_paste = None
+    
+    def _clipped_selection(self, layers):
+        # \"\"\"Selection rectangle clipped to the layer size, or None if empty\"\"\"
+        rect = self.editor_state.selection_rect
+        if rect is None or not layers:
+            return None
+        
+        width, height = layers[0].width, layers[0].height
+        x0, y0 = max(rect[0], 0), max(rect[1], 0)
+        x1, y1 = min(rect[2], width), min(rect[3], height)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+    
+    def get_cursor_name(self) -> str:
+        return "select"
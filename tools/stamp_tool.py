@@ -0,0 +1,67 @@
+from .stroke_tool import StrokeTool
+import numpy as np
+
+class StampTool(StrokeTool):
+    # \"\"\"Paints a repeating multi-tile pattern or weighted random tiles\"\"\"
+    
+    history_label = "Stamp"
+    
+    def __init__(self, editor_state):
+        super().__init__(editor_state)
+        self.rng = None
+    
+    def on_mouse_down(self, grid_x: int, grid_y: int, button: int):
+        if button == 1:
+            self.rng = self._new_rng()
+        super().on_mouse_down(grid_x, grid_y, button)
+    
+    def _new_rng(self):
+        # \"\"\"Per-stroke generator: setting the same seed again replays the same sequence of strokes\"\"\"
+        self.editor_state.stamp_strokes += 1
+        return np.random.default_rng([self.editor_state.stamp_seed, self.editor_state.stamp_strokes])
+    
+    def _tile_ids(self, indices, layer):
+        # \"\"\"Tile IDs for a stroke segment, generated for all cells at once\"\"\"
+        rows, cols = np.divmod(indices, layer.width)
+        return self.generate(rows, cols, self.rng)
+    
+    def generate(self, rows: np.ndarray, cols: np.ndarray, rng):
+        # \"\"\"Stamp tile IDs at the given cells, or None if no stamp is set\"\"\"
+        pattern = self.editor_state.stamp_pattern
+        if pattern is not None:
+            # Anchored to the grid so neighbouring strokes tile seamlessly
+            return pattern[rows % pattern.shape[0], cols % pattern.shape[1]]
+        
+        weights = self.editor_state.stamp_weights
+        if weights:
+            tile_ids = np.fromiter(weights.keys(), dtype=np.int32, count=len(weights))
+            p = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+            return rng.choice(tile_ids, size=rows.shape, p=p / p.sum())
+        
+        return None
+    
+    def fill_rect(self, layer, rect) -> bool:
+        # \"\"\"Stamp a whole rectangle (x0, y0, x1, y1) as one region write\"\"\"
+        if layer is None or layer.locked:
+            return False
+        
+        x0, y0 = max(rect[0], 0), max(rect[1], 0)
+        x1, y1 = min(rect[2], layer.width), min(rect[3], layer.height)
+        if x1 <= x0 or y1 <= y0:
+            return False
+        
+        rows = np.arange(y0, y1)[:, None]
+        cols = np.arange(x0, x1)[None, :]
+        rows, cols = np.broadcast_arrays(rows, cols)
+        block = self.generate(rows, cols, self._new_rng())
+        if block is None:
+            return False
+        
+        history = self.editor_state.history
+        history.begin("Stamp Fill")
+        history.apply_region(layer, x0, y0, np.ascontiguousarray(block, dtype=np.int32))
+        history.commit()
+        return True
+    
+    def get_cursor_name(self) -> str:
+        return "stamp"
@@ -0,0 +1,79 @@
+from abc import abstractmethod
+from .base_tool import BaseTool
+from .brush import stroke_cells
+
+class StrokeTool(BaseTool):
+    # \"\"\"Base for drag tools that write a brush footprint along the mouse path\"\"\"
+    
+    history_label = "Stroke"
+    
+    def __init__(self, editor_state):
+        super().__init__(editor_state)
+        self.last_point = None
+    
+    def on_mouse_down(self, grid_x: int, grid_y: int, button: int):
+        if button == 1:  # Left click
+            self.editor_state.history.begin(self.history_label)
+            self.is_active = True
+            self.last_point = (grid_x, grid_y)
+            self._stroke([self.last_point])
+    
+    def on_mouse_move(self, grid_x: int, grid_y: int):
+        if self.is_active and (grid_x, grid_y) != self.last_point:
+            # Interpolate from the previous event so fast drags leave no gaps
+            self._stroke([self.last_point, (grid_x, grid_y)])
+            self.last_point = (grid_x, grid_y)
+    
+    def on_mouse_up(self, grid_x: int, grid_y: int, button: int):
+        if self.is_active:
+            self.editor_state.history.commit()
+        self.is_active = False
+        self.last_point = None
+    
+    def on_mouse_batch(self, events):
+        # \"\"\"Rasterise all moves of a frame as one polyline and one write\"\"\"
+        points = []
+        for kind, grid_x, grid_y, button in events:
+            if kind == 'move':
+                if self.is_active and (grid_x, grid_y) != (points[-1] if points else self.last_point):
+                    points.append((grid_x, grid_y))
+                continue
+            
+            self._stroke_points(points)
+            points = []
+            if kind == 'down':
+                self.on_mouse_down(grid_x, grid_y, button)
+            else:
+                self.on_mouse_up(grid_x, grid_y, button)
+        
+        self._stroke_points(points)
+    
+    def _stroke_points(self, points):
+        # \"\"\"Continue the stroke from the last point through points\"\"\"
+        if points and self.is_active:
+            self._stroke([self.last_point] + points)
+            self.last_point = points[-1]
+    
+    def _stroke(self, points):
+        # \"\"\"Write the brush footprint along points as one region write\"\"\"
+        layer = self.editor_state.current_layer
+        if layer is None or layer.locked:
+            return
+        
+        indices = stroke_cells(
+            points, layer.width, layer.height,
+            self.editor_state.brush_size, self.editor_state.brush_shape
+        )
+        if len(indices) > 0:
+            self._apply_cells(layer, indices)
+    
+    def _apply_cells(self, layer, indices):
+        # \"\"\"Write the stroke's cells (override to also touch other cells)\"\"\"
+        tile_ids = self._tile_ids(indices, layer)
+        if tile_ids is not None:
+            self.editor_state.history.apply(layer, indices, tile_ids)
+    
+    @abstractmethod
+    def _tile_ids(self, indices, layer):
+        # \"\"\"Tile ID (or per-cell array of IDs) to write at indices; None to skip\"\"\"
+        pass
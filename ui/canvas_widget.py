@@ -54,7 +54,6 @@ class PygameCanvasWidget(QWidget):
     def paintEvent(self, event):
         if self.pygame_surface:
             w, h = self.pygame_surface.get_size()
-            print(f"DEBUG: Widget size: {self.width()}x{self.height()}, Surface size: {w}x{h}")
 
             data = pygame.image.tostring(self.pygame_surface, 'RGB')
             qimage = QImage(data, w, h, w * 3, QImage.Format_RGB888)
@@ -62,9 +61,6 @@ class PygameCanvasWidget(QWidget):
             # Draw to widget
             painter = QPainter(self)
             painter.drawImage(0, 0, qimage)
-            # rest of code
-        else:
-            print("DEBUG: paintEvent called but pygame_surface is None")
 
 
     
@@ -5,7 +5,7 @@ Editor canvas with RENDERING FIXED
 from ui.canvas_widget import PygameCanvasWidget
 from rendering.tile_renderer import TileRenderer
 from editor.tool_controller import ToolController
-from core.constants import ZOOM_STEP
+from core.constants import ZOOM_STEP, COLOR_SELECTION
 
 class EditorCanvas(PygameCanvasWidget):
     """Canvas for tile map editing - RENDERING FIXED"""
@@ -29,11 +29,23 @@ class EditorCanvas(PygameCanvasWidget):
         self.mouse_moved.connect(self.on_mouse_moved_internal)
         self.mouse_released.connect(self.on_mouse_released)
     
+    def update_display(self):
+        """Apply the frame's buffered input once, then render"""
+        self.tool_controller.flush()
+        super().update_display()
+    
     def render(self):
         """Render the tilemap - FIXED VERSION"""
         # Clear background to dark gray
         self.pygame_surface.fill((40, 40, 40))
         
+        self.editor_state.viewport_rect = self.renderer.visible_tile_range(
+            self.project.grid_width,
+            self.project.grid_height,
+            self.project.tile_width,
+            self.project.tile_height
+        )
+        
         # ADD DEBUG
         # print(f"RENDER DEBUG: Tileset={self.project.tileset is not None}, Layers={len(self.project.layers)}")
         
@@ -66,6 +78,27 @@ class EditorCanvas(PygameCanvasWidget):
                 self.project.tile_height
             )
         
+        # Draw floating paste and selection rectangle
+        paste = self.editor_state.floating_paste
+        if paste is not None:
+            self.renderer.render_block(
+                paste.preview_block(), paste.x, paste.y,
+                self.project.tileset,
+                self.project.tile_width,
+                self.project.tile_height
+            )
+            self.renderer.draw_rect_outline(
+                paste.rect, self.project.tile_width, self.project.tile_height, (0, 200, 255)
+            )
+        
+        if self.editor_state.selection_rect is not None:
+            self.renderer.draw_rect_outline(
+                self.editor_state.selection_rect,
+                self.project.tile_width,
+                self.project.tile_height,
+                COLOR_SELECTION[:3]
+            )
+        
         # Draw cursor highlight if layer selected
         if self.editor_state.current_layer and self.editor_state.current_layer.visible:
             self.renderer.draw_selection_highlight(
@@ -77,22 +110,12 @@ class EditorCanvas(PygameCanvasWidget):
     
     def on_mouse_pressed(self, x, y, button):
         """Handle mouse press"""
-        print(f"\n=== MOUSE CLICK DEBUG ===")
-        print(f"Screen coords: ({x}, {y})")
-        
         grid_x, grid_y = self.renderer.screen_to_grid(
             x, y,
             self.project.tile_width,
             self.project.tile_height
         )
-        
-        print(f"Grid coords: ({grid_x}, {grid_y})")
-        print(f"Current tool: {self.editor_state.current_tool}")
-        print(f"Selected tile: {self.editor_state.selected_tile_id}")
-        print(f"Current layer: {self.editor_state.current_layer}")
-        print("========================\n")
-        
-        self.tool_controller.on_mouse_down(grid_x, grid_y, button)
+        self.tool_controller.queue_mouse_down(grid_x, grid_y, button)
     
     def on_mouse_moved_internal(self, x, y):
         """Handle mouse move"""
@@ -101,7 +124,7 @@ class EditorCanvas(PygameCanvasWidget):
             self.project.tile_width,
             self.project.tile_height
         )
-        self.tool_controller.on_mouse_move(grid_x, grid_y)
+        self.tool_controller.queue_mouse_move(grid_x, grid_y)
     
     def on_mouse_released(self, x, y, button):
         """Handle mouse release"""
@@ -110,7 +133,7 @@ class EditorCanvas(PygameCanvasWidget):
             self.project.tile_width,
             self.project.tile_height
         )
-        self.tool_controller.on_mouse_up(grid_x, grid_y, button)
+        self.tool_controller.queue_mouse_up(grid_x, grid_y, button)
     
     def on_pan(self, dx, dy):
         """Handle panning"""
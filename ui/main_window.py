@@ -1,19 +1,27 @@
 from PySide6.QtWidgets import (QMainWindow, QDockWidget, QToolBar, QFileDialog,
                                QMessageBox, QInputDialog, QWidget, QVBoxLayout,
                                QLabel, QStatusBar, QDialog, QComboBox, QLineEdit,
-                               QPushButton, QHBoxLayout, QSpinBox, QFormLayout)
-from PySide6.QtCore import Qt, QSettings
-from PySide6.QtGui import QAction, QKeySequence
+                               QPushButton, QHBoxLayout, QSpinBox, QFormLayout,
+                               QDoubleSpinBox, QCheckBox, QProgressBar)
+from PySide6.QtCore import Qt, QSettings, QTimer
+from PySide6.QtGui import QAction, QActionGroup, QKeySequence
 import pygame
+import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from ui.editor_canvas import EditorCanvas
 from ui.tile_palette import TilePaletteWidget
 from ui.layer_panel import LayerPanelWidget
 from core.models import MapProject, TileSet, LayerType
 from core.constants import (APP_NAME, APP_VERSION, DEFAULT_GRID_WIDTH,
-                            DEFAULT_GRID_HEIGHT, DEFAULT_TILE_SIZE)
+                            DEFAULT_GRID_HEIGHT, DEFAULT_TILE_SIZE,
+                            DEFAULT_PROJECT_FORMAT, EXT_PROJECT)
 from editor.editor_state import EditorState
+from editor.autosave import AutosaveService
+from fileio.journal import EditJournal
+from tools.brush import BRUSH_SHAPES
+from editor.terrain_gen import TerrainGenerator, TerrainParams
 from fileio.project_io import ProjectIO
 
 
@@ -88,6 +96,83 @@ class TileSubdivisionDialog(QDialog):
         return self.tile_size_spin.value()
 
 
+class TerrainGeneratorDialog(QDialog):
+    """Dialog for noise-based terrain generation settings"""
+    
+    def __init__(self, has_selection: bool, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Generate Terrain")
+        self.resize(380, 300)
+        
+        defaults = TerrainParams()
+        layout = QFormLayout(self)
+        
+        # Noise settings
+        self.kind_combo = QComboBox()
+        self.kind_combo.addItem("Value", 'value')
+        self.kind_combo.addItem("Perlin", 'perlin')
+        layout.addRow("Noise:", self.kind_combo)
+        
+        self.seed_spin = QSpinBox()
+        self.seed_spin.setMaximum(2 ** 31 - 1)
+        layout.addRow("Seed:", self.seed_spin)
+        
+        self.scale_spin = QDoubleSpinBox()
+        self.scale_spin.setRange(1.0, 4096.0)
+        self.scale_spin.setValue(defaults.scale)
+        layout.addRow("Scale (cells):", self.scale_spin)
+        
+        self.octaves_spin = QSpinBox()
+        self.octaves_spin.setRange(1, 10)
+        self.octaves_spin.setValue(defaults.octaves)
+        layout.addRow("Octaves:", self.octaves_spin)
+        
+        self.persistence_spin = QDoubleSpinBox()
+        self.persistence_spin.setRange(0.05, 1.0)
+        self.persistence_spin.setSingleStep(0.05)
+        self.persistence_spin.setValue(defaults.persistence)
+        layout.addRow("Persistence:", self.persistence_spin)
+        
+        # Threshold rules
+        self.thresholds_edit = QLineEdit(", ".join(str(t) for t in defaults.thresholds))
+        layout.addRow("Thresholds:", self.thresholds_edit)
+        
+        self.tiles_edit = QLineEdit(", ".join(str(t) for t in defaults.tile_ids))
+        layout.addRow("Tile IDs:", self.tiles_edit)
+        
+        self.chk_selection = QCheckBox("Selection only")
+        self.chk_selection.setEnabled(has_selection)
+        self.chk_selection.setChecked(has_selection)
+        layout.addRow("", self.chk_selection)
+        
+        # Buttons
+        button_layout = QHBoxLayout()
+        self.btn_ok = QPushButton("Generate")
+        self.btn_ok.clicked.connect(self.accept)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.clicked.connect(self.reject)
+        button_layout.addWidget(self.btn_ok)
+        button_layout.addWidget(self.btn_cancel)
+        layout.addRow("", button_layout)
+    
+    def get_params(self):
+        """Return (TerrainParams, selection_only); raises ValueError on bad rules"""
+        thresholds = [float(t) for t in self.thresholds_edit.text().split(',') if t.strip()]
+        tile_ids = [int(t) for t in self.tiles_edit.text().split(',') if t.strip()]
+        params = TerrainParams(
+            seed=self.seed_spin.value(),
+            kind=self.kind_combo.currentData(),
+            scale=self.scale_spin.value(),
+            octaves=self.octaves_spin.value(),
+            persistence=self.persistence_spin.value(),
+            thresholds=sorted(thresholds),
+            tile_ids=tile_ids
+        )
+        if len(tile_ids) != len(thresholds) + 1:
+            raise ValueError("Tile IDs needs exactly one more entry than Thresholds")
+        return params, self.chk_selection.isChecked()
+
+
 class TileEditorMainWindow(QMainWindow):
     """Main window for Aether Tile Editor"""
     
@@ -135,6 +220,19 @@ class TileEditorMainWindow(QMainWindow):
         # Load settings
         self.settings = QSettings('Aether', 'TileEditor')
         self._load_settings()
+        self.action_single_file.setChecked(self._project_format() == 'container')
+        
+        # Autosave: snapshots on this thread, writes on a worker thread
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self._autosave_tick)
+        self.editor_state.autosave.attach(self.project)
+        self._apply_autosave_settings()
+        
+        # Terrain generation: computed on a worker thread, applied here when done
+        self.terrain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="terrain-job")
+        self.terrain_job = None  # (future, layer, x0, y0, params) while generating
+        self.terrain_timer = QTimer(self)
+        self.terrain_timer.timeout.connect(self._terrain_tick)
     
     def _create_canvas(self):
         """Create main canvas"""
@@ -200,6 +298,44 @@ class TileEditorMainWindow(QMainWindow):
         self.action_picker.triggered.connect(lambda: self._set_tool('picker'))
         toolbar.addAction(self.action_picker)
         
+        # Select tool
+        self.action_select = QAction("⬚ Select", self)
+        self.action_select.setShortcut('S')
+        self.action_select.setCheckable(True)
+        self.action_select.triggered.connect(lambda: self._set_tool('select'))
+        toolbar.addAction(self.action_select)
+        
+        # Auto-tile tool
+        self.action_autotile = QAction("🧩 Auto-tile", self)
+        self.action_autotile.setShortcut('A')
+        self.action_autotile.setCheckable(True)
+        self.action_autotile.triggered.connect(self._choose_autotile_terrain)
+        toolbar.addAction(self.action_autotile)
+        
+        # Stamp tool
+        self.action_stamp = QAction("🌱 Stamp", self)
+        self.action_stamp.setShortcut('T')
+        self.action_stamp.setCheckable(True)
+        self.action_stamp.triggered.connect(lambda: self._set_tool('stamp'))
+        toolbar.addAction(self.action_stamp)
+        
+        toolbar.addSeparator()
+        
+        # Brush footprint
+        toolbar.addWidget(QLabel(" Brush: "))
+        self.brush_size_spin = QSpinBox()
+        self.brush_size_spin.setMinimum(1)
+        self.brush_size_spin.setMaximum(64)
+        self.brush_size_spin.setValue(self.editor_state.brush_size)
+        self.brush_size_spin.valueChanged.connect(self._on_brush_size_changed)
+        toolbar.addWidget(self.brush_size_spin)
+        
+        self.brush_shape_combo = QComboBox()
+        for shape in BRUSH_SHAPES:
+            self.brush_shape_combo.addItem(shape.capitalize(), shape)
+        self.brush_shape_combo.currentIndexChanged.connect(self._on_brush_shape_changed)
+        toolbar.addWidget(self.brush_shape_combo)
+        
         toolbar.addSeparator()
         
         # Grid toggle
@@ -227,6 +363,10 @@ class TileEditorMainWindow(QMainWindow):
         action_open.triggered.connect(self._open_project)
         file_menu.addAction(action_open)
         
+        action_import_tiled = QAction("&Import Tiled Map...", self)
+        action_import_tiled.triggered.connect(self._import_tiled)
+        file_menu.addAction(action_import_tiled)
+        
         file_menu.addSeparator()
         
         action_save = QAction("&Save Project", self)
@@ -239,6 +379,15 @@ class TileEditorMainWindow(QMainWindow):
         action_save_as.triggered.connect(self._save_project_as)
         file_menu.addAction(action_save_as)
         
+        self.action_single_file = QAction("Save Projects as Single &File", self)
+        self.action_single_file.setCheckable(True)
+        self.action_single_file.toggled.connect(self._set_project_format)
+        file_menu.addAction(self.action_single_file)
+        
+        action_autosave = QAction("Auto&save Settings...", self)
+        action_autosave.triggered.connect(self._autosave_settings_dialog)
+        file_menu.addAction(action_autosave)
+        
         file_menu.addSeparator()
         
         action_import_tileset = QAction("&Import Tileset...", self)
@@ -257,6 +406,10 @@ class TileEditorMainWindow(QMainWindow):
         action_export_hdf5.triggered.connect(self._export_hdf5)
         file_menu.addAction(action_export_hdf5)
         
+        action_export_tiled = QAction("Export to &Tiled...", self)
+        action_export_tiled.triggered.connect(self._export_tiled)
+        file_menu.addAction(action_export_tiled)
+        
         action_export_png = QAction("Export to &PNG...", self)
         action_export_png.triggered.connect(self._export_png)
         file_menu.addAction(action_export_png)
@@ -268,6 +421,108 @@ class TileEditorMainWindow(QMainWindow):
         action_exit.triggered.connect(self.close)
         file_menu.addAction(action_exit)
         
+        # Edit menu
+        edit_menu = menubar.addMenu("&Edit")
+        
+        self.action_undo = QAction("&Undo", self)
+        self.action_undo.setShortcut(QKeySequence.Undo)
+        self.action_undo.triggered.connect(self._undo)
+        edit_menu.addAction(self.action_undo)
+        
+        self.action_redo = QAction("&Redo", self)
+        self.action_redo.setShortcut('Ctrl+Shift+Z')
+        self.action_redo.triggered.connect(self._redo)
+        edit_menu.addAction(self.action_redo)
+        
+        edit_menu.addSeparator()
+        
+        action_cut = QAction("Cu&t", self)
+        action_cut.setShortcut(QKeySequence.Cut)
+        action_cut.triggered.connect(self._cut)
+        edit_menu.addAction(action_cut)
+        
+        action_copy = QAction("&Copy", self)
+        action_copy.setShortcut(QKeySequence.Copy)
+        action_copy.triggered.connect(self._copy)
+        edit_menu.addAction(action_copy)
+        
+        action_paste = QAction("&Paste", self)
+        action_paste.setShortcut(QKeySequence.Paste)
+        action_paste.triggered.connect(self._paste)
+        edit_menu.addAction(action_paste)
+        
+        action_commit_paste = QAction("Place Paste", self)
+        action_commit_paste.setShortcut('Return')
+        action_commit_paste.triggered.connect(self._commit_paste)
+        edit_menu.addAction(action_commit_paste)
+        
+        action_deselect = QAction("&Deselect", self)
+        action_deselect.setShortcut('Escape')
+        action_deselect.triggered.connect(self._deselect)
+        edit_menu.addAction(action_deselect)
+        
+        action_all_layers = QAction("Clipboard Uses &All Layers", self)
+        action_all_layers.setCheckable(True)
+        action_all_layers.toggled.connect(
+            lambda checked: setattr(self.editor_state, 'clipboard_all_layers', checked))
+        edit_menu.addAction(action_all_layers)
+        
+        edit_menu.addSeparator()
+        
+        stamp_menu = edit_menu.addMenu("&Stamp")
+        
+        action_stamp_pattern = QAction("&Pattern from Clipboard", self)
+        action_stamp_pattern.triggered.connect(self._stamp_pattern_from_clipboard)
+        stamp_menu.addAction(action_stamp_pattern)
+        
+        action_stamp_mix = QAction("Random &Mix from Clipboard", self)
+        action_stamp_mix.triggered.connect(self._stamp_mix_from_clipboard)
+        stamp_menu.addAction(action_stamp_mix)
+        
+        action_stamp_weights = QAction("Random Mix &Weights...", self)
+        action_stamp_weights.triggered.connect(self._stamp_weights_dialog)
+        stamp_menu.addAction(action_stamp_weights)
+        
+        action_stamp_seed = QAction("S&eed...", self)
+        action_stamp_seed.triggered.connect(self._stamp_seed_dialog)
+        stamp_menu.addAction(action_stamp_seed)
+        
+        stamp_menu.addSeparator()
+        
+        action_stamp_fill = QAction("&Fill Selection", self)
+        action_stamp_fill.triggered.connect(self._stamp_fill_selection)
+        stamp_menu.addAction(action_stamp_fill)
+        
+        action_generate = QAction("&Generate Terrain...", self)
+        action_generate.triggered.connect(self._generate_terrain)
+        edit_menu.addAction(action_generate)
+        
+        fill_menu = edit_menu.addMenu("&Fill Options")
+        
+        action_fill_8way = QAction("&8-Way Connectivity", self)
+        action_fill_8way.setCheckable(True)
+        action_fill_8way.toggled.connect(
+            lambda checked: setattr(self.editor_state, 'fill_connectivity', 8 if checked else 4))
+        fill_menu.addAction(action_fill_8way)
+        
+        action_fill_global = QAction("&Replace All Matching", self)
+        action_fill_global.setCheckable(True)
+        action_fill_global.toggled.connect(
+            lambda checked: setattr(self.editor_state, 'fill_global', checked))
+        fill_menu.addAction(action_fill_global)
+        
+        fill_menu.addSeparator()
+        
+        fill_limit_group = QActionGroup(self)
+        for label, limit in (("Whole &Layer", None), ("Visible &Area", 'viewport'), ("&Selection", 'selection')):
+            action_limit = QAction(label, self)
+            action_limit.setCheckable(True)
+            action_limit.setChecked(limit is None)
+            action_limit.triggered.connect(
+                lambda checked, limit=limit: setattr(self.editor_state, 'fill_limit', limit))
+            fill_limit_group.addAction(action_limit)
+            fill_menu.addAction(action_limit)
+        
         # View menu
         view_menu = menubar.addMenu("&View")
         
@@ -293,6 +548,17 @@ class TileEditorMainWindow(QMainWindow):
         self.statusbar = QStatusBar()
         self.setStatusBar(self.statusbar)
         self.statusbar.showMessage("Ready - Press 'P' to paint, 'E' to erase, 'F' to fill")
+        self.editor_state.status_callback = lambda message: self.statusbar.showMessage(message, 5000)
+        
+        # Progress of a project whose layers are still loading
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(160)
+        self.load_progress.setFormat("Loading %v/%m")
+        self.load_progress.hide()
+        self.statusbar.addPermanentWidget(self.load_progress)
+        
+        self.load_timer = QTimer(self)
+        self.load_timer.timeout.connect(self._load_tick)
     
     def _set_tool(self, tool_name: str):
         """Change active tool"""
@@ -301,6 +567,9 @@ class TileEditorMainWindow(QMainWindow):
         self.action_erase.setChecked(tool_name == 'erase')
         self.action_fill.setChecked(tool_name == 'fill')
         self.action_picker.setChecked(tool_name == 'picker')
+        self.action_select.setChecked(tool_name == 'select')
+        self.action_autotile.setChecked(tool_name == 'autotile')
+        self.action_stamp.setChecked(tool_name == 'stamp')
         
         self.canvas.set_tool(tool_name)
         self.statusbar.showMessage(f"Tool: {tool_name.capitalize()}")
@@ -311,6 +580,227 @@ class TileEditorMainWindow(QMainWindow):
         self.canvas.renderer.grid_visible = self.editor_state.grid_visible
         self.statusbar.showMessage(f"Grid: {'ON' if self.editor_state.grid_visible else 'OFF'}")
     
+    def _select_tool(self):
+        """Selection tool instance (owns clipboard operations)"""
+        return self.canvas.tool_controller.tools['select']
+    
+    def _clipboard_layers(self):
+        """Layers affected by copy/cut: all layers or just the active one"""
+        if self.editor_state.clipboard_all_layers:
+            return list(self.project.layers)
+        layer = self.editor_state.current_layer
+        return [layer] if layer else []
+    
+    def _copy(self):
+        """Copy selection to clipboard"""
+        if self._select_tool().copy(self._clipboard_layers()):
+            clipboard = self.editor_state.clipboard
+            self.statusbar.showMessage(
+                f"Copied {clipboard.width}x{clipboard.height} from {len(clipboard.layer_names)} layer(s)"
+            )
+        else:
+            self.statusbar.showMessage("Nothing selected")
+    
+    def _cut(self):
+        """Cut selection to clipboard"""
+        if self._select_tool().cut(self._clipboard_layers()):
+            self.statusbar.showMessage("Cut selection")
+        else:
+            self.statusbar.showMessage("Nothing selected")
+    
+    def _paste(self):
+        """Float clipboard contents for positioning with the select tool"""
+        if self._select_tool().paste():
+            self._set_tool('select')
+            self.statusbar.showMessage("Drag the paste into place, Enter to place, Esc to cancel")
+        else:
+            self.statusbar.showMessage("Clipboard is empty")
+    
+    def _commit_paste(self):
+        """Place the floating paste"""
+        if self._select_tool().commit_paste(self.project.layers, self.editor_state.current_layer):
+            self.statusbar.showMessage("Pasted")
+    
+    def _deselect(self):
+        """Cancel a floating paste, or clear the selection"""
+        tool = self._select_tool()
+        if self.editor_state.floating_paste is not None:
+            tool.cancel_paste()
+        else:
+            tool.clear_selection()
+    
+    def _choose_autotile_terrain(self):
+        """Pick the terrain painted by the auto-tile tool"""
+        autotile = self.editor_state.autotile
+        autotile.set_rules(self.project.metadata)
+        terrains = sorted(autotile.rules)
+        
+        if not terrains:
+            self.action_autotile.setChecked(False)
+            QMessageBox.information(
+                self, "Auto-tile",
+                "This project defines no auto-tile terrains.\n"
+                "Add them under 'autotile' > 'terrains' in the project metadata."
+            )
+            return
+        
+        current = self.editor_state.autotile_terrain
+        index = terrains.index(current) if current in terrains else 0
+        terrain, ok = QInputDialog.getItem(self, "Auto-tile", "Terrain:", terrains, index, False)
+        if not ok:
+            self.action_autotile.setChecked(self.editor_state.current_tool == 'autotile')
+            return
+        
+        self.editor_state.autotile_terrain = terrain
+        self._set_tool('autotile')
+    
+    def _stamp_pattern_from_clipboard(self):
+        """Use the clipboard block as a repeating stamp pattern"""
+        clipboard = self.editor_state.clipboard
+        if clipboard is None:
+            self.statusbar.showMessage("Clipboard is empty")
+            return
+        
+        self.editor_state.stamp_pattern = clipboard.block(0).copy()
+        self.editor_state.stamp_weights = None
+        self._set_tool('stamp')
+        self.statusbar.showMessage(f"Stamp pattern: {clipboard.width}x{clipboard.height}")
+    
+    def _stamp_mix_from_clipboard(self):
+        """Weight random stamp tiles by how often they occur in the clipboard"""
+        clipboard = self.editor_state.clipboard
+        if clipboard is None:
+            self.statusbar.showMessage("Clipboard is empty")
+            return
+        
+        tile_ids, counts = np.unique(clipboard.block(0), return_counts=True)
+        weights = {int(t): int(c) for t, c in zip(tile_ids, counts) if t != 0}
+        if not weights:
+            self.statusbar.showMessage("Clipboard holds no tiles")
+            return
+        
+        self.editor_state.stamp_pattern = None
+        self.editor_state.stamp_weights = weights
+        self._set_tool('stamp')
+        self.statusbar.showMessage(f"Stamp mix: {len(weights)} tiles")
+    
+    def _stamp_weights_dialog(self):
+        """Enter random stamp weights as 'id:weight, id:weight'"""
+        current = self.editor_state.stamp_weights or {}
+        text, ok = QInputDialog.getText(
+            self, "Stamp Weights", "Tile weights (id:weight, ...):",
+            text=", ".join(f"{t}:{w}" for t, w in current.items())
+        )
+        if not ok:
+            return
+        
+        try:
+            weights = {}
+            for item in text.split(','):
+                if item.strip():
+                    tile_id, weight = item.split(':')
+                    weights[int(tile_id)] = float(weight)
+            if not weights or min(weights.values()) < 0 or sum(weights.values()) <= 0:
+                raise ValueError("weights must be non-negative and not all zero")
+        except ValueError as e:
+            QMessageBox.warning(self, "Warning", f"Invalid weights:\n{str(e)}")
+            return
+        
+        self.editor_state.stamp_pattern = None
+        self.editor_state.stamp_weights = weights
+        self._set_tool('stamp')
+    
+    def _stamp_seed_dialog(self):
+        """Set the random stamp seed"""
+        seed, ok = QInputDialog.getInt(
+            self, "Stamp Seed", "Seed:", self.editor_state.stamp_seed, 0, 2 ** 31 - 1
+        )
+        if ok:
+            self.editor_state.stamp_seed = seed
+    
+    def _stamp_fill_selection(self):
+        """Stamp the whole selection (or layer) in one edit"""
+        layer = self.editor_state.current_layer
+        if layer is None:
+            return
+        
+        rect = self.editor_state.selection_rect or (0, 0, layer.width, layer.height)
+        stamp_tool = self.canvas.tool_controller.tools['stamp']
+        if stamp_tool.fill_rect(layer, rect):
+            self.statusbar.showMessage("Stamped selection")
+        else:
+            self.statusbar.showMessage("Set a stamp pattern or mix first")
+    
+    def _generate_terrain(self):
+        """Fill the active layer (or selection) with generated terrain as one edit"""
+        if self.terrain_job is not None:
+            self.statusbar.showMessage("Terrain is still being generated")
+            return
+        
+        layer = self.editor_state.current_layer
+        if layer is None or layer.locked:
+            QMessageBox.warning(self, "Warning", "Select an unlocked layer first.")
+            return
+        
+        dialog = TerrainGeneratorDialog(self.editor_state.selection_rect is not None, self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        
+        try:
+            params, selection_only = dialog.get_params()
+        except ValueError as e:
+            QMessageBox.warning(self, "Warning", f"Invalid terrain rules:\n{str(e)}")
+            return
+        
+        x0, y0, x1, y1 = 0, 0, layer.width, layer.height
+        if selection_only:
+            rect = self.editor_state.selection_rect
+            x0, y0 = max(rect[0], 0), max(rect[1], 0)
+            x1, y1 = min(rect[2], layer.width), min(rect[3], layer.height)
+            if x1 <= x0 or y1 <= y0:
+                return
+        
+        # Generate off the event loop; the window stays usable meanwhile
+        future = self.terrain_executor.submit(TerrainGenerator.generate, x1 - x0, y1 - y0, params, x0, y0)
+        self.terrain_job = (future, layer, x0, y0, params)
+        self.terrain_timer.start(50)
+        self.statusbar.showMessage(f"Generating {x1 - x0}x{y1 - y0} terrain...")
+    
+    def _terrain_tick(self):
+        """Apply generated terrain as one edit once the worker has finished"""
+        future, layer, x0, y0, params = self.terrain_job
+        if not future.done():
+            return
+        self.terrain_timer.stop()
+        self.terrain_job = None
+        
+        try:
+            block = future.result()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate terrain:\n{str(e)}")
+            return
+        
+        # The project may have been switched, or the layer locked or resized, meanwhile
+        height, width = block.shape
+        if (layer not in self.project.layers or layer.locked
+                or x0 + width > layer.width or y0 + height > layer.height):
+            self.statusbar.showMessage("Generated terrain discarded: its layer changed")
+            return
+        
+        history = self.editor_state.history
+        history.begin("Generate Terrain")
+        history.apply_region(layer, x0, y0, block)
+        history.commit()
+        self.statusbar.showMessage(f"Generated {width}x{height} terrain (seed {params.seed})")
+    
+    def _on_brush_size_changed(self, size: int):
+        """Handle brush size change"""
+        self.editor_state.brush_size = size
+    
+    def _on_brush_shape_changed(self, index: int):
+        """Handle brush shape change"""
+        self.editor_state.brush_shape = self.brush_shape_combo.itemData(index)
+    
     def _on_tile_selected(self, tile_id: int):
         """Handle tile selection from palette"""
         self.editor_state.select_tile(tile_id)
@@ -333,11 +823,21 @@ class TileEditorMainWindow(QMainWindow):
         print("=========================\n")        
         self.statusbar.showMessage(f"Selected tile: {tile_id}")
     
+    def _undo(self):
+        """Revert the last edit"""
+        label = self.editor_state.history.undo()
+        self.statusbar.showMessage(f"Undo: {label}" if label else "Nothing to undo")
+    
+    def _redo(self):
+        """Re-apply the last undone edit"""
+        label = self.editor_state.history.redo()
+        self.statusbar.showMessage(f"Redo: {label}" if label else "Nothing to redo")
+    
     def _on_layer_selected(self, layer):
         """Handle layer selection"""
         self.editor_state.set_active_layer(layer)
         self.statusbar.showMessage(f"Active layer: {layer.name} [{layer.layer_type.value}]")
-
+    
     def _on_layers_changed(self):
         """Handle layer changes"""
         self.layer_panel.refresh()
@@ -363,6 +863,13 @@ class TileEditorMainWindow(QMainWindow):
         self.project.add_layer("Ground", LayerType.ACTUAL)
         
         # Update UI
+        self._cancel_loading()
+        self.editor_state.history.clear()
+        self.editor_state.autosave.attach(self.project)
+        self._attach_journal()
+        self.editor_state.autotile.set_rules(self.project.metadata)
+        self.editor_state.selection_rect = None
+        self.editor_state.floating_paste = None
         self.editor_state.current_layer = self.project.layers[0]
         self.canvas.project = self.project
         self.layer_panel.project = self.project
@@ -373,42 +880,238 @@ class TileEditorMainWindow(QMainWindow):
     
     def _open_project(self):
         """Open existing project"""
-        directory = QFileDialog.getExistingDirectory(
-            self,
-            "Open Project",
-            "",
-            QFileDialog.ShowDirsOnly
-        )
+        if self._project_format() == 'container':
+            directory, _ = QFileDialog.getOpenFileName(
+                self,
+                "Open Project",
+                "",
+                f"Aether Projects (*{EXT_PROJECT})"
+            )
+        else:
+            directory = QFileDialog.getExistingDirectory(
+                self,
+                "Open Project",
+                "",
+                QFileDialog.ShowDirsOnly
+            )
         
         if not directory:
             return
         
         try:
-            self.project = ProjectIO.load_project(directory)
-            
-            # Update UI
-            if self.project.layers:
-                self.editor_state.current_layer = self.project.layers[0]
-            
-            self.canvas.project = self.project
-            self.layer_panel.project = self.project
-            self.layer_panel.refresh()
-            
-            # Update tileset palette
-            if self.project.tileset:
-                self.tile_palette.set_tileset(self.project.tileset)
+            # Metadata first; layer cells and the tileset stream in afterwards
+            readers = None
+            project = self._recover_autosave(directory)
+            if project is None:
+                project, *readers = ProjectIO.load_skeleton(directory)
             
-            self.setWindowTitle(f"{APP_NAME} - {self.project.name}")
+            self._show_project(project)
             self.statusbar.showMessage(f"Opened: {directory}")
             
+            if readers is None:
+                self._finish_loading()  # Recovered autosave is already complete
+            else:
+                self._start_loading(*readers)
+        
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to open project:\n{str(e)}")
     
+    def _import_tiled(self):
+        """Import a Tiled map as a new, unsaved project"""
+        filename, _ = QFileDialog.getOpenFileName(
+            self,
+            "Import Tiled Map",
+            "",
+            "Tiled Maps (*.tmx *.tmj *.json)"
+        )
+        
+        if not filename:
+            return
+        
+        try:
+            project = ProjectIO.import_from_tiled(filename)
+            self._show_project(project)
+            self._finish_loading()
+            self.statusbar.showMessage(f"Imported: {filename}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to import Tiled map:\n{str(e)}")
+    
+    def _show_project(self, project):
+        """Make an opened or imported project the current one"""
+        self._cancel_loading()
+        self.project = project
+        self.editor_state.history.clear()
+        self.editor_state.autosave.detach()
+        self._close_journal()
+        self.editor_state.autotile.set_rules(self.project.metadata)
+        self.editor_state.selection_rect = None
+        self.editor_state.floating_paste = None
+        if self.project.layers:
+            self.editor_state.current_layer = self.project.layers[0]
+        
+        self.canvas.project = self.project
+        self.layer_panel.project = self.project
+        self.layer_panel.refresh()
+        
+        # Update tileset palette
+        if self.project.tileset:
+            self.tile_palette.set_tileset(self.project.tileset)
+        
+        self.setWindowTitle(f"{APP_NAME} - {self.project.name}")
+    
+    def _start_loading(self, tileset_reader, layer_readers):
+        """Stream the opened project's tileset and layers in, cells under the camera first"""
+        loader = self.editor_state.loader
+        viewport = self.canvas.renderer.visible_tile_range(
+            self.project.grid_width, self.project.grid_height,
+            self.project.tile_width, self.project.tile_height
+        )
+        loader.start(self.project, tileset_reader, layer_readers, viewport)
+        if not loader.active:
+            self._finish_loading()
+            return
+        
+        self.layer_panel.refresh()  # Layers show as locked until they arrive
+        self.load_progress.setRange(0, loader.total)
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.load_timer.start(30)
+    
+    def _load_tick(self):
+        """Install layers that finished loading"""
+        self._apply_load_result(self.editor_state.loader.poll())
+    
+    def _wait_for_loading(self):
+        """Finish a progressive open before something needs every layer (saving, exporting)"""
+        if self.editor_state.loader.active:
+            self._apply_load_result(self.editor_state.loader.wait())
+    
+    def _apply_load_result(self, result):
+        """Show what a loader poll installed; wraps up the open once everything is in"""
+        loader = self.editor_state.loader
+        if result.tileset and self.project.tileset:
+            self.tile_palette.set_tileset(self.project.tileset)
+        if result.layers:
+            self.layer_panel.refresh()
+        self.load_progress.setValue(loader.completed)
+        
+        if result.finished:
+            errors = list(loader.errors)
+            self._cancel_loading()
+            self._finish_loading()
+            if errors:
+                message = "Some data failed to load:\n" + "\n".join(errors)
+                if any(layer.load_error for layer in self.project.layers):
+                    message += "\n\nLayers that failed stay locked, and the project cannot be saved until it is reopened."
+                QMessageBox.warning(self, "Open Project", message)
+    
+    def _finish_loading(self):
+        """Apply journaled edits and start autosave/journaling once all layers are in"""
+        if self.project.project_path:
+            journal_path = EditJournal.journal_path(self.project.project_path)
+            if journal_path.exists():
+                # The journal holds every edit since the last save
+                if EditJournal.replay(str(journal_path), self.project):
+                    self.statusbar.showMessage("Restored unsaved edits from the edit journal; save to keep them")
+        self.editor_state.autosave.attach(self.project)
+        self._attach_journal()
+        self.layer_panel.refresh()
+    
+    def _cancel_loading(self):
+        """Stop a progressive open in progress (e.g. another project is opened)"""
+        self.load_timer.stop()
+        self.load_progress.hide()
+        self.editor_state.loader.cancel()
+    
+    def _recover_autosave(self, directory: str):
+        """Offer a project's autosave when it is newer than the last save; the recovered project or None"""
+        autosave_dir = AutosaveService.newer_autosave(directory)
+        if autosave_dir is not None:
+            reply = QMessageBox.question(
+                self,
+                "Recover Autosave",
+                "This project has autosaved changes newer than its last save.\n"
+                "Recover them?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
+            if reply == QMessageBox.Yes:
+                project = ProjectIO.load_project(str(autosave_dir), replay_journal=False)
+                project.project_path = directory  # Saving writes the recovered state back
+                self.statusbar.showMessage("Recovered autosaved changes; save to keep them")
+                return project
+        return None
+    
+    def _autosave_tick(self):
+        """Report a finished autosave and start the next one if enough changed"""
+        autosave = self.editor_state.autosave
+        message = autosave.poll()
+        if message:
+            self.statusbar.showMessage(message, 5000)
+        autosave.maybe_autosave()
+        
+        journal = self.editor_state.journal
+        if journal is not None and journal.error:
+            self.statusbar.showMessage(f"Edit journal failed: {journal.error}", 5000)
+            journal.error = None
+    
+    def _attach_journal(self):
+        """Journal committed edits next to the project (needs a project path)"""
+        self._close_journal()
+        if self.project.project_path:
+            journal = EditJournal(str(EditJournal.journal_path(self.project.project_path)))
+            self.editor_state.history.listeners.append(journal.append)
+            self.editor_state.journal = journal
+    
+    def _close_journal(self):
+        """Flush and detach the current project's journal"""
+        journal = self.editor_state.journal
+        if journal is None:
+            return
+        self.editor_state.history.listeners.remove(journal.append)
+        journal.close()
+        self.editor_state.journal = None
+    
+    def _apply_autosave_settings(self):
+        """Read autosave interval and change threshold from settings"""
+        autosave = self.editor_state.autosave
+        autosave.interval_ms = int(self.settings.value('autosave/interval_ms', autosave.interval_ms))
+        autosave.min_changes = int(self.settings.value('autosave/min_changes', autosave.min_changes))
+        
+        if autosave.interval_ms > 0:
+            self.autosave_timer.start(autosave.interval_ms)
+        else:
+            self.autosave_timer.stop()
+    
+    def _autosave_settings_dialog(self):
+        """Configure autosave interval and change threshold"""
+        autosave = self.editor_state.autosave
+        seconds, ok = QInputDialog.getInt(
+            self, "Autosave", "Interval in seconds (0 disables):",
+            autosave.interval_ms // 1000, 0, 24 * 3600
+        )
+        if not ok:
+            return
+        changes, ok = QInputDialog.getInt(
+            self, "Autosave", "Minimum changes before autosaving:",
+            autosave.min_changes, 1, 1000000
+        )
+        if not ok:
+            return
+        
+        self.settings.setValue('autosave/interval_ms', seconds * 1000)
+        self.settings.setValue('autosave/min_changes', changes)
+        self._apply_autosave_settings()
+    
     def _save_project(self):
         """Save current project"""
+        self._wait_for_loading()
         if self.project.project_path:
             try:
                 ProjectIO.save_project(self.project, self.project.project_path)
+                self.editor_state.autosave.discard()
+                if self.editor_state.journal is not None:
+                    self.editor_state.journal.truncate()  # Also drops records not yet written
                 self.statusbar.showMessage(f"Saved: {self.project.project_path}")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save:\n{str(e)}")
@@ -417,27 +1120,51 @@ class TileEditorMainWindow(QMainWindow):
     
     def _save_project_as(self):
         """Save project to new location"""
-        directory = QFileDialog.getExistingDirectory(
-            self,
-            "Save Project As",
-            "",
-            QFileDialog.ShowDirsOnly
-        )
+        if self._project_format() == 'container':
+            directory, _ = QFileDialog.getSaveFileName(
+                self,
+                "Save Project As",
+                "",
+                f"Aether Projects (*{EXT_PROJECT})"
+            )
+            if directory and not directory.lower().endswith(EXT_PROJECT):
+                directory += EXT_PROJECT
+        else:
+            directory = QFileDialog.getExistingDirectory(
+                self,
+                "Save Project As",
+                "",
+                QFileDialog.ShowDirsOnly
+            )
         
         if not directory:
             return
         
         try:
+            self._wait_for_loading()
             ProjectIO.save_project(self.project, directory)
+            self.editor_state.autosave.discard()
+            # Edits so far went to the new location, not to the old project's files
+            if self.editor_state.journal is not None:
+                self.editor_state.journal.truncate()
+            self._attach_journal()
             self.statusbar.showMessage(f"Saved: {directory}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save:\n{str(e)}")
     
+    def _project_format(self) -> str:
+        """'directory' or 'container' (single .aether file) for new saves and the open dialog"""
+        return self.settings.value('project/format', DEFAULT_PROJECT_FORMAT)
+    
+    def _set_project_format(self, single_file: bool):
+        """Remember the default project format"""
+        self.settings.setValue('project/format', 'container' if single_file else 'directory')
+    
     def _import_tileset(self):
         """Import tileset image"""
                 # Force paint a visible tile
         self.project.layers[1].set_tile(0, 0, 1)
-
+        
         filename, _ = QFileDialog.getOpenFileName(
             self,
             "Import Tileset",
@@ -470,7 +1197,7 @@ class TileEditorMainWindow(QMainWindow):
                 f"Imported tileset: {tileset_name} " +
                 f"({tileset.tile_width}x{tileset.tile_height}, {len(tileset.tiles)} tiles)"
             )
-            
+        
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to import tileset:\n{str(e)}")
     
@@ -506,7 +1233,7 @@ class TileEditorMainWindow(QMainWindow):
                 self.statusbar.showMessage(
                     f"Tiles subdivided to {new_size}x{new_size} ({len(self.project.tileset.tiles)} tiles)"
                 )
-                
+            
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to subdivide tiles:\n{str(e)}")
     
@@ -523,11 +1250,32 @@ class TileEditorMainWindow(QMainWindow):
             return
         
         try:
+            self._wait_for_loading()
             ProjectIO.export_to_hdf5(self.project, filename)
             QMessageBox.information(self, "Success", f"Exported to:\n{filename}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to export:\n{str(e)}")
     
+    def _export_tiled(self):
+        """Export project as a Tiled map (TMX or JSON, by extension)"""
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Export to Tiled",
+            f"{self.project.name}.tmx",
+            "Tiled Maps (*.tmx);;Tiled JSON Maps (*.tmj *.json);;Tiled Maps, CSV layers (*.tmx)"
+        )
+        
+        if not filename:
+            return
+        
+        try:
+            self._wait_for_loading()
+            encoding = 'csv' if 'CSV' in selected_filter else 'base64-zlib'
+            ProjectIO.export_to_tiled(self.project, filename, encoding=encoding)
+            QMessageBox.information(self, "Success", f"Exported to:\n{filename}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export:\n{str(e)}")
+    
     def _export_png(self):
         """Export current view to PNG"""
         filename, _ = QFileDialog.getSaveFileName(
@@ -586,4 +1334,10 @@ class TileEditorMainWindow(QMainWindow):
     def closeEvent(self, event):
         """Handle window close"""
         self._save_settings()
+        self._cancel_loading()
+        self.editor_state.loader.shutdown()
+        self.editor_state.autosave.shutdown()
+        self.terrain_timer.stop()
+        self.terrain_executor.shutdown(wait=True, cancel_futures=True)
+        self._close_journal()
         event.accept()